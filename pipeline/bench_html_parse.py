@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: table extraction from the HND/GKD pages
+
+Compares the streaming extractor (html_table.py) with a full BeautifulSoup
+tree + find_all('tr') / get_text, the way the scrapers parsed pages before,
+on the recorded pages in pipeline/fixtures/. Both must yield the same rows.
+
+    python pipeline/bench_html_parse.py [--repeat 50]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from html_table import MISSING_VALUES, TIMESTAMP_FORMAT, iter_measurements
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+# fixture -> value type of its table
+PAGES = {
+    'hnd_water_level.html': int,
+    'gkd_water_temperature.html': float,
+}
+
+
+def soup_measurements(html, convert):
+    """Reference: all (timestamp, value) rows via a full BeautifulSoup tree"""
+    table = BeautifulSoup(html, 'html.parser').find('table')
+    out = []
+    for row in table.find_all('tr')[1:]:
+        cols = row.find_all('td')
+        if len(cols) < 2:
+            continue
+        value_str = cols[1].get_text(strip=True).replace(',', '.')
+        if value_str in MISSING_VALUES:
+            continue
+        try:
+            out.append((datetime.strptime(cols[0].get_text(strip=True), TIMESTAMP_FORMAT), convert(value_str)))
+        except ValueError:
+            continue
+    return out
+
+
+def soup_latest(html, convert):
+    return soup_measurements(html, convert)[0]
+
+
+def stream_measurements(html, convert):
+    return list(iter_measurements(html, convert))
+
+
+def stream_latest(html, convert):
+    return next(iter_measurements(html, convert))
+
+
+def best_of(func, html, convert, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html, convert)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML table extraction')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per case (best time is reported)')
+    parser.add_argument('--fixtures-dir', type=Path, default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    print('=' * 80)
+    print('⏱️  HTML table extraction (best of %d runs)' % args.repeat)
+    print('=' * 80)
+
+    for name, convert in PAGES.items():
+        html = (args.fixtures_dir / name).read_text(encoding='utf-8')
+        reference = soup_measurements(html, convert)
+        if stream_measurements(html, convert) != reference:
+            print(f"❌ {name}: streaming extractor and BeautifulSoup disagree")
+            return 1
+
+        print(f"\n📄 {name}: {len(html) / 1024:.0f} KiB, {len(reference)} rows")
+        for label, soup_func, stream_func in [
+            ('all rows', soup_measurements, stream_measurements),
+            ('latest row', soup_latest, stream_latest),
+        ]:
+            soup_time = best_of(soup_func, html, convert, args.repeat)
+            stream_time = best_of(stream_func, html, convert, args.repeat)
+            print(f"   {label:<11} BeautifulSoup {soup_time * 1000:8.2f} ms   "
+                  f"streaming {stream_time * 1000:8.2f} ms   ({soup_time / stream_time:.1f}x)")
+
+    print('\n✅ Both extractors yield the same rows')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
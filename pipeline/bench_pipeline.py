@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the pipeline on a synthetic LfU dataset
+
+Writes CSV exports with synthetic_lfu.py (--years, --stations) into a scratch
+directory and times the pipeline steps on them:
+
+ingest   ingest_group (or ingest_group_bounded) for every (station, parameter)
+migrate  migrate_parameter for both parameters, after --live-days of
+         15-minute live rows per series were saved to the live store
+parse    the --backfill table parse (fetch_and_store_isar.parse_table) of the
+         HND/GKD pages in pipeline/fixtures/, --parse-repeat times
+verify   verify_data_completeness.verify over all stations
+
+Each case runs in a fresh process, so its peak RSS is its own; the telemetry
+stages of the pipeline code inside a case (telemetry.py) are kept with it.
+Results are printed and appended to data/bench_history.jsonl as run reports
+of telemetry.py, one stage per case, so
+
+    python pipeline/telemetry.py --history data/bench_history.jsonl
+
+lists past benchmark runs and flags cases that got slower than in earlier
+runs with the same arguments.
+
+    python pipeline/bench_pipeline.py --years 50 --stations 4
+    python pipeline/bench_pipeline.py --cases ingest --engine arrow --workers 4
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+import synthetic_lfu
+from telemetry import Telemetry, append_report, peak_rss, stage
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BENCH_HISTORY = PROJECT_ROOT / 'data' / 'bench_history.jsonl'
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+CASES = ('ingest', 'migrate', 'parse', 'verify')
+
+# fixture -> live data type of its table
+PAGES = {
+    'hnd_water_level.html': 'water_level',
+    'gkd_water_temperature.html': 'water_temperature',
+}
+
+
+def paths(work_dir):
+    work_dir = Path(work_dir)
+    return {
+        'data': work_dir / 'data',
+        'parquet': work_dir / 'parquet',
+        'current': work_dir / 'current',
+        'web': work_dir / 'web',
+    }
+
+
+def csv_end(options):
+    """End of the synthetic CSV history; the live rows of the migrate case follow it"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=options['live_days'])
+
+
+# -- cases -------------------------------------------------------------------
+# setup_* prepares what a case needs (untimed), run_* is timed and returns its
+# counters (rows_in, bytes_in, ...); counters it leaves out are taken from the
+# telemetry counts of the pipeline code it ran.
+
+def run_ingest(options, work_dir):
+    from ingest_lfu_csv_to_parquet import ingest_group, ingest_group_bounded
+    from raw_partitions import raw_file_path
+    from stations import discover_station_ids, series_name, station_files
+
+    p = paths(work_dir)
+    raw_dir, daily_dir = p['parquet'] / 'raw', p['parquet'] / 'daily'
+    rows = files = size = 0
+    executor = ProcessPoolExecutor(max_workers=options['workers']) if options['workers'] > 1 else None
+    try:
+        for station_id in discover_station_ids(p['data']):
+            for parameter, csv_files in station_files(p['data'], station_id).items():
+                raw_path = raw_file_path(raw_dir, station_id, parameter, options['raw_layout'])
+                daily_path = daily_dir / f"{series_name(station_id, parameter)}_daily.parquet"
+                common = dict(chunksize=options['chunksize'], engine=options['engine'],
+                              raw_layout=options['raw_layout'], daily_quantiles=options['daily_quantiles'])
+                if options['bounded_memory']:
+                    result = ingest_group_bounded(csv_files, raw_path, daily_path, **common)
+                else:
+                    result = ingest_group(csv_files, raw_path, daily_path, executor=executor, **common)
+                rows += sum(e.rows for e in result.files)
+                files += len(csv_files)
+                size += sum(f.stat().st_size for f in csv_files)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return {'rows_in': rows, 'bytes_in': size, 'files': files}
+
+
+def setup_ingested(options, work_dir):
+    """Ingest outputs for the cases that read them"""
+    if not (paths(work_dir)['parquet'] / 'daily').exists():
+        run_ingest(options, work_dir)
+
+
+def setup_migrate(options, work_dir):
+    """Ingest outputs plus --live-days of live rows per series after the CSV history"""
+    from live_store import jsonl_record, open_live_store
+
+    setup_ingested(options, work_dir)
+    start = csv_end(options)
+    end = datetime.now().replace(second=0, microsecond=0)
+    end -= timedelta(minutes=end.minute % 15)
+    ts = np.arange(np.datetime64(start, 'm'), np.datetime64(end, 'm'), synthetic_lfu.SLOT)
+    fetched_at = datetime.now().isoformat()
+    live_types = {'water_level_cm': 'water_level', 'water_temperature_c': 'water_temperature'}
+    with open_live_store(options['live_store'], paths(work_dir)['current']) as store:
+        for station in synthetic_lfu.synthetic_stations(options['stations'], options['seed']):
+            for k, (parameter, data_type) in enumerate(live_types.items()):
+                rng = np.random.default_rng([options['seed'], station.station_id, k, 1])
+                values = synthetic_lfu.series_values(parameter, station, ts, rng)
+                convert = int if data_type == 'water_level' else float
+                measurements = [
+                    jsonl_record(str(station.station_id), station.name, data_type,
+                                 t.astype(datetime), convert(v), fetched_at)
+                    for t, v in zip(ts, values.tolist())
+                ]
+                store.save(measurements, data_type)
+
+
+def run_migrate(options, work_dir):
+    import migrate_live_to_parquet as migrate
+
+    p = paths(work_dir)
+    migrate.CURRENT_DATA_DIR = p['current']
+    migrate.PARQUET_DIR = p['parquet'] / 'raw'
+    migrate.DAILY_DIR = p['parquet'] / 'daily'
+    migrate.WEB_ROOT = p['web']
+    migrate.WEB_PARQUET_DIR = p['web'] / 'raw'
+    for parameter in ('water_level_cm', 'water_temperature_c'):
+        migrate.migrate_parameter(parameter, days_back=options['live_days'] + 1,
+                                  raw_layout=options['raw_layout'], live_store=options['live_store'])
+    # rows_in: the live rows read, counted by the migration itself
+    return {}
+
+
+def run_parse(options, work_dir):
+    import fetch_and_store_isar as fetch
+
+    fetch.LOG_FILE = Path(work_dir) / 'log.txt'
+    pages = [((FIXTURES_DIR / name).read_text(encoding='utf-8'), data_type) for name, data_type in PAGES.items()]
+    rows = size = 0
+    for _ in range(options['parse_repeat']):
+        for html, data_type in pages:
+            rows += len(fetch.parse_table(html, data_type, fetch.STATION_ID))
+            size += len(html.encode('utf-8'))
+    return {'rows_in': rows, 'bytes_in': size}
+
+
+def run_verify(options, work_dir):
+    import pyarrow.parquet as pq
+    from verify_data_completeness import print_report, verify
+
+    parquet_dir = paths(work_dir)['parquet']
+    print_report(verify(parquet_dir))
+    raw = [f for f in (parquet_dir / 'raw').glob('*.parquet') if not f.name.endswith('_tail.parquet')]
+    return {
+        'rows_in': sum(pq.ParquetFile(f).metadata.num_rows for f in raw),
+        'bytes_in': sum(f.stat().st_size for f in raw),
+    }
+
+
+CASE_FUNCS = {
+    'ingest': (None, run_ingest),
+    'migrate': (setup_migrate, run_migrate),
+    'parse': (None, run_parse),
+    'verify': (setup_ingested, run_verify),
+}
+
+
+def run_case(name, options, work_dir):
+    """Run one case (in a fresh process); returns its stage entry for the report"""
+    # The pipeline code's own telemetry is collected here, not in the run history
+    os.environ['ISAR_RUN_HISTORY'] = 'off'
+    setup, run = CASE_FUNCS[name]
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        if setup is not None:
+            setup(options, work_dir)
+        with Telemetry('bench') as telemetry:
+            with stage(name) as case:
+                case.add(**run(options, work_dir))
+    report = telemetry.report
+    entry = {'name': name, 'seconds': round(case.seconds, 4)}
+    entry.update({**report['counters'], **case.counters})
+    if entry.get('rows_in'):
+        entry['rows_per_s'] = round(entry['rows_in'] / case.seconds)
+    if entry.get('bytes_in'):
+        entry['mib_per_s'] = round(entry['bytes_in'] / 2**20 / case.seconds, 2)
+    entry['rss_peak_bytes'] = case.rss_peak
+    entry['max_rss_bytes'] = peak_rss()
+    entry['max_rss_children_bytes'] = peak_rss(children=True)
+    # Totals of the stages inside the case
+    inner = {}
+    for s in report['stages']:
+        if s['name'] != name or 'labels' in s:
+            inner[s['name']] = round(inner.get(s['name'], 0) + s['seconds'], 4)
+    if inner:
+        entry['inner'] = inner
+    return entry
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline on a synthetic LfU dataset')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES),
+                        help='Cases to run, in this order (default: all)')
+    parser.add_argument('--years', type=int, default=10, help='Years of synthetic history (default: 10)')
+    parser.add_argument('--stations', type=int, default=1, help='Synthetic stations (default: 1)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=('pandas', 'arrow'), default='pandas', help='Ingest CSV reader')
+    parser.add_argument('--chunksize', type=int, default=200_000, help='Ingest CSV rows per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='Ingest worker processes')
+    parser.add_argument('--raw-layout', choices=('file', 'partitioned'), default='file')
+    parser.add_argument('--daily-quantiles', action='store_true')
+    parser.add_argument('--bounded-memory', action='store_true', help='Ingest with ingest_group_bounded')
+    parser.add_argument('--live-days', type=int, default=3, help='Days of live rows for the migrate case (default: 3)')
+    parser.add_argument('--live-store', choices=('jsonl', 'sqlite'), default='jsonl')
+    parser.add_argument('--parse-repeat', type=int, default=20, help='Passes over the fixture pages (default: 20)')
+    parser.add_argument('--work-dir', type=Path, default=None,
+                        help='Scratch directory (default: a temporary one, removed afterwards)')
+    parser.add_argument('--history', type=Path, default=BENCH_HISTORY,
+                        help='Report history (default: data/bench_history.jsonl)')
+    parser.add_argument('--no-history', action='store_true', help='Do not append the report')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = vars(args).copy()
+    for key in ('cases', 'work_dir', 'history', 'no_history'):
+        options.pop(key)
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix='isar-bench-'))
+    started_at = datetime.utcnow()
+    t0 = time.perf_counter()
+
+    print('=' * 80)
+    print(f"⏱️  Pipeline benchmark: {args.years} year(s), {args.stations} station(s)")
+    print('=' * 80)
+    try:
+        start = time.perf_counter()
+        dataset = synthetic_lfu.generate(paths(work_dir)['data'], years=args.years, stations=args.stations,
+                                         end=csv_end(options), seed=args.seed)
+        print(f"\n📄 Synthetic data: {dataset['files']} files, {dataset['rows']:,} rows, "
+              f"{dataset['bytes'] / 2**20:.1f} MiB ({time.perf_counter() - start:.1f}s)\n")
+
+        results = []
+        spawn = multiprocessing.get_context('spawn')
+        for name in args.cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                entry = pool.submit(run_case, name, options, str(work_dir)).result()
+            results.append(entry)
+            rate = f"{entry['rows_per_s']:>12,} rows/s" if entry.get('rows_per_s') else ' ' * 19
+            mib = f"{entry['mib_per_s']:8.1f} MiB/s" if entry.get('mib_per_s') else ' ' * 14
+            rss = entry.get('max_rss_bytes') or entry.get('rss_peak_bytes') or 0
+            print(f"   {name:<8} {entry['seconds']:9.3f}s {rate} {mib}   peak RSS {rss / 2**20:6.0f} MiB")
+            for inner, seconds in entry.get('inner', {}).items():
+                print(f"      {inner:<22} {seconds:9.3f}s")
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'job': 'bench',
+        'run_id': uuid.uuid4().hex[:12],
+        'started_at': started_at.isoformat() + 'Z',
+        'duration_s': round(time.perf_counter() - t0, 4),
+        'status': 'ok',
+        'argv': sys.argv[1:] if argv is None else list(argv),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'dataset': dataset,
+        'counters': {'rows_in': dataset['rows'], 'bytes_in': dataset['bytes']},
+        'stages': results,
+    }
+    if not args.no_history:
+        append_report(args.history, report)
+        print(f"\n📝 Report appended to {args.history}")
+    print(json.dumps({r['name']: r['seconds'] for r in results}))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Day-of-year climatology of the daily means: one row per day of year (1-366)
+with p05/p25/p50/p75/p95 over all daily means within +-7 calendar days of that
+day in any year, the sample count and the years covered.
+
+    climatology/station_16005701_water_level_cm_climatology.parquet
+
+The window wraps across the year boundary (30 December counts for 3 January).
+Derived from the daily rollup; updates only recompute the days of year whose
+window contains a changed date. Shared by ingest_lfu_csv_to_parquet.py and
+migrate_live_to_parquet.py.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from publish import write_parquet_atomic
+
+WINDOW_DAYS = 7
+PERCENTILES = (5, 25, 50, 75, 95)
+DAYS_OF_YEAR = np.arange(1, 367)
+
+CLIMATOLOGY_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int32()),
+        ("parameter", pa.string()),
+        ("doy", pa.int16()),
+        ("count", pa.int32()),
+        ("years", pa.int16()),
+        ("first_year", pa.int16()),
+        ("last_year", pa.int16()),
+    ]
+    + [(f"p{q:02d}", pa.float64()) for q in PERCENTILES]
+)
+
+
+def climatology_path(daily_parquet: Path) -> Path:
+    name = daily_parquet.name.replace("_daily.parquet", "_climatology.parquet")
+    return daily_parquet.parent.parent / "climatology" / name
+
+
+def _day_numbers(dates: np.ndarray) -> np.ndarray:
+    return dates.astype("datetime64[D]").astype(np.int64)
+
+
+def _year_starts(years: np.ndarray) -> np.ndarray:
+    return (years - 1970).astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+
+
+def _window_distance(days: np.ndarray, years: np.ndarray, doy: int) -> np.ndarray:
+    # Calendar days between each date and the nearest occurrence of `doy`
+    # (in its own, the previous or the next year), so the window wraps.
+    dist = None
+    for shift in (-1, 0, 1):
+        target = _year_starts(years + shift) + (doy - 1)
+        d = np.abs(days - target)
+        dist = d if dist is None else np.minimum(dist, d)
+    return dist
+
+
+def _affected_doys(dates: np.ndarray) -> np.ndarray:
+    # Days of year whose window can contain one of `dates` (one day of slack
+    # for the 365/366 mismatch).
+    years = dates.astype("datetime64[Y]")
+    doys = (_day_numbers(dates) - _day_numbers(years)) + 1
+    reach = WINDOW_DAYS + 1
+    circ = np.abs(DAYS_OF_YEAR[:, None] - np.unique(doys)[None, :])
+    circ = np.minimum(circ, 366 - circ)
+    return DAYS_OF_YEAR[(circ <= reach).any(axis=1)]
+
+
+def compute_climatology(
+    daily: pa.Table, station_id: int, parameter: str, doys: Optional[Iterable[int]] = None
+) -> pa.Table:
+    # Rows for `doys` (default: all 366) from a daily rollup table.
+    daily = daily.filter(pc.is_valid(daily.column("mean")))
+    dates = daily.column("date").to_numpy().astype("datetime64[D]")
+    means = daily.column("mean").to_numpy()
+    years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    days = _day_numbers(dates)
+
+    targets = DAYS_OF_YEAR if doys is None else np.array(sorted(set(doys)), dtype=np.int64)
+    cols = {name: [] for name in CLIMATOLOGY_SCHEMA.names}
+    for doy in targets:
+        sel = _window_distance(days, years, int(doy)) <= WINDOW_DAYS
+        sample = means[sel]
+        sample_years = np.unique(years[sel])
+        cols["station_id"].append(station_id)
+        cols["parameter"].append(parameter)
+        cols["doy"].append(int(doy))
+        cols["count"].append(len(sample))
+        cols["years"].append(len(sample_years))
+        cols["first_year"].append(int(sample_years[0]) if len(sample_years) else None)
+        cols["last_year"].append(int(sample_years[-1]) if len(sample_years) else None)
+        # Linear interpolation, like DuckDB's quantile_cont.
+        qs = np.percentile(sample, PERCENTILES) if len(sample) else [None] * len(PERCENTILES)
+        for q, v in zip(PERCENTILES, qs):
+            cols[f"p{q:02d}"].append(None if v is None else float(v))
+    return pa.Table.from_pydict(cols, schema=CLIMATOLOGY_SCHEMA)
+
+
+def update_climatology(
+    daily_parquet: Path,
+    station_id: int,
+    parameter: str,
+    changed_dates: Optional[np.ndarray] = None,
+) -> Path:
+    # Rebuild the climatology from the daily rollup, or with `changed_dates`
+    # (datetime64) only the days of year whose window contains one of them.
+    path = climatology_path(daily_parquet)
+    daily = pq.read_table(daily_parquet, columns=["date", "mean"])
+    if changed_dates is None or not path.exists():
+        table = compute_climatology(daily, station_id, parameter)
+    else:
+        doys = _affected_doys(np.asarray(changed_dates))
+        fresh = compute_climatology(daily, station_id, parameter, doys)
+        old = pq.read_table(path)
+        old = old.filter(pc.invert(pc.is_in(old.column("doy"), fresh.column("doy"))))
+        table = pa.concat_tables([old, fresh])
+        table = table.take(pc.sort_indices(table, sort_keys=[("doy", "ascending")]))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_parquet_atomic(table, path)
+    return path
@@ -0,0 +1,248 @@
+"""
+Gaps and coverage of the raw 15-minute series.
+
+    coverage/station_16005701_water_level_cm_gaps.parquet
+    coverage/station_16005701_water_level_cm_coverage.parquet
+
+Gaps: one row per run of missing 15-minute slots between two samples, with
+`start` (first missing slot), `end` (the next sample) and the duration in
+minutes. Coverage: one row per day (`resolution = 'day'`, from the first to
+the last day with a sample, days without any included) and per calendar year
+(`'year'`, keyed by 1 January) with the samples present, the samples expected
+(96 per day; the running year only up to the last day with a sample) and
+their ratio. The day rows join the daily rollup on `date`.
+
+A sample is a row with a value; the slot of a timestamp is the 15-minute step
+it falls in, so a timestamp delivered twice counts once. Both tables are
+derived from one bitmap of slots (a byte per slot, ~35 KB per year of data),
+built in the ingest pass and rebuilt from the two tables on live migration,
+where only the new rows' slots change. Shared by ingest_lfu_csv_to_parquet.py
+and migrate_live_to_parquet.py.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from publish import write_parquet_atomic
+
+SLOTS_PER_DAY = 96
+SLOT_NS = 15 * 60 * 10**9
+# Room added when the bitmap grows, so a series arriving month by month is not
+# copied once per month.
+GROW_DAYS = 366
+
+GAPS_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int32()),
+        ("parameter", pa.string()),
+        ("start", pa.timestamp("ns")),
+        ("end", pa.timestamp("ns")),
+        ("duration_minutes", pa.int32()),
+    ]
+)
+
+COVERAGE_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int32()),
+        ("parameter", pa.string()),
+        ("resolution", pa.string()),
+        ("date", pa.date32()),
+        ("samples", pa.int32()),
+        ("expected", pa.int32()),
+        ("coverage", pa.float64()),
+        ("first_ts", pa.timestamp("ns")),
+        ("last_ts", pa.timestamp("ns")),
+    ]
+)
+
+
+def gaps_path(daily_parquet: Path) -> Path:
+    name = daily_parquet.name.replace("_daily.parquet", "_gaps.parquet")
+    return daily_parquet.parent.parent / "coverage" / name
+
+
+def coverage_path(daily_parquet: Path) -> Path:
+    name = daily_parquet.name.replace("_daily.parquet", "_coverage.parquet")
+    return daily_parquet.parent.parent / "coverage" / name
+
+
+def _slots(table: pa.Table | pa.RecordBatch) -> Tuple[np.ndarray, np.ndarray]:
+    # Slot numbers (15-minute steps since the epoch) and whether the row has a value.
+    ts = table.column("ts").cast(pa.int64()).to_numpy()
+    values = table.column("value").to_numpy(zero_copy_only=False).astype(np.float64)
+    return ts // SLOT_NS, ~np.isnan(values)
+
+
+class CoverageAggregator:
+    # Bitmap of the slots holding a sample, whole days from `_first_day` (day
+    # number since the epoch). Rows may arrive in any order; partials from
+    # worker processes are combined with merge().
+
+    def __init__(self) -> None:
+        self._first_day: Optional[int] = None
+        self._bits = np.zeros(0, dtype=bool)
+
+    def _reserve(self, lo_day: int, hi_day: int) -> None:
+        # Make days lo_day..hi_day (inclusive) addressable.
+        if self._first_day is None:
+            self._first_day = lo_day
+            self._bits = np.zeros((hi_day - lo_day + 1 + GROW_DAYS) * SLOTS_PER_DAY, dtype=bool)
+            return
+        first = self._first_day
+        last = first + len(self._bits) // SLOTS_PER_DAY - 1
+        if lo_day >= first and hi_day <= last:
+            return
+        new_first = min(first, lo_day - GROW_DAYS) if lo_day < first else first
+        new_last = max(last, hi_day + GROW_DAYS) if hi_day > last else last
+        bits = np.zeros((new_last - new_first + 1) * SLOTS_PER_DAY, dtype=bool)
+        offset = (first - new_first) * SLOTS_PER_DAY
+        bits[offset : offset + len(self._bits)] = self._bits
+        self._first_day, self._bits = new_first, bits
+
+    def _set(self, slots: np.ndarray, present: bool) -> None:
+        if len(slots) == 0:
+            return
+        self._reserve(int(slots.min()) // SLOTS_PER_DAY, int(slots.max()) // SLOTS_PER_DAY)
+        self._bits[slots - self._first_day * SLOTS_PER_DAY] = present
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        slots, valid = _slots(batch)
+        self._set(slots[valid], True)
+
+    def apply_rows(self, rows: pa.Table) -> None:
+        # Rows replacing the stored rows with the same ts: a row without a
+        # value empties its slot.
+        slots, valid = _slots(rows)
+        self._set(slots[~valid], False)
+        self._set(slots[valid], True)
+
+    def merge(self, other: "CoverageAggregator") -> None:
+        if other._first_day is None:
+            return
+        present = np.flatnonzero(other._bits) + other._first_day * SLOTS_PER_DAY
+        self._set(present, True)
+
+    @classmethod
+    def from_tables(cls, gaps: pa.Table, coverage: pa.Table) -> "CoverageAggregator":
+        # The bitmap behind a gaps/coverage pair: every slot from the first to
+        # the last sample, minus the gaps.
+        agg = cls()
+        first = pc.min(coverage.column("first_ts").cast(pa.int64())).as_py()
+        last = pc.max(coverage.column("last_ts").cast(pa.int64())).as_py()
+        if first is None:
+            return agg
+        lo, hi = first // SLOT_NS, last // SLOT_NS
+        agg._reserve(lo // SLOTS_PER_DAY, hi // SLOTS_PER_DAY)
+        base = agg._first_day * SLOTS_PER_DAY
+        # +1 at each gap's start, -1 at its end; slots with a positive running
+        # sum are missing.
+        depth = np.zeros(hi - lo + 2, dtype=np.int64)
+        np.add.at(depth, gaps.column("start").cast(pa.int64()).to_numpy() // SLOT_NS - lo, 1)
+        np.add.at(depth, gaps.column("end").cast(pa.int64()).to_numpy() // SLOT_NS - lo, -1)
+        agg._bits[lo - base : hi - base + 1] = np.cumsum(depth)[:-1] == 0
+        return agg
+
+    def finalize(self, station_id: int, parameter: str) -> Tuple[pa.Table, pa.Table]:
+        # (gaps, coverage) tables.
+        present = np.flatnonzero(self._bits)
+        if len(present) == 0:
+            return GAPS_SCHEMA.empty_table(), COVERAGE_SCHEMA.empty_table()
+        base = self._first_day * SLOTS_PER_DAY
+
+        # Gaps: steps of more than one slot between consecutive samples.
+        k = np.flatnonzero(np.diff(present) > 1)
+        start = present[k] + 1
+        end = present[k + 1]
+        gaps = pa.table(
+            {
+                "station_id": pa.array(np.full(len(k), station_id), pa.int32()),
+                "parameter": pa.array([parameter] * len(k), pa.string()),
+                "start": pa.array((start + base) * SLOT_NS, pa.timestamp("ns")),
+                "end": pa.array((end + base) * SLOT_NS, pa.timestamp("ns")),
+                "duration_minutes": pa.array((end - start) * 15, pa.int32()),
+            },
+            schema=GAPS_SCHEMA,
+        )
+
+        # Days from the first to the last day with a sample.
+        lo_day, hi_day = present[0] // SLOTS_PER_DAY, present[-1] // SLOTS_PER_DAY
+        grid = self._bits[lo_day * SLOTS_PER_DAY : (hi_day + 1) * SLOTS_PER_DAY].reshape(-1, SLOTS_PER_DAY)
+        day_numbers = np.arange(lo_day, hi_day + 1) + self._first_day
+        samples = grid.sum(axis=1)
+        has = samples > 0
+        first_slot = np.where(has, grid.argmax(axis=1), 0)
+        last_slot = np.where(has, SLOTS_PER_DAY - 1 - grid[:, ::-1].argmax(axis=1), 0)
+        day_slot = day_numbers * SLOTS_PER_DAY
+        first_ts = np.where(has, (day_slot + first_slot) * SLOT_NS, np.iinfo(np.int64).max)
+        last_ts = np.where(has, (day_slot + last_slot) * SLOT_NS, np.iinfo(np.int64).min)
+
+        # Calendar years, folded from the days (which are contiguous).
+        dates = day_numbers.astype("datetime64[D]")
+        years = dates.astype("datetime64[Y]")
+        year_first = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+        year_dates = years[year_first].astype("datetime64[D]")
+        year_ends = np.minimum((years[year_first] + 1).astype("datetime64[D]"), dates[-1] + 1)
+        year_samples = np.add.reduceat(samples, year_first)
+        year_expected = (year_ends - year_dates).astype(np.int64) * SLOTS_PER_DAY
+        year_first_ts = np.minimum.reduceat(first_ts, year_first)
+        year_last_ts = np.maximum.reduceat(last_ts, year_first)
+
+        n_days, n_years = len(dates), len(year_dates)
+        expected = np.r_[np.full(n_days, SLOTS_PER_DAY), year_expected]
+        present_counts = np.r_[samples, year_samples]
+        firsts = np.r_[first_ts, year_first_ts]
+        lasts = np.r_[last_ts, year_last_ts]
+        coverage = pa.table(
+            {
+                "station_id": pa.array(np.full(n_days + n_years, station_id), pa.int32()),
+                "parameter": pa.array([parameter] * (n_days + n_years), pa.string()),
+                "resolution": pa.array(["day"] * n_days + ["year"] * n_years, pa.string()),
+                "date": pa.array(np.r_[dates, year_dates], pa.date32()),
+                "samples": pa.array(present_counts, pa.int32()),
+                "expected": pa.array(expected, pa.int32()),
+                "coverage": pa.array(present_counts / expected, pa.float64()),
+                "first_ts": pa.array(firsts, pa.timestamp("ns"), mask=present_counts == 0),
+                "last_ts": pa.array(lasts, pa.timestamp("ns"), mask=present_counts == 0),
+            },
+            schema=COVERAGE_SCHEMA,
+        )
+        return gaps, coverage
+
+
+def build_coverage(rows: pa.Table, station_id: int, parameter: str) -> Tuple[pa.Table, pa.Table]:
+    agg = CoverageAggregator()
+    for batch in rows.to_batches():
+        agg.add_batch(batch)
+    return agg.finalize(station_id, parameter)
+
+
+def write_coverage(tables: Tuple[pa.Table, pa.Table], daily_parquet: Path) -> List[Path]:
+    paths = [gaps_path(daily_parquet), coverage_path(daily_parquet)]
+    paths[0].parent.mkdir(parents=True, exist_ok=True)
+    for table, path in zip(tables, paths):
+        write_parquet_atomic(table, path)
+    return paths
+
+
+def update_coverage(
+    daily_parquet: Path,
+    new_rows: pa.Table,
+    station_id: int,
+    parameter: str,
+    read_all_rows: Callable[[], pa.Table],
+) -> List[Path]:
+    # Apply `new_rows` (replacing stored rows by ts) to the existing tables;
+    # `read_all_rows()` is only called when they do not exist yet.
+    paths = [gaps_path(daily_parquet), coverage_path(daily_parquet)]
+    if all(p.exists() for p in paths):
+        agg = CoverageAggregator.from_tables(pq.read_table(paths[0]), pq.read_table(paths[1]))
+        agg.apply_rows(new_rows)
+        return write_coverage(agg.finalize(station_id, parameter), daily_parquet)
+    return write_coverage(build_coverage(read_all_rows(), station_id, parameter), daily_parquet)
@@ -2,22 +2,43 @@
 """
 Automated script to fetch current Isar water levels and temperature
 Designed to run every 3 hours via cron
+
+All station/parameter pages are requested at the same time through one pooled
+session (fetch_engine.py) under a global deadline; failed requests are retried
+with backoff. Run against stub_server.py with --hnd-base-url/--gkd-base-url.
 """
 
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-import json
+import argparse
 import sys
 import os
 from pathlib import Path
 
+from fetch_engine import FetchEngine
+from html_table import MISSING_VALUES, iter_measurements, iter_table_rows
+from live_store import DEFAULT_LIVE_STORE, LIVE_STORES, VALUE_TYPES, jsonl_record, open_live_store
+from telemetry import Telemetry, count, stage
+
 STATION_ID = "16005701"
-HND_BASE_URL = "https://www.hnd.bayern.de"
-GKD_BASE_URL = "https://www.gkd.bayern.de"
+HND_BASE_URL = os.environ.get("ISAR_HND_BASE_URL", "https://www.hnd.bayern.de")
+GKD_BASE_URL = os.environ.get("ISAR_GKD_BASE_URL", "https://www.gkd.bayern.de")
 DATA_DIR = Path(__file__).parent.parent / "data" / "current"
 LOG_FILE = Path(__file__).parent.parent / "log.txt"
 
+# Table pages per station, relative to the HND (water level) and GKD
+# (temperature) base URLs. Another gauge is one more entry here.
+STATIONS = {
+    STATION_ID: {
+        'station_name': 'München / Isar',
+        'water_level': f"/pegel/isar/muenchen-{STATION_ID}/tabelle?methode=wasserstand&setdiskr=15",
+        'water_temperature': f"/de/fluesse/wassertemperatur/kelheim/muenchen-{STATION_ID}/messwerte/tabelle",
+    },
+}
+
+DEADLINE_SECONDS = 30
+TIMEOUT_SECONDS = 15
+RETRIES = 3
+
 def log(message):
     """Log message to console and file"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -31,43 +52,41 @@ def log(message):
     except Exception as e:
         print(f"Warning: Could not write to log file: {e}")
 
-def fetch_latest_water_level():
+def build_urls(hnd_base_url=HND_BASE_URL, gkd_base_url=GKD_BASE_URL):
     """
-    Fetch only the latest water level value from HND website
+    {(station_id, data_type): url} for every page to fetch in one run
+    """
+    urls = {}
+    for station_id, pages in STATIONS.items():
+        urls[(station_id, 'water_level')] = hnd_base_url.rstrip('/') + pages['water_level']
+        urls[(station_id, 'water_temperature')] = gkd_base_url.rstrip('/') + pages['water_temperature']
+    return urls
+
+def make_measurement(timestamp, value, data_type, station_id=STATION_ID, fetched_at=None):
+    """
+    One live record (the JSONL format liveData.ts reads)
+    """
+    return jsonl_record(station_id, STATIONS[station_id]['station_name'], data_type, timestamp, value,
+                        fetched_at or datetime.now().isoformat())
+
+def parse_latest_water_level(html, station_id=STATION_ID):
+    """
+    Parse the latest water level value from an HND table page
     """
-    url = f"{HND_BASE_URL}/pegel/isar/muenchen-{STATION_ID}/tabelle?methode=wasserstand&setdiskr=15"
-    
-    log(f"Fetching data from: {url}")
-    
     try:
-        response = requests.get(url, timeout=15, headers={
-            'User-Agent': 'IsarWasser-Monitor/1.0 (educational project)'
-        })
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table')
+        # Get first data row (most recent); parsing stops right after it
+        cols = next(iter_table_rows(html), None)
         
-        if not table:
-            log("ERROR: Could not find data table")
+        if cols is None:
+            log("ERROR: Could not find data rows in table")
             return None
         
-        # Get first data row (most recent)
-        rows = table.find_all('tr')
-        
-        if len(rows) < 2:
-            log("ERROR: No data rows found")
-            return None
-        
-        first_data_row = rows[1]
-        cols = first_data_row.find_all('td')
-        
         if len(cols) < 2:
             log("ERROR: Invalid table structure")
             return None
         
-        date_time_str = cols[0].get_text(strip=True)
-        value_str = cols[1].get_text(strip=True)
+        date_time_str = cols[0]
+        value_str = cols[1]
         
         # Parse date/time (format: "25.01.2026 16:00")
         timestamp = datetime.strptime(date_time_str, "%d.%m.%Y %H:%M")
@@ -75,73 +94,32 @@ def fetch_latest_water_level():
         # Parse value (format: "87" in cm)
         value = int(value_str)
         
-        measurement = {
-            'timestamp': timestamp.isoformat(),
-            'timestamp_unix': int(timestamp.timestamp()),
-            'date': timestamp.strftime('%Y-%m-%d'),
-            'time': timestamp.strftime('%H:%M:%S'),
-            'value_cm': value,
-            'unit': 'cm',
-            'station_id': STATION_ID,
-            'station_name': 'München / Isar',
-            'source': 'hnd.bayern.de',
-            'fetched_at': datetime.now().isoformat()
-        }
+        measurement = make_measurement(timestamp, value, 'water_level', station_id)
         
         log(f"SUCCESS: Fetched latest value: {timestamp.strftime('%Y-%m-%d %H:%M')} = {value} cm")
         
         return measurement
     
-    except requests.exceptions.Timeout:
-        log("ERROR: Request timed out")
-        return None
-    except requests.exceptions.RequestException as e:
-        log(f"ERROR: Request failed: {e}")
-        return None
     except Exception as e:
         log(f"ERROR: Unexpected error: {e}")
         return None
 
-def fetch_latest_water_temperature():
+def parse_latest_water_temperature(html, station_id=STATION_ID):
     """
-    Fetch only the latest water temperature value from GKD website
+    Parse the latest valid water temperature value from a GKD table page
     """
-    url = f"{GKD_BASE_URL}/de/fluesse/wassertemperatur/kelheim/muenchen-{STATION_ID}/messwerte/tabelle"
-    
-    log(f"Fetching temperature data from: {url}")
-    
     try:
-        response = requests.get(url, timeout=15, headers={
-            'User-Agent': 'IsarWasser-Monitor/1.0 (educational project)'
-        })
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        table = soup.find('table')
-        
-        if not table:
-            log("ERROR: Could not find temperature data table")
-            return None
-        
-        # Get all data rows
-        rows = table.find_all('tr')
-        
-        if len(rows) < 2:
-            log("ERROR: No temperature data rows found")
-            return None
-        
-        # Iterate through rows to find first valid measurement (skip header)
-        for row_idx, row in enumerate(rows[1:], start=1):
-            cols = row.find_all('td')
-            
+        # Iterate through data rows to find first valid measurement; parsing
+        # stops at the row that is used
+        for row_idx, cols in enumerate(iter_table_rows(html), start=1):
             if len(cols) < 2:
                 continue
             
-            date_time_str = cols[0].get_text(strip=True)
-            value_str = cols[1].get_text(strip=True).replace(',', '.')
+            date_time_str = cols[0]
+            value_str = cols[1].replace(',', '.')
             
             # Skip missing data
-            if value_str in ['--', '', 'n/a', 'N/A']:
+            if value_str in MISSING_VALUES:
                 if row_idx == 1:
                     log(f"INFO: Most recent measurement has no data ('{value_str}'), checking older measurements...")
                 continue
@@ -165,128 +143,181 @@ def fetch_latest_water_temperature():
                 log(f"INFO: Using measurement from row {row_idx} (most recent data had gaps)")
             break
         else:
-            # No valid measurement found in entire table
+            # No valid measurement found in entire table (or no table)
             log("WARNING: No valid temperature measurements found in table")
             return None
         
-        measurement = {
-            'timestamp': timestamp.isoformat(),
-            'timestamp_unix': int(timestamp.timestamp()),
-            'date': timestamp.strftime('%Y-%m-%d'),
-            'time': timestamp.strftime('%H:%M:%S'),
-            'value_celsius': value,
-            'unit': '°C',
-            'station_id': STATION_ID,
-            'station_name': 'München / Isar',
-            'source': 'gkd.bayern.de',
-            'fetched_at': datetime.now().isoformat()
-        }
+        measurement = make_measurement(timestamp, value, 'water_temperature', station_id)
         
         log(f"SUCCESS: Fetched latest temperature: {timestamp.strftime('%Y-%m-%d %H:%M')} = {value} °C")
         
         return measurement
     
-    except requests.exceptions.Timeout:
-        log("ERROR: Temperature request timed out")
-        return None
-    except requests.exceptions.RequestException as e:
-        log(f"ERROR: Temperature request failed: {e}")
-        return None
     except Exception as e:
         log(f"ERROR: Unexpected temperature fetch error: {e}")
         return None
 
-def save_to_json_log(measurement, data_type='water_level'):
+def parse_table(html, data_type, station_id=STATION_ID):
     """
-    Append measurement to a JSONL (JSON Lines) file - one JSON object per line
+    Parse every row of an HND/GKD table page (backfill mode), oldest first
+    
+    Rows without a value ('--') or with an unparseable date/value are skipped.
     """
-    # Create data directory if it doesn't exist
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    convert = VALUE_TYPES[data_type]
+    fetched_at = datetime.now().isoformat()
+    skipped = []
     
-    # Use daily log files
-    date_str = measurement['date']
-    log_file = DATA_DIR / f"{data_type}_{date_str}.jsonl"
+    measurements = [
+        make_measurement(timestamp, value, data_type, station_id, fetched_at)
+        for timestamp, value in iter_measurements(html, convert, skipped)
+    ]
     
-    try:
-        # Append as single line
-        with open(log_file, 'a', encoding='utf-8') as f:
-            json.dump(measurement, f, ensure_ascii=False)
-            f.write('\n')
-        
-        log(f"Saved to: {log_file}")
-        return True
+    # The pages list the newest row first
+    measurements.sort(key=lambda m: m['timestamp'])
     
-    except Exception as e:
-        log(f"ERROR: Could not save to file: {e}")
-        return False
+    if measurements:
+        log(f"SUCCESS: Parsed {len(measurements)} {data_type} rows "
+            f"({measurements[0]['timestamp']} .. {measurements[-1]['timestamp']}, {len(skipped)} without value)")
+    else:
+        log(f"WARNING: No valid {data_type} rows found in table")
+    
+    return measurements
 
-def check_duplicate(measurement, data_type='water_level'):
-    """
-    Check if this exact measurement already exists (avoid duplicates)
-    """
-    date_str = measurement['date']
-    log_file = DATA_DIR / f"{data_type}_{date_str}.jsonl"
+PARSERS = {
+    'water_level': parse_latest_water_level,
+    'water_temperature': parse_latest_water_temperature,
+}
+
+def _fetch_one(data_type, engine=None):
+    url = build_urls()[(STATION_ID, data_type)]
+    log(f"Fetching data from: {url}")
     
-    if not log_file.exists():
-        return False
+    if engine is None:
+        with FetchEngine(timeout=TIMEOUT_SECONDS, deadline=DEADLINE_SECONDS, retries=RETRIES) as engine:
+            result = engine.fetch(url)
+    else:
+        result = engine.fetch(url)
     
-    try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    existing = json.loads(line)
-                    if existing['timestamp'] == measurement['timestamp']:
-                        # Check value (either value_cm or value_celsius)
-                        if 'value_cm' in measurement and existing.get('value_cm') == measurement['value_cm']:
-                            return True
-                        if 'value_celsius' in measurement and existing.get('value_celsius') == measurement['value_celsius']:
-                            return True
-        return False
+    if not result.ok:
+        log(f"ERROR: Request failed: {result.error}")
+        return None
+    return PARSERS[data_type](result.text)
+
+def fetch_latest_water_level(engine=None):
+    """
+    Fetch only the latest water level value from HND website
+    """
+    return _fetch_one('water_level', engine)
+
+def fetch_latest_water_temperature(engine=None):
+    """
+    Fetch only the latest water temperature value from GKD website
+    """
+    return _fetch_one('water_temperature', engine)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch the latest Isar water level and temperature')
+    parser.add_argument('--hnd-base-url', default=HND_BASE_URL, help='Water level site (default: %(default)s)')
+    parser.add_argument('--gkd-base-url', default=GKD_BASE_URL, help='Water temperature site (default: %(default)s)')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR, help='Where the live store and JSONL files go')
+    parser.add_argument('--live-store', choices=LIVE_STORES, default=DEFAULT_LIVE_STORE,
+                        help='Live store backend, see live_store.py (default: %(default)s, env ISAR_LIVE_STORE)')
+    parser.add_argument('--deadline', type=float, default=DEADLINE_SECONDS,
+                        help='Seconds for all requests together, retries included (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SECONDS,
+                        help='Seconds per request attempt (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=RETRIES,
+                        help='Retries per request on connection errors, timeouts and 429/5xx (default: %(default)s)')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Store every row of the fetched tables (several days of 15-minute values), '
+                             'not only the newest one')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
     
-    except Exception as e:
-        log(f"Warning: Could not check for duplicates: {e}")
-        return False
+    # Stage timings, byte/row counts and peak memory go to the run history (telemetry.py)
+    with Telemetry('fetch', argv=argv) as run:
+        result = run_fetch(args)
+    for line in run.summary():
+        log(line)
+    return result
 
-def main():
+def run_fetch(args):
     log("=" * 80)
     log("Starting Isar data fetch (water level + temperature)")
     
     success_count = 0
     
-    # Fetch water level
-    log("\n--- Fetching Water Level ---")
-    level_measurement = fetch_latest_water_level()
+    urls = build_urls(args.hnd_base_url, args.gkd_base_url)
+    for url in urls.values():
+        log(f"Fetching data from: {url}")
     
-    if level_measurement:
-        if check_duplicate(level_measurement, 'water_level'):
-            log(f"SKIPPED: Water level already exists (timestamp: {level_measurement['timestamp']})")
-        elif save_to_json_log(level_measurement, 'water_level'):
-            log("SUCCESS: Water level saved")
-            success_count += 1
-        else:
-            log("FAILED: Could not save water level")
-    else:
-        log("FAILED: Could not fetch water level")
+    with stage('fetch', requests=len(urls)) as st:
+        with FetchEngine(timeout=args.timeout, deadline=args.deadline, retries=args.retries) as engine:
+            results = engine.fetch_all(urls)
+        fetched = sum(len(r.text.encode('utf-8')) for r in results.values() if r.ok)
+        st.add(bytes_in=fetched, failed=sum(not r.ok for r in results.values()))
+    count(requests=len(urls), bytes_in=fetched)
     
-    # Fetch water temperature
-    log("\n--- Fetching Water Temperature ---")
-    temp_measurement = fetch_latest_water_temperature()
-    
-    if temp_measurement:
-        if check_duplicate(temp_measurement, 'water_temperature'):
-            log(f"SKIPPED: Temperature already exists (timestamp: {temp_measurement['timestamp']})")
-        elif save_to_json_log(temp_measurement, 'water_temperature'):
-            log("SUCCESS: Temperature saved")
-            success_count += 1
-        else:
-            log("FAILED: Could not save temperature")
-    else:
-        log("FAILED: Could not fetch temperature")
+    store = open_live_store(args.live_store, args.data_dir)
+    try:
+        for (station_id, data_type), result in results.items():
+            label = f"{data_type.replace('_', ' ')} ({station_id})"
+            log(f"\n--- {label} ---")
+            
+            if not result.ok:
+                log(f"FAILED: Could not fetch {label}: {result.error} "
+                    f"(attempts: {result.attempts}, {result.elapsed:.1f}s)")
+                continue
+            log(f"Fetched {result.url} in {result.elapsed:.2f}s (attempts: {result.attempts})")
+            
+            if args.backfill:
+                with stage('parse', data_type=data_type, station_id=station_id) as st:
+                    measurements = parse_table(result.text, data_type, station_id)
+                    st.add(rows_out=len(measurements))
+                
+                if not measurements:
+                    log(f"FAILED: Could not parse {label}")
+                    continue
+                try:
+                    with stage('save', data_type=data_type, store=args.live_store) as st:
+                        saved, known = store.save(measurements, data_type)
+                        st.add(rows_in=len(measurements), rows_out=saved)
+                except Exception as e:
+                    log(f"FAILED: Could not save {label}: {e}")
+                    continue
+                count(rows_in=len(measurements), rows_out=saved)
+                log(f"SUCCESS: {label}: {saved} new rows saved, {known} already stored ({args.live_store} store)")
+                success_count += saved
+                continue
+            
+            with stage('parse', data_type=data_type, station_id=station_id):
+                measurement = PARSERS[data_type](result.text, station_id)
+            
+            if not measurement:
+                log(f"FAILED: Could not parse {label}")
+                continue
+            try:
+                with stage('save', data_type=data_type, store=args.live_store) as st:
+                    saved, _ = store.save([measurement], data_type)
+                    st.add(rows_in=1, rows_out=saved)
+            except Exception as e:
+                log(f"FAILED: Could not save {label}: {e}")
+                continue
+            count(rows_in=1, rows_out=saved)
+            if saved:
+                log(f"SUCCESS: {label} saved ({args.live_store} store)")
+                success_count += 1
+            else:
+                log(f"SKIPPED: {label} already exists (timestamp: {measurement['timestamp']})")
+    finally:
+        store.close()
     
     log(f"\nCompleted: {success_count} measurements saved")
     log("=" * 80)
     
-    # Return 0 if at least one succeeded, 1 if both failed
+    # Return 0 if at least one succeeded, 1 if all failed
     return 0 if success_count > 0 else 1
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+HTTP fetching for the live scrapers (fetch_and_store_isar.py)
+
+One requests.Session with a connection pool is shared by all requests, so
+connections to hnd.bayern.de / gkd.bayern.de are kept alive and reused.
+Failed requests (connection errors, timeouts, 429/5xx) are retried with
+exponential backoff and full jitter. fetch_all() issues all requests
+concurrently under one global deadline: no attempt, backoff or wait runs
+past it, so the worst case is the deadline instead of the sum of timeouts.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Dict, Hashable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = 'IsarWasser-Monitor/1.0 (educational project)'
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    """Outcome of one URL: the page text, or the error of the last attempt"""
+    url: str
+    text: Optional[str] = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.text is not None
+
+
+class FetchEngine:
+    """Pooled, retrying, deadline-bound HTTP GETs
+
+    timeout     per-attempt timeout in seconds (capped by the time left)
+    deadline    seconds for a whole fetch()/fetch_all() call
+    retries     extra attempts after the first one
+    backoff     base delay; attempt n waits uniform(0, min(max_backoff, backoff * 2**n))
+    """
+
+    def __init__(self, timeout=15.0, deadline=30.0, retries=3, backoff=0.5,
+                 max_backoff=4.0, max_workers=8, session=None):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_workers = max_workers
+        self.session = session or self._make_session(max_workers)
+        self._random = random.Random()
+        self._random_lock = threading.Lock()
+
+    @staticmethod
+    def _make_session(pool_size):
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        # Retries are done here (deadline-aware), not by urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _jitter(self, attempt):
+        cap = min(self.max_backoff, self.backoff * (2 ** attempt))
+        with self._random_lock:
+            return self._random.uniform(0, cap)
+
+    def fetch(self, url, deadline_at=None, result=None):
+        """GET `url` with retries; never runs past `deadline_at` (time.monotonic())"""
+        if deadline_at is None:
+            deadline_at = time.monotonic() + self.deadline
+        if result is None:
+            result = FetchResult(url=url)
+        started = time.monotonic()
+        for attempt in range(self.retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                result.error = result.error or 'deadline exceeded'
+                break
+            result.attempts = attempt + 1
+            retry = False
+            try:
+                response = self.session.get(url, timeout=min(self.timeout, remaining))
+                result.status = response.status_code
+                if response.status_code in RETRY_STATUS:
+                    result.error = f"HTTP {response.status_code}"
+                    retry = True
+                else:
+                    response.raise_for_status()
+                    result.text = response.text
+                    result.error = None
+            except requests.exceptions.Timeout:
+                result.error = 'request timed out'
+                retry = True
+            except requests.exceptions.ConnectionError as e:
+                result.error = f"connection failed: {e}"
+                retry = True
+            except requests.exceptions.RequestException as e:
+                # 4xx and invalid requests do not get better by retrying
+                result.error = f"request failed: {e}"
+            if not retry or attempt == self.retries:
+                break
+            delay = self._jitter(attempt)
+            if time.monotonic() + delay >= deadline_at:
+                break
+            time.sleep(delay)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def fetch_all(self, urls: Dict[Hashable, str]) -> Dict[Hashable, FetchResult]:
+        """Fetch {key: url} concurrently; keys still running at the deadline get an error result"""
+        if not urls:
+            return {}
+        deadline_at = time.monotonic() + self.deadline
+        pool = ThreadPoolExecutor(max_workers=min(len(urls), self.max_workers))
+        try:
+            # Each request fills its own result, so one cut off by the deadline
+            # still reports its attempts and last error
+            live = {key: FetchResult(url=url) for key, url in urls.items()}
+            futures = {key: pool.submit(self.fetch, url, deadline_at, live[key])
+                       for key, url in urls.items()}
+            wait(futures.values(), timeout=max(0.0, deadline_at - time.monotonic()))
+            results = {}
+            for key, future in futures.items():
+                if future.done():
+                    results[key] = future.result()
+                else:
+                    future.cancel()
+                    last_error = live[key].error
+                    results[key] = replace(live[key], text=None, elapsed=self.deadline,
+                                           error='deadline exceeded' + (f" (last: {last_error})" if last_error else ''))
+            return results
+        finally:
+            # Attempts in flight end by themselves (their timeout is capped by the deadline)
+            pool.shutdown(wait=False, cancel_futures=True)
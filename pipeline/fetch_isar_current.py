@@ -5,11 +5,12 @@ Holt die neuesten Werte von hnd.bayern.de
 """
 
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 import json
 import sys
 
+from html_table import iter_measurements
+
 STATION_ID = "16005701"  # München/Isar
 BASE_URL = "https://www.hnd.bayern.de"
 
@@ -28,46 +29,20 @@ def fetch_current_water_level():
         })
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the data table
-        table = soup.find('table')
-        
-        if not table:
-            print("❌ Error: Could not find data table")
-            return None
-        
-        # Parse table rows
-        rows = table.find_all('tr')
-        
         measurements = []
         
-        for row in rows[1:]:  # Skip header row
-            cols = row.find_all('td')
-            
-            if len(cols) >= 2:
-                date_time_str = cols[0].get_text(strip=True)
-                value_str = cols[1].get_text(strip=True)
-                
-                try:
-                    # Parse date/time (format: "25.01.2026 16:00")
-                    timestamp = datetime.strptime(date_time_str, "%d.%m.%Y %H:%M")
-                    
-                    # Parse value (format: "87" in cm)
-                    value = int(value_str)
-                    
-                    measurements.append({
-                        'timestamp': timestamp.isoformat(),
-                        'timestamp_unix': int(timestamp.timestamp()),
-                        'value_cm': value,
-                        'unit': 'cm',
-                        'station_id': STATION_ID,
-                        'station_name': 'München / Isar',
-                        'source': 'hnd.bayern.de'
-                    })
-                except (ValueError, AttributeError) as e:
-                    # Skip rows that can't be parsed
-                    continue
+        # Rows of the data table ("25.01.2026 16:00", "87" in cm); rows that
+        # can't be parsed are skipped
+        for timestamp, value in iter_measurements(response.text, int):
+            measurements.append({
+                'timestamp': timestamp.isoformat(),
+                'timestamp_unix': int(timestamp.timestamp()),
+                'value_cm': value,
+                'unit': 'cm',
+                'station_id': STATION_ID,
+                'station_name': 'München / Isar',
+                'source': 'hnd.bayern.de'
+            })
         
         if measurements:
             # Sort by timestamp (newest first)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Streaming extraction of the first <table> of an HTML page
+
+The HND/GKD table pages are mostly navigation, scripts and styling around one
+table of (date, value) rows. Instead of building a full BeautifulSoup tree,
+the page is fed in chunks to an html.parser.HTMLParser that only records the
+cell text of the first table and stops at its </table> (or, when the caller
+stops iterating, right after the row it needed).
+
+    for timestamp, value in iter_measurements(html, int):
+        ...
+"""
+
+from datetime import datetime
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 16384
+MISSING_VALUES = ('--', '', 'n/a', 'N/A')
+TIMESTAMP_FORMAT = "%d.%m.%Y %H:%M"
+
+_NODE_BREAK = '\x00'
+
+
+class _TableRowParser(HTMLParser):
+    """Collects the <td> texts of each <tr> in the first table into self.rows"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.done = False
+        self._depth = 0      # nesting level inside the first table
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        self._node_boundary()
+        if tag == 'table':
+            self._depth += 1
+        elif self._depth == 1:
+            # </td> and </tr> are optional in HTML: a new cell/row ends the open one
+            if tag == 'tr':
+                self._end_row()
+                self._row = []
+            elif tag in ('td', 'th') and self._row is not None:
+                self._end_cell()
+                self._cell = [] if tag == 'td' else None
+
+    def handle_endtag(self, tag):
+        if self.done or not self._depth:
+            return
+        self._node_boundary()
+        if tag == 'table':
+            self._depth -= 1
+            if not self._depth:
+                self._end_row()
+                self.done = True
+        elif self._depth == 1:
+            if tag in ('td', 'th'):
+                self._end_cell()
+            elif tag == 'tr':
+                self._end_row()
+
+    def handle_data(self, data):
+        if self._cell is not None and self._depth == 1:
+            self._cell.append(data)
+
+    def _node_boundary(self):
+        # A tag inside a cell ends a text node (text can arrive in several
+        # handle_data calls when it spans two fed chunks)
+        if self._cell:
+            self._cell.append(_NODE_BREAK)
+
+    def _end_cell(self):
+        if self._cell is not None and self._row is not None:
+            # Same text as BeautifulSoup's get_text(strip=True): each text
+            # node stripped, then joined
+            nodes = ''.join(self._cell).split(_NODE_BREAK)
+            self._row.append(''.join(node.strip() for node in nodes))
+        self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        if self._row:
+            self.rows.append(self._row)
+        self._row = None
+
+
+def iter_table_rows(html, chunk_size=CHUNK_SIZE):
+    """
+    Yield the cell texts of each data row (<tr> with <td> cells) of the first table
+
+    Header rows with only <th> cells are skipped. Parsing stops at the end of
+    the table; nothing after it is tokenized.
+    """
+    parser = _TableRowParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        if parser.rows:
+            yield from parser.rows
+            parser.rows.clear()
+        if parser.done:
+            return
+    parser.close()
+    parser._end_row()  # table not closed before the end of the page
+    yield from parser.rows
+
+
+def iter_measurements(html, convert=float, skipped=None):
+    """
+    Yield (timestamp, value) for every row of the first table, in page order
+
+    `convert` turns the value text (decimal comma already replaced) into a
+    number. Rows without a value ('--') or with an unparseable date/value are
+    skipped; pass a list as `skipped` to collect their cell texts.
+    """
+    for cells in iter_table_rows(html):
+        if len(cells) < 2:
+            continue
+        value_str = cells[1].replace(',', '.')
+        if value_str in MISSING_VALUES:
+            if skipped is not None:
+                skipped.append(cells)
+            continue
+        try:
+            yield datetime.strptime(cells[0], TIMESTAMP_FORMAT), convert(value_str)
+        except ValueError:
+            if skipped is not None:
+                skipped.append(cells)
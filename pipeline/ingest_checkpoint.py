@@ -0,0 +1,148 @@
+"""
+Checkpoints of a full ingest rebuild, so an interrupted run resumes where it
+stopped instead of parsing every CSV file again.
+
+    data/parquet/.ingest_checkpoint/station_16005701_water_level_cm/
+        <file key>/chunk-00000.arrow   raw rows of one committed chunk (Arrow IPC)
+        <file key>/state.pickle         progress and partial aggregates of the file
+
+Each CSV file has its own directory (the key is derived from its path). After
+every chunk, ingest_lfu_csv_to_parquet.py commits the chunk's rows and then
+the file's state: the input offset (data lines consumed), the number of chunk
+segments, its TsSpan and its partial aggregates (rollups, records, coverage)
+as of that chunk. Both are written atomically, the state last, so a state
+never refers to rows that are not on disk; segments written after the last
+state are overwritten on resume.
+
+A state is used only if the CSV file still has the size and mtime it was
+read with and the run parses it the same way (engine, quantiles); otherwise
+the file is parsed from the start. Finished files are not read again, an
+unfinished one continues after its last committed line. The outputs are
+written from the segments as in an uninterrupted run (each one swapped in
+atomically), and the checkpoint is removed only after the ingest manifest,
+so a crash while finalizing repeats just the finalization.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+import shutil
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+
+from publish import atomic_path
+
+CHECKPOINT_DIRNAME = ".ingest_checkpoint"
+STATE_FILENAME = "state.pickle"
+# Bumped when the state layout or the pickled aggregators change; older
+# states are then ignored.
+STATE_VERSION = 1
+
+
+def checkpoint_root(out_root: Path) -> Path:
+    return out_root / CHECKPOINT_DIRNAME
+
+
+def _file_key(csv_path: Path) -> str:
+    digest = hashlib.sha1(str(csv_path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return f"{csv_path.stem}.{digest}"
+
+
+class FileCheckpoint:
+    # Committed progress of one CSV file. `partials` is whatever the caller
+    # needs to continue (its aggregators); it is pickled as given. With
+    # durable=False only the chunk segments are written (plainly, no state):
+    # the same code path for a run that is not to be resumed.
+
+    def __init__(
+        self, series_dir: Path, csv_path: Path, options: Dict[str, Any], durable: bool = True
+    ) -> None:
+        st = csv_path.stat()
+        self.dir = series_dir / _file_key(csv_path)
+        self.durable = durable
+        self.identity = {
+            "version": STATE_VERSION,
+            "path": str(csv_path),
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            **options,
+        }
+        self.lines = 0
+        self.chunks = 0
+        self.done = False
+        self.partials: Any = None
+        if durable:
+            self._load()
+
+    def _load(self) -> None:
+        path = self.dir / STATE_FILENAME
+        if not path.exists():
+            return
+        try:
+            with path.open("rb") as f:
+                state = pickle.load(f)
+        except Exception:
+            # Unreadable (e.g. written by an older version): parse the file again.
+            return
+        if state.get("identity") != self.identity:
+            return
+        self.lines = state["lines"]
+        self.chunks = state["chunks"]
+        self.done = state["done"]
+        self.partials = state["partials"]
+
+    @property
+    def resumed(self) -> bool:
+        return self.lines > 0 or self.done
+
+    def chunk_path(self, index: int) -> Path:
+        return self.dir / f"chunk-{index:05d}.arrow"
+
+    def segments(self) -> List[Path]:
+        return [self.chunk_path(i) for i in range(self.chunks)]
+
+    def commit(self, rows: Optional[pa.Table], lines: int, partials: Any, done: bool = False) -> None:
+        # Record `lines` more input lines, their parsed `rows` (may be None or
+        # empty) and the partial aggregates including them.
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if rows is not None and rows.num_rows:
+            path = self.chunk_path(self.chunks)
+            with atomic_path(path) if self.durable else nullcontext(path) as tmp:
+                with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, rows.schema) as writer:
+                    writer.write_table(rows)
+            self.chunks += 1
+        self.lines += lines
+        self.done = done
+        self.partials = partials
+        if not self.durable:
+            return
+        state = {
+            "identity": self.identity,
+            "lines": self.lines,
+            "chunks": self.chunks,
+            "done": self.done,
+            "partials": self.partials,
+        }
+        with atomic_path(self.dir / STATE_FILENAME) as tmp:
+            with tmp.open("wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_segments(paths: List[Path], schema: pa.Schema) -> pa.Table:
+    # Concatenated chunk segments (memory-mapped; copy before the files go).
+    if not paths:
+        return schema.empty_table()
+    return pa.concat_tables([pa.ipc.open_file(pa.memory_map(str(p))).read_all() for p in paths])
+
+
+def remove_checkpoint(series_dir: Path) -> None:
+    shutil.rmtree(series_dir, ignore_errors=True)
+    try:
+        series_dir.parent.rmdir()
+    except OSError:
+        # Other series still have checkpoints (or it is already gone).
+        pass
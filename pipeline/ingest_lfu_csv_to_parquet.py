@@ -2,20 +2,69 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import itertools
 import json
-import os
 import re
-import shutil
-from collections import Counter, defaultdict
-from dataclasses import dataclass
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import pyarrow.parquet as pq
 
+from climatology import update_climatology
+from coverage import CoverageAggregator, update_coverage, write_coverage
+from ingest_checkpoint import (
+    CHECKPOINT_DIRNAME,
+    FileCheckpoint,
+    checkpoint_root,
+    read_segments,
+    remove_checkpoint,
+)
+from publish import publish_tree
+from raw_partitions import (
+    RAW_LAYOUTS,
+    PartitionStreamWriter,
+    RawStreamWriter,
+    raw_file_path,
+    tail_path,
+    has_partitions,
+    merge_into_partitions,
+    newer_partition_rows,
+    read_raw_range,
+    trim_tail,
+    write_partitions,
+    write_raw,
+)
+from records import RecordsAggregator, update_records, write_records
+from rollups import (
+    ROLLUPS,
+    RollupPyramid,
+    RollupStreamWriter,
+    daily_has_quantiles,
+    rollup_path,
+    rollup_window,
+    update_rollups,
+    write_rollups,
+)
+from stations import (
+    DEFAULT_STATION_ID,
+    discover_station_ids,
+    series_name,
+    station_files,
+    write_catalog,
+)
+from telemetry import Telemetry, count, path_bytes, stage
+
 
 @dataclass(frozen=True)
 class StationMeta:
@@ -61,6 +110,12 @@ def find_table_header_line_idx(path: Path) -> int:
 
 
 def parse_station_meta_from_header(path: Path, header_line_idx: int) -> StationMeta:
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        return _station_meta_from_lines(itertools.islice(f, header_line_idx), path)
+
+
+def _station_meta_from_lines(lines: Iterable[str], path: Path) -> StationMeta:
+    # Parse the metadata block (the lines above the "Datum;..." header row).
     raw: Dict[str, str] = {}
     time_ref = ""
     station_name = ""
@@ -71,42 +126,38 @@ def parse_station_meta_from_header(path: Path, header_line_idx: int) -> StationM
     coord_ref: Optional[str] = None
     gauge_zero: Optional[str] = None
 
-    with path.open("r", encoding="utf-8", errors="replace") as f:
-        for _ in range(header_line_idx):
-            line = f.readline()
-            if not line:
-                break
-            line = line.strip()
-            if not line:
-                continue
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
 
-            # Most lines look like: Key:;Value
-            parts = line.split(";")
-            if len(parts) < 2:
-                continue
-            k = _normalize_key(parts[0])
-            v = parts[1].strip().strip('"')
-            if not k:
-                continue
-            raw[k] = v
-
-            if k == "Zeitbezug":
-                time_ref = v
-            elif k == "Messstellen-Name":
-                station_name = v
-            elif k == "Messstellen-Nr.":
-                station_id = int(v) if v else 0
-            elif k == "Gewässer":
-                river = v
-            elif k == "Ostwert":
-                # Example: Ostwert:;693161;Nordwert:;5335716;"ETRS89 / UTM Zone 32N"
-                easting = _parse_int_maybe(v)
-                if len(parts) >= 4 and _normalize_key(parts[2]) == "Nordwert:":
-                    northing = _parse_int_maybe(parts[3].strip().strip('"'))
-                if len(parts) >= 5:
-                    coord_ref = parts[4].strip().strip('"') or None
-            elif k == "Pegelnullpunktshöhe":
-                gauge_zero = v or None
+        # Most lines look like: Key:;Value
+        parts = line.split(";")
+        if len(parts) < 2:
+            continue
+        k = _normalize_key(parts[0])
+        v = parts[1].strip().strip('"')
+        if not k:
+            continue
+        raw[k] = v
+
+        if k == "Zeitbezug":
+            time_ref = v
+        elif k == "Messstellen-Name":
+            station_name = v
+        elif k == "Messstellen-Nr.":
+            station_id = int(v) if v else 0
+        elif k == "Gewässer":
+            river = v
+        elif k == "Ostwert":
+            # Example: Ostwert:;693161;Nordwert:;5335716;"ETRS89 / UTM Zone 32N"
+            easting = _parse_int_maybe(v)
+            if len(parts) >= 4 and _normalize_key(parts[2]) == "Nordwert:":
+                northing = _parse_int_maybe(parts[3].strip().strip('"'))
+            if len(parts) >= 5:
+                coord_ref = parts[4].strip().strip('"') or None
+        elif k == "Pegelnullpunktshöhe":
+            gauge_zero = v or None
 
     if station_id == 0:
         raise RuntimeError(f"Could not parse station id from {path}")
@@ -139,24 +190,74 @@ def detect_parameter_from_header(table_header: List[str]) -> Tuple[str, str]:
     return ("unknown", "")
 
 
-def iter_csv_chunks(
-    path: Path, header_line_idx: int, chunksize: int
-) -> Iterator[pd.DataFrame]:
+@dataclass(frozen=True)
+class LfuCsvFile:
+    # Everything above the first data row of an LfU export, read in one pass.
+    path: Path
+    station: StationMeta
+    table_header: List[str]
+    parameter: str
+    unit: str
+    header_line_idx: int
+    # Byte offset of the first data row; the data readers seek straight here.
+    data_offset: int
+
+    @classmethod
+    def read(cls, path: Path) -> "LfuCsvFile":
+        meta_lines: List[str] = []
+        offset = 0
+        with path.open("rb") as f:
+            for idx, raw_line in enumerate(f):
+                offset += len(raw_line)
+                line = raw_line.decode("utf-8", errors="replace")
+                if LFU_HEADER_ROW_RE.match(line.strip()):
+                    table_header = next(csv.reader([line.strip()], delimiter=";"))
+                    parameter, unit = detect_parameter_from_header(table_header)
+                    return cls(
+                        path=path,
+                        station=_station_meta_from_lines(meta_lines, path),
+                        table_header=table_header,
+                        parameter=parameter,
+                        unit=unit,
+                        header_line_idx=idx,
+                        data_offset=offset,
+                    )
+                meta_lines.append(line)
+        raise RuntimeError(f"Could not find table header row (Datum;...) in {path}")
+
+    def skip_lines(self, lines: int) -> "LfuCsvFile":
+        # The same file with the data readers starting `lines` data lines
+        # further on; blank lines are not counted, as the readers skip them.
+        with self.path.open("rb") as f:
+            f.seek(self.data_offset)
+            skipped = 0
+            while skipped < lines:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    skipped += 1
+            return replace(self, data_offset=f.tell())
+
+
+def iter_csv_chunks(lfu: LfuCsvFile, chunksize: int) -> Iterator[pd.DataFrame]:
     # Read the LfU CSV table portion as chunks.
     # LfU format uses semicolon delimiter, decimal comma, and quotes around datetime.
-    for chunk in pd.read_csv(
-        path,
-        sep=";",
-        skiprows=header_line_idx,
-        header=0,
-        encoding="utf-8",
-        decimal=",",
-        dtype=str,
-        chunksize=chunksize,
-        na_values=["", " "],
-        keep_default_na=True,
-    ):
-        yield chunk
+    with lfu.path.open("rb") as f:
+        f.seek(lfu.data_offset)
+        for chunk in pd.read_csv(
+            f,
+            sep=";",
+            header=None,
+            names=lfu.table_header,
+            encoding="utf-8",
+            decimal=",",
+            dtype=str,
+            chunksize=chunksize,
+            na_values=["", " "],
+            keep_default_na=True,
+        ):
+            yield chunk
 
 
 def ensure_dir(p: Path) -> None:
@@ -191,26 +292,342 @@ def _normalize_status(series: pd.Series) -> pd.Series:
     )
 
 
-def _write_raw_parquet(
-    writer: pq.ParquetWriter,
-    df: pd.DataFrame,
-    station: StationMeta,
-    parameter: str,
-) -> None:
-    table = pa.Table.from_pandas(
-        df,
-        schema=pa.schema(
-            [
-                ("station_id", pa.int32()),
-                ("parameter", pa.string()),
-                ("ts", pa.timestamp("ns")),
-                ("value", pa.float64()),
-                ("status", pa.string()),
-            ]
-        ),
-        preserve_index=False,
+RAW_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int32()),
+        ("parameter", pa.string()),
+        ("ts", pa.timestamp("ns")),
+        ("value", pa.float64()),
+        ("status", pa.string()),
+    ]
+)
+
+ENGINES = ("pandas", "arrow")
+
+# Status labels that mean "no status" (the pandas engine sees these after astype(str)).
+_NULL_STATUS = {"", "nan", "None"}
+
+
+def iter_pandas_chunks(
+    lfu: LfuCsvFile, station_id: int, chunksize: int
+) -> Iterator[Tuple[int, pa.RecordBatch]]:
+    parameter = lfu.parameter
+    for chunk in iter_csv_chunks(lfu, chunksize):
+        # Expected columns: Datum, <value>, Prüfstatus
+        cols = list(chunk.columns)
+        if len(cols) < 3:
+            yield len(chunk), pa.RecordBatch.from_pylist([], schema=RAW_SCHEMA)
+            continue
+
+        df = pd.DataFrame(
+            {
+                "station_id": station_id,
+                "parameter": parameter,
+                "ts": _parse_ts(chunk[cols[0]]),
+                "value": _to_float(chunk[cols[1]]),
+                "status": _normalize_status(chunk[cols[2]]),
+            }
+        )
+        df = df.dropna(subset=["ts"])
+        yield len(chunk), pa.RecordBatch.from_pandas(df, schema=RAW_SCHEMA, preserve_index=False)
+
+
+def _normalize_status_dictionary(status: pa.DictionaryArray) -> pa.DictionaryArray:
+    # Same normalization as _normalize_status, applied to the (tiny) dictionary
+    # instead of every cell. Labels that collapse onto each other are re-unified.
+    labels = [
+        None if v is None or v.strip() in _NULL_STATUS else v.strip().replace("Geprüft", "Geprueft")
+        for v in status.dictionary.to_pylist()
+    ]
+    uniq = sorted({v for v in labels if v is not None})
+    remap = np.array([uniq.index(v) if v is not None else -1 for v in labels], dtype=np.int32)
+    if len(remap):
+        codes = remap[status.indices.fill_null(0).to_numpy()]
+    else:
+        codes = np.full(len(status), -1, dtype=np.int32)
+    mask = (codes < 0) | status.is_null().to_numpy(zero_copy_only=False)
+    return pa.DictionaryArray.from_arrays(
+        pa.array(np.where(mask, 0, codes).astype(np.int32), mask=mask),
+        pa.array(uniq, type=pa.string()),
     )
-    writer.write_table(table)
+
+
+def iter_arrow_chunks(
+    lfu: LfuCsvFile, station_id: int, chunksize: int
+) -> Iterator[Tuple[int, pa.RecordBatch]]:
+    # Streaming reader on pyarrow.csv: the decimal comma is handled by the
+    # converter, Prüfstatus is dictionary-encoded and no pandas objects are built.
+    ts_col, value_col, status_col = lfu.table_header[:3]
+    with lfu.path.open("rb") as f:
+        f.seek(lfu.data_offset)
+        reader = pacsv.open_csv(
+            f,
+            read_options=pacsv.ReadOptions(
+                column_names=lfu.table_header,
+                # Roughly `chunksize` rows per batch (LfU rows are ~30 bytes).
+                block_size=max(1 << 20, chunksize * 32),
+            ),
+            parse_options=pacsv.ParseOptions(delimiter=";"),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=[ts_col, value_col, status_col],
+                column_types={
+                    ts_col: pa.string(),
+                    value_col: pa.float64(),
+                    status_col: pa.dictionary(pa.int32(), pa.string()),
+                },
+                decimal_point=",",
+            ),
+        )
+        for batch in reader:
+            # Parse with an explicit format; unparsable timestamps become null and
+            # are dropped, like errors="coerce" in the pandas engine.
+            ts = pc.strptime(
+                batch.column(ts_col), format="%Y-%m-%d %H:%M", unit="ns", error_is_null=True
+            )
+            lines = batch.num_rows
+            valid = pc.is_valid(ts)
+            n_valid = pc.sum(valid).as_py() or 0
+            if n_valid == 0:
+                yield lines, pa.RecordBatch.from_pylist([], schema=RAW_SCHEMA)
+                continue
+            if n_valid < len(ts):
+                batch = batch.filter(valid)
+                ts = ts.filter(valid)
+            status = _normalize_status_dictionary(batch.column(status_col))
+            yield lines, pa.RecordBatch.from_arrays(
+                [
+                    pa.repeat(pa.scalar(station_id, pa.int32()), n_valid),
+                    pa.repeat(pa.scalar(lfu.parameter, pa.string()), n_valid),
+                    ts,
+                    batch.column(value_col),
+                    status.dictionary_decode(),
+                ],
+                schema=RAW_SCHEMA,
+            )
+
+
+def iter_file_chunks(
+    lfu: LfuCsvFile, station_id: int, chunksize: int, engine: str
+) -> Iterator[Tuple[int, pa.RecordBatch]]:
+    # (data lines read, parsed rows) per chunk; rows whose ts does not parse
+    # are dropped, so a chunk may have fewer rows than lines (or none).
+    if engine == "arrow":
+        return iter_arrow_chunks(lfu, station_id, chunksize)
+    return iter_pandas_chunks(lfu, station_id, chunksize)
+
+
+def iter_file_batches(
+    lfu: LfuCsvFile, station_id: int, chunksize: int, engine: str
+) -> Iterator[pa.RecordBatch]:
+    return (batch for _, batch in iter_file_chunks(lfu, station_id, chunksize, engine))
+
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+
+@dataclass
+class TsSpan:
+    # Row count and ts range of the rows ingested from one file.
+    rows: int = 0
+    ts_min: Optional[int] = None  # ns since epoch
+    ts_max: Optional[int] = None
+
+    def update(self, batch: pa.RecordBatch) -> None:
+        if batch.num_rows == 0:
+            return
+        mm = pc.min_max(batch.column("ts").cast(pa.int64()))
+        lo, hi = mm["min"].as_py(), mm["max"].as_py()
+        self.rows += batch.num_rows
+        self.ts_min = lo if self.ts_min is None else min(self.ts_min, lo)
+        self.ts_max = hi if self.ts_max is None else max(self.ts_max, hi)
+
+
+def _ns_to_iso(ns: Optional[int]) -> Optional[str]:
+    return None if ns is None else str(np.datetime64(ns, "ns").astype("datetime64[s]"))
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    ts_min: Optional[str]
+    ts_max: Optional[str]
+    rows: int
+
+    @classmethod
+    def for_file(cls, path: Path, span: TsSpan, sha256: Optional[str] = None) -> "ManifestEntry":
+        st = path.stat()
+        return cls(
+            path=str(path),
+            size=st.st_size,
+            mtime=st.st_mtime,
+            sha256=sha256 or _sha256(path),
+            ts_min=_ns_to_iso(span.ts_min),
+            ts_max=_ns_to_iso(span.ts_max),
+            rows=span.rows,
+        )
+
+
+def manifest_key(station_id: Any, parameter: str) -> str:
+    return f"{station_id}/{parameter}"
+
+
+def load_manifest(path: Path) -> Dict[str, List[ManifestEntry]]:
+    # Returns {"<station id>/<parameter>": [entries]}; empty if there is no
+    # (readable) manifest. Single-station manifests were keyed by parameter
+    # only; their station id is taken from the input file names.
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        groups = {}
+        for key, entries in data.get("groups", {}).items():
+            entries = [ManifestEntry(**e) for e in entries]
+            if "/" not in key and entries:
+                key = manifest_key(Path(entries[0].path).name.split("_")[0], key)
+            groups[key] = entries
+        return groups
+    except (ValueError, TypeError) as e:
+        print(f"Warning: ignoring unreadable manifest {path}: {e}")
+        return {}
+
+
+def write_manifest(path: Path, groups: Dict[str, List[ManifestEntry]]) -> None:
+    data = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "groups": {p: [asdict(e) for e in entries] for p, entries in groups.items()},
+    }
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    station: StationMeta
+    parameter: str
+    files: List[ManifestEntry]
+
+
+def _dedupe_last_by_ts(table: pa.Table) -> pa.Table:
+    # Sort by ts (stable) and keep the last row for every ts. Every ingest mode
+    # stores one row per ts: for a ts delivered by several (overlapping) files
+    # the last file's row, as migrate_live_to_parquet does for live rows.
+    table = table.take(pc.sort_indices(table, sort_keys=[("ts", "ascending")]))
+    ts = table.column("ts").cast(pa.int64()).to_numpy()
+    keep = np.r_[ts[1:] != ts[:-1], True] if len(ts) else np.empty(0, dtype=bool)
+    return table.filter(pa.array(keep))
+
+
+def _aggregate(
+    table: pa.Table, daily_quantiles: bool = False
+) -> Tuple[RollupPyramid, RecordsAggregator, CoverageAggregator]:
+    rollups = RollupPyramid(quantiles=daily_quantiles)
+    records = RecordsAggregator()
+    coverage = CoverageAggregator()
+    for batch in table.to_batches():
+        rollups.add_batch(batch)
+        records.add_batch(batch)
+        coverage.add_batch(batch)
+    return rollups, records, coverage
+
+
+Partials = Tuple[RollupPyramid, RecordsAggregator, CoverageAggregator, TsSpan]
+
+
+def _ingest_file_segment(
+    lfu: LfuCsvFile,
+    station_id: int,
+    checkpoint: FileCheckpoint,
+    chunksize: int,
+    engine: str,
+    daily_quantiles: bool = False,
+) -> Tuple[Partials, List[Path]]:
+    # Parse one CSV file (in a worker process for a parallel ingest) into
+    # checkpointed Arrow IPC segments, one per chunk, and return its partial
+    # rollups, records, coverage and span with the segment paths. A file
+    # checkpointed by an earlier run continues after its last committed chunk.
+    # The span is stored as a dict: TsSpan may live in __main__, which a later
+    # run (or a worker process) cannot unpickle.
+    if checkpoint.resumed:
+        rollups, records, coverage, span_fields = checkpoint.partials
+        span = TsSpan(**span_fields)
+        if checkpoint.done:
+            return (rollups, records, coverage, span), checkpoint.segments()
+        lfu = lfu.skip_lines(checkpoint.lines)
+    else:
+        rollups = RollupPyramid(quantiles=daily_quantiles)
+        records = RecordsAggregator()
+        coverage = CoverageAggregator()
+        span = TsSpan()
+    for lines, batch in iter_file_chunks(lfu, station_id, chunksize, engine):
+        rollups.add_batch(batch)
+        records.add_batch(batch)
+        coverage.add_batch(batch)
+        span.update(batch)
+        checkpoint.commit(
+            pa.Table.from_batches([batch], schema=RAW_SCHEMA), lines, (rollups, records, coverage, asdict(span))
+        )
+    checkpoint.commit(None, 0, (rollups, records, coverage, asdict(span)), done=True)
+    return (rollups, records, coverage, span), checkpoint.segments()
+
+
+def _ingest_files(
+    lfu_files: List[LfuCsvFile],
+    station_id: int,
+    checkpoint_dir: Optional[Path],
+    tmp_dir: Path,
+    *,
+    chunksize: int,
+    engine: str,
+    executor: Optional[Executor] = None,
+    daily_quantiles: bool = False,
+) -> Tuple[pa.Table, RollupPyramid, RecordsAggregator, CoverageAggregator, List[TsSpan], int]:
+    # Returns the raw rows (deduplicated by ts), the merged aggregates (over
+    # every parsed row), a span per file and the number of files resumed from
+    # checkpoint_dir. Without a checkpoint_dir the
+    # segments go to a temporary directory under tmp_dir.
+    rollups = RollupPyramid(quantiles=daily_quantiles)
+    records = RecordsAggregator()
+    coverage = CoverageAggregator()
+    spans: List[TsSpan] = []
+    durable = checkpoint_dir is not None
+    with ExitStack() as stack:
+        if checkpoint_dir is None:
+            checkpoint_dir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix=".ingest.", dir=tmp_dir)))
+        options = {"engine": engine, "daily_quantiles": daily_quantiles, "station_id": station_id}
+        checkpoints = [FileCheckpoint(checkpoint_dir, lfu.path, options, durable) for lfu in lfu_files]
+        resumed = sum(cp.resumed for cp in checkpoints)
+        args = [
+            (lfu, station_id, cp, chunksize, engine, daily_quantiles)
+            for lfu, cp in zip(lfu_files, checkpoints)
+        ]
+        if executor is not None:
+            futures = [executor.submit(_ingest_file_segment, *a) for a in args]
+            results = (fut.result() for fut in futures)
+        else:
+            results = (_ingest_file_segment(*a) for a in args)
+        # Merge in file order so the rollups do not depend on the worker count.
+        segments: List[Path] = []
+        for (file_rollups, file_records, file_coverage, span), file_segments in results:
+            rollups.merge(file_rollups)
+            records.merge(file_records)
+            coverage.merge(file_coverage)
+            spans.append(span)
+            segments.extend(file_segments)
+
+        # Stitch the segments into one table sorted by ts with one row per ts
+        # (the last file's); take() copies out of the memory maps.
+        table = _dedupe_last_by_ts(read_segments(segments, RAW_SCHEMA))
+    return table, rollups, records, coverage, spans, resumed
 
 
 def ingest_group(
@@ -219,162 +636,440 @@ def ingest_group(
     out_daily_parquet: Path,
     *,
     chunksize: int,
-) -> StationMeta:
+    engine: str = "pandas",
+    executor: Optional[Executor] = None,
+    raw_layout: str = "file",
+    daily_quantiles: bool = False,
+    checkpoint_dir: Optional[Path] = None,
+) -> IngestResult:
+    # With an executor, files are parsed in parallel; without one, in order.
+    # Either way the raw output is sorted by ts with one row per ts (the last
+    # file's, see _dedupe_last_by_ts) and written with the raw profile (see
+    # write_raw).
+    # With raw_layout="partitioned" the raw rows end up in year partitions under
+    # out_raw_parquet's directory instead of in out_raw_parquet itself. Besides
+    # out_daily_parquet, the other rollups, the day-of-year climatology, the
+    # records and the gap/coverage tables are written next to it (rollups.py,
+    # climatology.py, records.py, coverage.py).
+    # daily_quantiles adds p10/p50/p90/stddev columns to the daily rollup.
+    # With a checkpoint_dir, parse progress is kept under
+    # checkpoint_dir/<series> (ingest_checkpoint.py) and an interrupted run
+    # resumes from it; the caller removes it once the run is complete.
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if raw_layout not in RAW_LAYOUTS:
+        raise ValueError(f"Unknown raw layout: {raw_layout}")
     if not csv_files:
         raise RuntimeError("No CSV files to ingest.")
 
     ensure_dir(out_raw_parquet.parent)
     ensure_dir(out_daily_parquet.parent)
 
+    # One pass over each file's metadata block; the data readers seek past it.
+    with stage("read_meta") as st:
+        lfu_files = [LfuCsvFile.read(p) for p in csv_files]
+        st.add(files=len(lfu_files))
+
     # We use the first file as canonical metadata for the group.
-    first_header_idx = find_table_header_line_idx(csv_files[0])
-    station = parse_station_meta_from_header(csv_files[0], first_header_idx)
-
-    # Rolling daily aggregates keyed by date (YYYY-MM-DD).
-    daily_sum: Dict[str, float] = defaultdict(float)
-    daily_count: Dict[str, int] = defaultdict(int)
-    daily_min: Dict[str, float] = {}
-    daily_max: Dict[str, float] = {}
-    daily_status_counts: Dict[str, Counter[str]] = defaultdict(Counter)
-
-    writer: Optional[pq.ParquetWriter] = None
-    schema = pa.schema(
-        [
-            ("station_id", pa.int32()),
-            ("parameter", pa.string()),
-            ("ts", pa.timestamp("ns")),
-            ("value", pa.float64()),
-            ("status", pa.string()),
-        ]
+    station = lfu_files[0].station
+    # Use parameter name from first file header (assumes consistent group).
+    parameter = lfu_files[0].parameter
+    series = series_name(station.station_id, parameter)
+    bytes_in = sum(p.stat().st_size for p in csv_files)
+
+    # Parsing and the incremental aggregation (rollups, records, coverage) are
+    # one pass.
+    with stage("parse", series=series, parallel=executor is not None) as st:
+        raw, rollups, records, coverage, spans, resumed = _ingest_files(
+            lfu_files,
+            station.station_id,
+            checkpoint_dir / series if checkpoint_dir is not None else None,
+            out_raw_parquet.parent,
+            chunksize=chunksize,
+            engine=engine,
+            executor=executor,
+            daily_quantiles=daily_quantiles,
+        )
+        if resumed:
+            print(f"Resuming {series}: {resumed} of {len(lfu_files)} file(s) from checkpoint")
+            st.add(resumed_files=resumed)
+        if raw.num_rows < sum(span.rows for span in spans):
+            # Overlapping files delivered some ts more than once; the aggregates
+            # were fed every parsed row, so rebuild them from the rows kept.
+            rollups, records, coverage = _aggregate(raw, daily_quantiles)
+        st.add(files=len(lfu_files), rows_in=raw.num_rows, bytes_in=bytes_in)
+    count(files=len(lfu_files), rows_in=raw.num_rows, bytes_in=bytes_in)
+
+    if raw_layout == "partitioned":
+        with stage("keep_live", series=series) as st:
+            # Live rows merged by migrate_live_to_parquet after the CSV rows
+            # stay, as the tail does in the file layout; older ones are
+            # replaced by the rebuild.
+            csv_max = pc.max(raw.column("ts")).as_py() if raw.num_rows else None
+            live = newer_partition_rows(out_raw_parquet.parent, parameter, RAW_SCHEMA, csv_max)
+            st.add(rows_in=live.num_rows)
+
+    with stage("write_raw", series=series, layout=raw_layout) as st:
+        if raw_layout == "partitioned":
+            write_partitions(out_raw_parquet.parent, parameter, pa.concat_tables([raw, live]))
+            raw_bytes = path_bytes(out_raw_parquet.parent / f"parameter={parameter}")
+        else:
+            write_raw(raw, out_raw_parquet)
+            raw_bytes = path_bytes(out_raw_parquet)
+        st.add(rows_out=raw.num_rows, bytes_out=raw_bytes)
+    count(rows_out=raw.num_rows, bytes_out=raw_bytes)
+
+    if raw_layout == "file":
+        with stage("trim_tail", series=series) as st:
+            # Live rows appended by migrate_live_to_parquet that the rebuilt base
+            # now covers are dropped from the tail segment.
+            trim_tail(out_raw_parquet, RAW_SCHEMA)
+            live = pq.read_table(tail_path(out_raw_parquet), schema=RAW_SCHEMA)
+            st.add(rows_in=live.num_rows)
+    # The kept live rows are part of the series the rollups describe.
+    for batch in live.to_batches():
+        rollups.add_batch(batch)
+        records.add_batch(batch)
+        coverage.add_batch(batch)
+
+    with stage("rollups", series=series) as st:
+        paths = write_rollups(rollups.finalize(station.station_id, parameter), out_daily_parquet)
+        st.add(files=len(paths), bytes_out=sum(path_bytes(p) for p in paths))
+    with stage("climatology", series=series) as st:
+        st.add(bytes_out=path_bytes(update_climatology(out_daily_parquet, station.station_id, parameter)))
+    with stage("records", series=series) as st:
+        path = write_records(records.finalize(station.station_id, parameter), out_daily_parquet)
+        st.add(bytes_out=path_bytes(path))
+    with stage("coverage", series=series) as st:
+        paths = write_coverage(coverage.finalize(station.station_id, parameter), out_daily_parquet)
+        st.add(bytes_out=sum(path_bytes(p) for p in paths))
+    return IngestResult(
+        station=station,
+        parameter=parameter,
+        files=[ManifestEntry.for_file(p, span) for p, span in zip(csv_files, spans)],
     )
 
-    try:
-        writer = pq.ParquetWriter(out_raw_parquet, schema=schema, compression="zstd")
-
-        for csv_path in csv_files:
-            header_line_idx = find_table_header_line_idx(csv_path)
-            # Determine parameter from the header row itself.
-            with csv_path.open("r", encoding="utf-8", errors="replace") as f:
-                for _ in range(header_line_idx):
-                    f.readline()
-                header_line = f.readline().strip()
-            table_header = next(csv.reader([header_line], delimiter=";"))
-            parameter, _unit = detect_parameter_from_header(table_header)
-
-            for chunk in iter_csv_chunks(csv_path, header_line_idx, chunksize):
-                # Expected columns: Datum, <value>, Prüfstatus
-                cols = list(chunk.columns)
-                if len(cols) < 3:
-                    continue
 
-                df = pd.DataFrame(
-                    {
-                        "station_id": station.station_id,
-                        "parameter": parameter,
-                        "ts": _parse_ts(chunk[cols[0]]),
-                        "value": _to_float(chunk[cols[1]]),
-                        "status": _normalize_status(chunk[cols[2]]),
-                    }
-                )
-                df = df.dropna(subset=["ts"])
-
-                # Write raw
-                _write_raw_parquet(writer, df, station, parameter)
-
-                # Update daily
-                # Exclude NaN values from aggregates.
-                df2 = df.dropna(subset=["value"]).copy()
-                if df2.empty:
-                    # Still track status distribution per day where possible
-                    df_status = df.dropna(subset=["status"]).copy()
-                    if not df_status.empty:
-                        df_status["date"] = df_status["ts"].dt.strftime("%Y-%m-%d")
-                        for date, grp in df_status.groupby("date"):
-                            daily_status_counts[date].update(grp["status"].dropna().tolist())
-                    continue
+def _catalog_row(results: List[IngestResult]) -> Dict[str, Any]:
+    # stations.parquet row for one station from the results of its groups.
+    meta = results[0].station
+    ts = [
+        pd.Timestamp(t)
+        for r in results
+        for e in r.files
+        for t in (e.ts_min, e.ts_max)
+        if t is not None
+    ]
+    return {
+        "station_id": meta.station_id,
+        "station_name": meta.station_name,
+        "river": meta.river,
+        "time_ref": meta.time_ref,
+        "easting": meta.easting,
+        "northing": meta.northing,
+        "coord_ref": meta.coord_ref,
+        "gauge_zero": meta.gauge_zero,
+        "parameters": sorted(r.parameter for r in results),
+        "ts_min": min(ts) if ts else None,
+        "ts_max": max(ts) if ts else None,
+    }
+
+
+def _first_ts(lfu: LfuCsvFile, station_id: int) -> Optional[int]:
+    # ts (ns since epoch) of the first data row; LfU files are ordered by time.
+    for _, batch in iter_pandas_chunks(lfu, station_id, 64):
+        if batch.num_rows:
+            return batch.column("ts").cast(pa.int64())[0].as_py()
+    return None
+
+
+def _split_before(batches: List[pa.RecordBatch], cutoff: int) -> Tuple[pa.Table, pa.Table]:
+    # Sort the pending rows by ts, keep the last arrival of every ts and split
+    # them into rows before `cutoff` (ns) and the rest.
+    table = _dedupe_last_by_ts(pa.Table.from_batches(batches, schema=RAW_SCHEMA))
+    n = int(np.searchsorted(table.column("ts").cast(pa.int64()).to_numpy(), cutoff))
+    return table.slice(0, n), table.slice(n)
+
+
+def ingest_group_bounded(
+    csv_files: List[Path],
+    out_raw_parquet: Path,
+    out_daily_parquet: Path,
+    *,
+    chunksize: int,
+    engine: str = "pandas",
+    raw_layout: str = "file",
+    daily_quantiles: bool = False,
+) -> IngestResult:
+    # ingest_group with memory bounded by `chunksize` instead of the length of
+    # the history. LfU files are ordered by time: once the current file has
+    # reached ts T and no file still to come starts before T, no row before T
+    # can arrive any more. Whenever T crosses a month boundary, the raw rows of
+    # the finished months and every finished rollup period are written through
+    # streaming writers and dropped. Outputs match ingest_group; a row that
+    # arrives after its month was written (a file not ordered by time) aborts
+    # the run and leaves the previous outputs in place.
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if raw_layout not in RAW_LAYOUTS:
+        raise ValueError(f"Unknown raw layout: {raw_layout}")
+    if not csv_files:
+        raise RuntimeError("No CSV files to ingest.")
 
-                df2["date"] = df2["ts"].dt.strftime("%Y-%m-%d")
-                for date, grp in df2.groupby("date"):
-                    vals = grp["value"].astype("float64")
-                    daily_sum[date] += float(vals.sum())
-                    daily_count[date] += int(vals.count())
-                    vmin = float(vals.min())
-                    vmax = float(vals.max())
-                    if date not in daily_min:
-                        daily_min[date] = vmin
-                        daily_max[date] = vmax
-                    else:
-                        daily_min[date] = min(daily_min[date], vmin)
-                        daily_max[date] = max(daily_max[date], vmax)
-                    daily_status_counts[date].update(grp["status"].dropna().tolist())
-    finally:
-        if writer is not None:
-            writer.close()
-
-    # Build daily table
-    dates = sorted(daily_count.keys())
-    daily_rows: List[Dict[str, Any]] = []
+    ensure_dir(out_raw_parquet.parent)
+    ensure_dir(out_daily_parquet.parent)
 
-    # Use parameter name from first file header (assumes consistent group).
-    with csv_files[0].open("r", encoding="utf-8", errors="replace") as f:
-        for _ in range(find_table_header_line_idx(csv_files[0])):
-            f.readline()
-        header_line = f.readline().strip()
-    table_header = next(csv.reader([header_line], delimiter=";"))
-    parameter, _unit = detect_parameter_from_header(table_header)
-
-    for d in dates:
-        cnt = daily_count[d]
-        if cnt <= 0:
-            continue
-        stat_counter = daily_status_counts.get(d) or Counter()
-        mode_status = stat_counter.most_common(1)[0][0] if stat_counter else None
-        daily_rows.append(
-            {
-                "station_id": station.station_id,
-                "parameter": parameter,
-                "date": datetime.strptime(d, "%Y-%m-%d").date(),
-                "count": cnt,
-                "mean": float(daily_sum[d] / cnt),
-                "min": float(daily_min[d]),
-                "max": float(daily_max[d]),
-                "status_mode": mode_status,
-            }
+    with stage("read_meta") as st:
+        lfu_files = [LfuCsvFile.read(p) for p in csv_files]
+        st.add(files=len(lfu_files))
+    station = lfu_files[0].station
+    parameter = lfu_files[0].parameter
+    station_id = station.station_id
+    series = series_name(station_id, parameter)
+    starts = [_first_ts(lfu, station_id) for lfu in lfu_files]
+
+    rollups = RollupPyramid(quantiles=daily_quantiles)
+    records = RecordsAggregator()
+    coverage = CoverageAggregator()
+    spans = [TsSpan() for _ in lfu_files]
+    if raw_layout == "partitioned":
+        # Live rows after the CSV rows must survive the rebuild (see
+        # ingest_group). The CSV rows end no earlier than the last file starts,
+        # so only rows after that are kept aside before the partitions go.
+        known = [t for t in starts if t is not None]
+        live = newer_partition_rows(
+            out_raw_parquet.parent, parameter, RAW_SCHEMA, max(known) if known else None
         )
-
-    daily_df = pd.DataFrame(daily_rows)
-    daily_table = pa.Table.from_pandas(
-        daily_df,
-        schema=pa.schema(
-            [
-                ("station_id", pa.int32()),
-                ("parameter", pa.string()),
-                ("date", pa.date32()),
-                ("count", pa.int32()),
-                ("mean", pa.float64()),
-                ("min", pa.float64()),
-                ("max", pa.float64()),
-                ("status_mode", pa.string()),
-            ]
-        ),
-        preserve_index=False,
+        raw_writer = PartitionStreamWriter(out_raw_parquet.parent, parameter, RAW_SCHEMA)
+    else:
+        raw_writer = RawStreamWriter(out_raw_parquet, RAW_SCHEMA)
+
+    # Parsing, aggregation and the streamed raw/rollup writes are interleaved,
+    # so the bounded ingest is one stage up to the remaining rollups.
+    bytes_in = sum(p.stat().st_size for p in csv_files)
+    with stage("parse_stream", series=series, layout=raw_layout) as st, RollupStreamWriter(
+        out_daily_parquet, quantiles=daily_quantiles
+    ) as rollup_writer:
+        with raw_writer:
+            pending: List[pa.RecordBatch] = []
+            rows_out = 0
+            written_month: Optional[np.datetime64] = None  # all rows before it are written
+            for i, (lfu, span) in enumerate(zip(lfu_files, spans)):
+                upcoming = [t for t in starts[i + 1 :] if t is not None]
+                for batch in iter_file_batches(lfu, station_id, chunksize, engine):
+                    if batch.num_rows == 0:
+                        continue
+                    lo = pc.min(batch.column("ts").cast(pa.int64())).as_py()
+                    if written_month is not None and np.datetime64(lo, "ns") < written_month:
+                        raise RuntimeError(
+                            f"{lfu.path.name}: rows from {_ns_to_iso(lo)} arrive after "
+                            f"{written_month - 1} was written; the input is not ordered by time "
+                            "(ingest without --bounded-memory)"
+                        )
+                    pending.append(batch)
+                    span.update(batch)
+                    st.add(rows_in=batch.num_rows)
+
+                    safe = np.datetime64(min([span.ts_max] + upcoming), "ns").astype("datetime64[M]")
+                    if written_month is None or safe > written_month:
+                        # Rows are aggregated when they are final, i.e. once
+                        # the duplicates of their ts are known (and dropped).
+                        done, rest = _split_before(pending, int(safe.astype("datetime64[ns]").astype(np.int64)))
+                        for part in done.to_batches():
+                            rollups.add_batch(part)
+                            records.add_batch(part)
+                            coverage.add_batch(part)
+                        raw_writer.write(done)
+                        rows_out += done.num_rows
+                        rollup_writer.write(rollups.flush(safe, station_id, parameter))
+                        pending = rest.to_batches()
+                        written_month = safe
+            if pending:
+                done = _dedupe_last_by_ts(pa.Table.from_batches(pending, schema=RAW_SCHEMA))
+                for part in done.to_batches():
+                    rollups.add_batch(part)
+                    records.add_batch(part)
+                    coverage.add_batch(part)
+                raw_writer.write(done)
+                rows_out += done.num_rows
+            if raw_layout == "partitioned":
+                known = [span.ts_max for span in spans if span.ts_max is not None]
+                if known:
+                    cutoff = pa.scalar(max(known), type=RAW_SCHEMA.field("ts").type)
+                    live = live.filter(pc.greater(live.column("ts"), cutoff))
+                raw_writer.write(live)
+
+        if raw_layout == "file":
+            trim_tail(out_raw_parquet, RAW_SCHEMA)
+            live = pq.read_table(tail_path(out_raw_parquet), schema=RAW_SCHEMA)
+        # The kept live rows are part of the series the rollups describe.
+        for batch in live.to_batches():
+            rollups.add_batch(batch)
+            records.add_batch(batch)
+            coverage.add_batch(batch)
+        rollup_writer.write(rollups.finalize(station_id, parameter))
+        st.add(files=len(lfu_files), bytes_in=bytes_in)
+    rows = sum(span.rows for span in spans)
+    count(files=len(lfu_files), rows_in=rows, bytes_in=bytes_in, rows_out=rows_out)
+
+    with stage("climatology", series=series) as st:
+        st.add(bytes_out=path_bytes(update_climatology(out_daily_parquet, station_id, parameter)))
+    with stage("records", series=series) as st:
+        st.add(bytes_out=path_bytes(write_records(records.finalize(station_id, parameter), out_daily_parquet)))
+    with stage("coverage", series=series) as st:
+        paths = write_coverage(coverage.finalize(station_id, parameter), out_daily_parquet)
+        st.add(bytes_out=sum(path_bytes(p) for p in paths))
+    return IngestResult(
+        station=station,
+        parameter=parameter,
+        files=[ManifestEntry.for_file(p, span) for p, span in zip(csv_files, spans)],
     )
-    pq.write_table(daily_table, out_daily_parquet, compression="zstd")
-    return station
 
 
-def copy_tree(src: Path, dst: Path) -> None:
-    ensure_dir(dst)
-    for root, _dirs, files in os.walk(src):
-        root_p = Path(root)
-        rel = root_p.relative_to(src)
-        out_dir = dst / rel
-        ensure_dir(out_dir)
-        for fn in files:
-            shutil.copy2(root_p / fn, out_dir / fn)
+def ingest_group_incremental(
+    csv_files: List[Path],
+    out_raw_parquet: Path,
+    out_daily_parquet: Path,
+    previous: List[ManifestEntry],
+    *,
+    chunksize: int,
+    engine: str = "pandas",
+    raw_layout: str = "file",
+) -> Optional[IngestResult]:
+    # Parse only files that are new or changed since the previous manifest, merge
+    # their rows into the existing raw Parquet by ts (new rows win) and recompute
+    # the rollup periods they touch. Returns None when a full
+    # rebuild is required (a previously ingested file disappeared).
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if not csv_files:
+        raise RuntimeError("No CSV files to ingest.")
+
+    known = {e.path: e for e in previous}
+    current = {str(p) for p in csv_files}
+    if any(path not in current for path in known):
+        return None
+
+    entries: Dict[str, ManifestEntry] = {}
+    changed: List[Tuple[Path, str]] = []
+    for p in csv_files:
+        prev = known.get(str(p))
+        st = p.stat()
+        if prev is not None and prev.size == st.st_size and prev.mtime == st.st_mtime:
+            entries[str(p)] = prev
+            continue
+        digest = _sha256(p)
+        if prev is not None and prev.sha256 == digest:
+            # Touched but identical content: just refresh size/mtime.
+            entries[str(p)] = ManifestEntry(
+                **{**asdict(prev), "size": st.st_size, "mtime": st.st_mtime}
+            )
+            continue
+        changed.append((p, digest))
+
+    first = LfuCsvFile.read(csv_files[0])
+    station, parameter = first.station, first.parameter
+    if not changed:
+        print(f"Incremental: {parameter} unchanged ({len(csv_files)} files)")
+        files = [entries[str(p)] for p in csv_files]
+        return IngestResult(station=station, parameter=parameter, files=files)
+
+    print(f"Incremental: {parameter}: parsing {len(changed)} new/changed file(s)")
+    series = series_name(station.station_id, parameter)
+    bytes_in = sum(p.stat().st_size for p, _ in changed)
+    with stage("parse", series=series, incremental=True) as st:
+        tables: Dict[Path, pa.Table] = {}
+        for p, digest in changed:
+            span = TsSpan()
+            batches: List[pa.RecordBatch] = []
+            for batch in iter_file_batches(LfuCsvFile.read(p), station.station_id, chunksize, engine):
+                batches.append(batch)
+                span.update(batch)
+            tables[p] = pa.Table.from_batches(batches, schema=RAW_SCHEMA)
+            entries[str(p)] = ManifestEntry.for_file(p, span, sha256=digest)
+        rows_in = sum(t.num_rows for t in tables.values())
+
+        # As in a full rebuild, a ts delivered by several files keeps the last
+        # file's row: unchanged files after a changed one whose range overlaps
+        # the new rows are read again, for the ts the new rows have.
+        new_ts = pa.concat_tables(tables.values()).column("ts")
+        reread: List[Path] = []
+        if len(new_ts):
+            lo = np.datetime64(pc.min(new_ts).as_py(), "s")
+            hi = np.datetime64(pc.max(new_ts).as_py(), "s")
+            first_changed = min(i for i, p in enumerate(csv_files) if p in tables)
+            for p in csv_files[first_changed + 1 :]:
+                e = entries[str(p)]
+                if p in tables or e.ts_min is None:
+                    continue
+                if np.datetime64(e.ts_min) <= hi and np.datetime64(e.ts_max) >= lo:
+                    reread.append(p)
+        for p in reread:
+            table = pa.Table.from_batches(
+                list(iter_file_batches(LfuCsvFile.read(p), station.station_id, chunksize, engine)),
+                schema=RAW_SCHEMA,
+            )
+            tables[p] = table.filter(pc.is_in(table.column("ts"), new_ts))
+        new_rows = _dedupe_last_by_ts(pa.concat_tables([tables[p] for p in csv_files if p in tables]))
+        st.add(files=len(changed), reread_files=len(reread), rows_in=rows_in, bytes_in=bytes_in)
+    count(files=len(changed), rows_in=rows_in, bytes_in=bytes_in)
+    files = [entries[str(p)] for p in csv_files]
+
+    if new_rows.num_rows == 0:
+        return IngestResult(station=station, parameter=parameter, files=files)
+
+    # Raw: existing rows whose ts is re-delivered are replaced by the new rows.
+    with stage("merge_raw", series=series, layout=raw_layout) as st:
+        if raw_layout == "partitioned":
+            # Only the touched year partitions are read and rewritten.
+            merge_into_partitions(out_raw_parquet.parent, parameter, new_rows)
+        else:
+            existing = pq.read_table(out_raw_parquet, schema=RAW_SCHEMA)
+            existing = existing.filter(
+                pc.invert(pc.is_in(existing.column("ts"), new_rows.column("ts")))
+            )
+            raw = pa.concat_tables([existing, new_rows])
+            raw = raw.take(pc.sort_indices(raw, sort_keys=[("ts", "ascending")]))
+            write_raw(raw, out_raw_parquet)
+            trim_tail(out_raw_parquet, RAW_SCHEMA)
+            st.add(rows_out=raw.num_rows, bytes_out=path_bytes(out_raw_parquet))
+        st.add(rows_in=new_rows.num_rows)
+    count(rows_out=new_rows.num_rows)
+
+    # Rollups: recompute only the periods the new rows touch, from the stored
+    # raw rows (base + tail, or partitions) around them.
+    with stage("rollups", series=series, incremental=True) as st:
+        start, end = rollup_window(new_rows)
+        window = read_raw_range(out_raw_parquet, parameter, start, end, raw_layout)
+        updated = update_rollups(out_daily_parquet, window, new_rows, station.station_id, parameter)
+        st.add(rows_in=window.num_rows)
+    changed_dates = np.unique(new_rows.column("ts").to_numpy().astype("datetime64[D]"))
+    with stage("climatology", series=series, incremental=True):
+        update_climatology(out_daily_parquet, station.station_id, parameter, changed_dates)
+    with stage("records", series=series, incremental=True):
+        update_records(
+            out_daily_parquet,
+            new_rows,
+            station.station_id,
+            parameter,
+            lambda: read_raw_range(out_raw_parquet, parameter, raw_layout=raw_layout),
+        )
+    with stage("coverage", series=series, incremental=True):
+        update_coverage(
+            out_daily_parquet,
+            new_rows,
+            station.station_id,
+            parameter,
+            lambda: read_raw_range(out_raw_parquet, parameter, raw_layout=raw_layout),
+        )
+    print(
+        f"Incremental: {parameter}: merged {new_rows.num_rows} rows, "
+        f"recomputed {updated.get('daily', 0)} day(s)"
+    )
+    return IngestResult(station=station, parameter=parameter, files=files)
 
 
-def main() -> None:
+def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser()
     ap.add_argument(
         "--data-root",
@@ -388,11 +1083,18 @@ def main() -> None:
         default=str(Path(__file__).resolve().parents[1] / "data" / "parquet"),
         help="Output parquet root (default: ../data/parquet)",
     )
-    ap.add_argument(
+    stations = ap.add_mutually_exclusive_group()
+    stations.add_argument(
         "--station-id",
         type=str,
-        default="16005701",
-        help="Station ID to ingest (default: 16005701)",
+        nargs="+",
+        default=[DEFAULT_STATION_ID],
+        help=f"Station ID(s) to ingest, space- or comma-separated (default: {DEFAULT_STATION_ID})",
+    )
+    stations.add_argument(
+        "--all-stations",
+        action="store_true",
+        help="Ingest every station with CSV files under <data-root>/fluesse-*/",
     )
     ap.add_argument(
         "--chunksize",
@@ -400,53 +1102,171 @@ def main() -> None:
         default=200_000,
         help="CSV rows per chunk (default: 200000)",
     )
+    ap.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="pandas",
+        help="CSV reader: pandas (read_csv) or arrow (pyarrow.csv streaming) (default: pandas)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse CSV files in N worker processes; both parameter groups run concurrently (default: 1)",
+    )
+    ap.add_argument(
+        "--raw-layout",
+        choices=RAW_LAYOUTS,
+        default="file",
+        help="Raw output: one file per parameter, or Hive-style year partitions "
+        "(raw/parameter=.../year=YYYY/) with a _partitions.json index (default: file)",
+    )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Only parse CSV files that are new or changed since the last run ({MANIFEST_FILENAME})",
+    )
+    ap.add_argument(
+        "--daily-quantiles",
+        action="store_true",
+        help="Add p10/p50/p90/stddev columns to the daily rollup (over the distinct 15-minute samples of each day)",
+    )
+    ap.add_argument(
+        "--bounded-memory",
+        action="store_true",
+        help="Write finished months while reading instead of holding the whole history in memory "
+        "(input files must be ordered by time; CSV files are then parsed serially)",
+    )
+    ap.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help=f"Do not keep parse progress in <out-root>/{CHECKPOINT_DIRNAME}/ for resuming an interrupted "
+        "full rebuild (--incremental and --bounded-memory runs are never checkpointed)",
+    )
     ap.add_argument(
         "--sync-to-web-public",
         type=str,
         default="",
-        help="If set, copy parquet outputs to this directory (e.g. web/public/data/parquet).",
+        help="If set, publish parquet outputs to this directory (e.g. web/public/data/parquet).",
     )
-    args = ap.parse_args()
+    return ap.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    # Stage timings, row/byte counts and peak memory go to the run history
+    # (telemetry.py); the summary is printed after the run.
+    with Telemetry("ingest") as run:
+        run_ingest(args)
+    for line in run.summary():
+        print(line)
+
 
+def run_ingest(args: argparse.Namespace) -> None:
     data_root = Path(args.data_root)
     out_root = Path(args.out_root)
-    station_id = args.station_id
-
-    level_dir = data_root / "fluesse-wasserstand"
-    temp_dir = data_root / "fluesse-wassertemperatur"
-    level_files = sorted(level_dir.glob(f"{station_id}_*.csv"))
-    temp_files = sorted(temp_dir.glob(f"{station_id}_*.csv"))
-    if not level_files and not temp_files:
-        raise SystemExit(f"No station files found for {station_id} under {data_root}")
+    if args.all_stations:
+        station_ids = discover_station_ids(data_root)
+    else:
+        station_ids = [sid for arg in args.station_id for sid in arg.split(",") if sid]
+
+    # One group per (station, parameter); all groups share the worker pool.
+    groups: List[Tuple[str, str, List[Path]]] = []
+    for station_id in station_ids:
+        files = station_files(data_root, station_id)
+        if not files:
+            raise SystemExit(f"No station files found for {station_id} under {data_root}")
+        groups.extend((station_id, parameter, paths) for parameter, paths in files.items())
+    if not groups:
+        raise SystemExit(f"No station files found under {data_root}")
 
     raw_dir = out_root / "raw"
     daily_dir = out_root / "daily"
     ensure_dir(raw_dir)
     ensure_dir(daily_dir)
 
-    station_meta: Optional[StationMeta] = None
-    meta_json: Dict[str, Any] = {"generated_at": datetime.utcnow().isoformat() + "Z"}
-
-    if level_files:
-        station_meta = ingest_group(
-            level_files,
-            raw_dir / f"station_{station_id}_water_level_cm.parquet",
-            daily_dir / f"station_{station_id}_water_level_cm_daily.parquet",
+    manifest_path = out_root / MANIFEST_FILENAME
+    manifest = load_manifest(manifest_path)
+    previous = manifest if args.incremental else {}
+    checkpoint_dir = None if args.no_checkpoint else checkpoint_root(out_root)
+
+    def run_group(
+        station_id: str, parameter: str, files: List[Path], executor: Optional[Executor]
+    ) -> IngestResult:
+        key = manifest_key(station_id, parameter)
+        raw_path = raw_file_path(raw_dir, station_id, parameter, args.raw_layout)
+        daily_path = daily_dir / f"{series_name(station_id, parameter)}_daily.parquet"
+        if args.raw_layout == "partitioned":
+            have_raw = has_partitions(raw_path.parent, parameter)
+        else:
+            have_raw = raw_path.exists()
+        have_rollups = all(rollup_path(daily_path, r).exists() for r in ROLLUPS)
+        # Switching --daily-quantiles on or off changes the daily schema.
+        same_mode = have_rollups and daily_has_quantiles(daily_path) == args.daily_quantiles
+        if key in previous and have_raw and have_rollups and same_mode:
+            result = ingest_group_incremental(
+                files,
+                raw_path,
+                daily_path,
+                previous[key],
+                chunksize=args.chunksize,
+                engine=args.engine,
+                raw_layout=args.raw_layout,
+            )
+            if result is not None:
+                return result
+            print(f"Incremental: {key}: input files were removed, full rebuild")
+        if args.bounded_memory:
+            return ingest_group_bounded(
+                files,
+                raw_path,
+                daily_path,
+                chunksize=args.chunksize,
+                engine=args.engine,
+                raw_layout=args.raw_layout,
+                daily_quantiles=args.daily_quantiles,
+            )
+        return ingest_group(
+            files,
+            raw_path,
+            daily_path,
             chunksize=args.chunksize,
+            engine=args.engine,
+            executor=executor,
+            raw_layout=args.raw_layout,
+            daily_quantiles=args.daily_quantiles,
+            checkpoint_dir=checkpoint_dir,
         )
-        meta_json["water_level_files"] = [str(p) for p in level_files]
 
-    if temp_files:
-        station_meta2 = ingest_group(
-            temp_files,
-            raw_dir / f"station_{station_id}_water_temperature_c.parquet",
-            daily_dir / f"station_{station_id}_water_temperature_c_daily.parquet",
-            chunksize=args.chunksize,
-        )
-        meta_json["water_temperature_files"] = [str(p) for p in temp_files]
-        station_meta = station_meta or station_meta2
+    if args.workers > 1:
+        # Files of all groups share one process pool; up to `workers` groups
+        # are driven (merge + final writes) at a time, each from its own thread.
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            with ThreadPoolExecutor(max_workers=min(len(groups), args.workers)) as runner:
+                futures = [runner.submit(run_group, *group, pool) for group in groups]
+                results = [f.result() for f in futures]
+    else:
+        results = [run_group(*group, None) for group in groups]
 
-    if station_meta is not None:
+    ensure_dir(out_root)
+    by_station: Dict[int, List[IngestResult]] = {}
+    for result in results:
+        by_station.setdefault(result.station.station_id, []).append(result)
+    with stage("catalog"):
+        write_catalog(out_root, [_catalog_row(rs) for rs in by_station.values()])
+
+    # station_meta.json describes a single station: the one ingested, or the
+    # default station when it is part of a multi-station run.
+    meta_id = int(station_ids[0] if len(station_ids) == 1 else DEFAULT_STATION_ID)
+    if meta_id in by_station:
+        meta_results = by_station[meta_id]
+        station_meta = meta_results[0].station
+        meta_json: Dict[str, Any] = {"generated_at": datetime.utcnow().isoformat() + "Z"}
+        for result in meta_results:
+            if result.parameter == "water_level_cm":
+                meta_json["water_level_files"] = [e.path for e in result.files]
+            elif result.parameter == "water_temperature_c":
+                meta_json["water_temperature_files"] = [e.path for e in result.files]
         meta_json["station"] = {
             "station_id": station_meta.station_id,
             "station_name": station_meta.station_name,
@@ -458,16 +1278,27 @@ def main() -> None:
             "gauge_zero": station_meta.gauge_zero,
             "raw_meta": station_meta.raw_meta,
         }
+        (out_root / "station_meta.json").write_text(
+            json.dumps(meta_json, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
 
-    ensure_dir(out_root)
-    (out_root / "station_meta.json").write_text(
-        json.dumps(meta_json, ensure_ascii=False, indent=2), encoding="utf-8"
+    # Groups of stations not in this run keep their manifest entries.
+    manifest.update(
+        {manifest_key(r.station.station_id, r.parameter): r.files for r in results}
     )
+    with stage("manifest"):
+        write_manifest(manifest_path, manifest)
+    # The run is complete: the checkpoints of its groups are no longer needed.
+    if checkpoint_dir is not None:
+        for station_id, parameter, _ in groups:
+            remove_checkpoint(checkpoint_dir / series_name(station_id, parameter))
 
     if args.sync_to_web_public:
         dst = Path(args.sync_to_web_public)
-        copy_tree(out_root, dst)
-        print(f"Synced parquet outputs to: {dst}")
+        with stage("publish") as st:
+            published = publish_tree(out_root, dst)
+            st.add(files=len(published))
+        print(f"Published {len(published)} parquet file(s) to: {dst}")
 
     print(f"Done. Parquet written to: {out_root}")
 
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Index of the live measurements stored in data/current/*.jsonl
+
+fetch_and_store_isar.py used to re-read and json.loads the whole day's file
+for every measurement it checked. This SQLite sidecar (data/current/
+live_index.sqlite) keeps one row per stored (data type, station, timestamp)
+with its value, plus the size of every indexed JSONL file:
+
+- a duplicate check is one primary-key lookup,
+- rows newer than the last stored timestamp need no lookup at all,
+- a batch is deduplicated in a single pass.
+
+The JSONL files stay the source of truth. When a file's size differs from the
+recorded one (edited, deleted or written by an older version of the fetch),
+its keys are rebuilt from the file before they are used; a missing index is
+rebuilt the same way.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+INDEX_FILENAME = 'live_index.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    data_type TEXT NOT NULL,
+    station_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (data_type, station_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+class LiveIndex:
+    """Keys of the stored live measurements of one data directory"""
+
+    def __init__(self, data_dir, value_fields):
+        """value_fields: {data_type: JSON field holding the value}"""
+        self.data_dir = Path(data_dir)
+        self.value_fields = value_fields
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.data_dir / INDEX_FILENAME)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.conn.commit()
+        self.close()
+        return False
+
+    def log_file(self, data_type, date_str):
+        return self.data_dir / f"{data_type}_{date_str}.jsonl"
+
+    def sync(self, data_type, date_str):
+        """Make the keys of one daily file match the file (re-read only if its size changed)"""
+        log_file = self.log_file(data_type, date_str)
+        size = log_file.stat().st_size if log_file.exists() else 0
+        row = self.conn.execute('SELECT size FROM files WHERE name = ?', (log_file.name,)).fetchone()
+        if (row[0] if row else 0) == size:
+            return
+
+        value_field = self.value_fields[data_type]
+        keys = {}
+        if size:
+            with open(log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            existing = json.loads(line)
+                            # Later lines win, like the migration does
+                            keys[(str(existing['station_id']), existing['timestamp'])] = existing.get(value_field)
+                        except (ValueError, KeyError):
+                            continue
+
+        with self.conn:
+            self.conn.execute(
+                'DELETE FROM measurements WHERE data_type = ? AND ts >= ? AND ts < ?',
+                (data_type, f"{date_str}T", f"{date_str}U"),
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?)',
+                [(data_type, sid, ts, value) for (sid, ts), value in keys.items()],
+            )
+            self.conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?)', (log_file.name, size))
+
+    def last_ts(self, data_type, station_id=None, date_str=None):
+        """Latest stored timestamp ('' if none), of one station or all, overall or within one day"""
+        if date_str is None:
+            lo, hi = '', '~'
+        else:
+            lo, hi = f"{date_str}T", f"{date_str}U"
+        query = 'SELECT MAX(ts) FROM measurements WHERE data_type = ? AND ts >= ? AND ts < ?'
+        params = [data_type, lo, hi]
+        if station_id is not None:
+            query += ' AND station_id = ?'
+            params.append(str(station_id))
+        return self.conn.execute(query, params).fetchone()[0] or ''
+
+    def is_stored(self, measurement, data_type):
+        """True if this timestamp is stored with the same value"""
+        self.sync(data_type, measurement['date'])
+        row = self.conn.execute(
+            'SELECT value FROM measurements WHERE data_type = ? AND station_id = ? AND ts = ?',
+            (data_type, str(measurement['station_id']), measurement['timestamp']),
+        ).fetchone()
+        return row is not None and row[0] == measurement[self.value_fields[data_type]]
+
+    def new_measurements(self, measurements, data_type):
+        """
+        The measurements that are not stored yet (and not repeated earlier in
+        the batch), in input order
+        """
+        value_field = self.value_fields[data_type]
+        for date_str in {m['date'] for m in measurements}:
+            self.sync(data_type, date_str)
+
+        last = {}
+        seen = {}
+        out = []
+        for m in measurements:
+            sid = str(m['station_id'])
+            key = (sid, m['timestamp'])
+            value = m[value_field]
+            if key in seen:
+                if seen[key] == value:
+                    continue
+            else:
+                if sid not in last:
+                    last[sid] = self.last_ts(data_type, sid)
+                # Rows after the last stored one are new without a lookup
+                if m['timestamp'] <= last[sid]:
+                    row = self.conn.execute(
+                        'SELECT value FROM measurements WHERE data_type = ? AND station_id = ? AND ts = ?',
+                        (data_type, sid, m['timestamp']),
+                    ).fetchone()
+                    if row is not None and row[0] == value:
+                        seen[key] = value
+                        continue
+            seen[key] = value
+            out.append(m)
+        return out
+
+    def record(self, measurements, data_type):
+        """Add rows just written to their daily files; call after the write"""
+        value_field = self.value_fields[data_type]
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?)',
+                [(data_type, str(m['station_id']), m['timestamp'], m[value_field]) for m in measurements],
+            )
+            for date_str in {m['date'] for m in measurements}:
+                log_file = self.log_file(data_type, date_str)
+                self.conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?)',
+                                  (log_file.name, log_file.stat().st_size))
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Live measurement stores in data/current
+
+fetch_and_store_isar.py saves the scraped measurements, migrate_live_to_parquet.py
+reads the recent ones back. The backend is chosen with --live-store (or the
+ISAR_LIVE_STORE environment variable); both scripts must use the same one.
+
+jsonl   Daily files {data_type}_{date}.jsonl, one full record per line,
+        deduplicated through live_index.py. Reading means opening the files
+        of the requested days and parsing every line.
+sqlite  data/current/live.sqlite (WAL mode): one table keyed by
+        (station_id, data_type, ts) with upsert semantics, station names in a
+        separate table. A save is one transaction, a read one indexed range
+        query. The daily JSONL files of the days a save touches are exported
+        again from the table, so the frontend (liveData.ts) keeps reading
+        them. On first use the existing JSONL files are imported.
+
+    with open_live_store('sqlite', DATA_DIR) as store:
+        saved, known = store.save(measurements, 'water_level')
+        rows = store.read('water_level', since='2026-01-21')
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from live_index import LiveIndex
+
+LIVE_STORES = ('jsonl', 'sqlite')
+DEFAULT_LIVE_STORE = os.environ.get('ISAR_LIVE_STORE', 'jsonl')
+STORE_FILENAME = 'live.sqlite'
+
+# data_type -> (value field, unit, source) of the JSONL records
+VALUE_FIELDS = {
+    'water_level': ('value_cm', 'cm', 'hnd.bayern.de'),
+    'water_temperature': ('value_celsius', '°C', 'gkd.bayern.de'),
+}
+VALUE_TYPES = {
+    'water_level': int,
+    'water_temperature': float,
+}
+
+
+def jsonl_record(station_id, station_name, data_type, timestamp, value, fetched_at, timestamp_unix=None):
+    """One JSONL line (the format liveData.ts and the jsonl store read)"""
+    value_field, unit, source = VALUE_FIELDS[data_type]
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return {
+        'timestamp': timestamp.isoformat(),
+        'timestamp_unix': int(timestamp.timestamp()) if timestamp_unix is None else timestamp_unix,
+        'date': timestamp.strftime('%Y-%m-%d'),
+        'time': timestamp.strftime('%H:%M:%S'),
+        value_field: value,
+        'unit': unit,
+        'station_id': station_id,
+        'station_name': station_name,
+        'source': source,
+        'fetched_at': fetched_at
+    }
+
+
+def jsonl_path(data_dir, data_type, date_str):
+    return Path(data_dir) / f"{data_type}_{date_str}.jsonl"
+
+
+def _read_jsonl(path):
+    # Parsed lines of one daily file; unparseable lines are skipped
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def _write_atomic(path, text):
+    tmp_file = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+
+
+def open_live_store(kind, data_dir):
+    """The store backend `kind` ('jsonl' or 'sqlite') for `data_dir`"""
+    if kind == 'jsonl':
+        return JsonlStore(data_dir)
+    if kind == 'sqlite':
+        return SqliteStore(data_dir)
+    raise ValueError(f"Unknown live store: {kind} (expected one of {', '.join(LIVE_STORES)})")
+
+
+class JsonlStore:
+    """Daily JSONL files, deduplicated through the live index"""
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self._index = None
+
+    @property
+    def index(self):
+        # Opened on the first save; reads do not need it
+        if self._index is None:
+            self._index = LiveIndex(self.data_dir, {t: fields[0] for t, fields in VALUE_FIELDS.items()})
+        return self._index
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def save(self, measurements, data_type):
+        """
+        Store the measurements that are not stored yet; returns (saved, already stored)
+
+        The batch is deduplicated against the index in one pass, and each daily
+        file gets all its new rows in a single write. The files stay sorted by
+        timestamp (liveData.ts takes the last line as the latest value): rows
+        newer than the file's last one are appended, rows filling a gap rewrite
+        the file in order.
+        """
+        new = self.index.new_measurements(measurements, data_type)
+        by_date = {}
+        for measurement in new:
+            by_date.setdefault(measurement['date'], []).append(measurement)
+
+        for date_str, rows in sorted(by_date.items()):
+            log_file = jsonl_path(self.data_dir, data_type, date_str)
+            new_lines = [(m['timestamp'], json.dumps(m, ensure_ascii=False) + '\n') for m in rows]
+
+            if min(ts for ts, _ in new_lines) > self.index.last_ts(data_type, date_str=date_str):
+                with open(log_file, 'a', encoding='utf-8') as f:
+                    f.write(''.join(line for _, line in new_lines))
+            else:
+                existing_lines = []
+                with open(log_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            try:
+                                existing_lines.append((json.loads(line)['timestamp'], line.rstrip('\n') + '\n'))
+                            except (ValueError, KeyError):
+                                continue
+                # Stable sort: a re-delivered timestamp stays after the older row
+                merged = sorted(existing_lines + new_lines, key=lambda item: item[0])
+                _write_atomic(log_file, ''.join(line for _, line in merged))
+
+            self.index.record(rows, data_type)
+
+        return len(new), len(measurements) - len(new)
+
+    def read(self, data_type, since):
+        """
+        {'station_id', 'timestamp', 'value'} of every stored row on or after the
+        date `since` ('YYYY-MM-DD'), in file order (a later row for the same
+        timestamp is a correction)
+        """
+        value_field = VALUE_FIELDS[data_type][0]
+        rows = []
+        for path in sorted(self.data_dir.glob(f"{data_type}_*.jsonl")):
+            if path.stem[len(data_type) + 1:] < since:
+                continue
+            for record in _read_jsonl(path):
+                if value_field in record and 'timestamp' in record:
+                    rows.append({
+                        'station_id': record.get('station_id'),
+                        'timestamp': record['timestamp'],
+                        'value': record[value_field],
+                    })
+        return rows
+
+
+class SqliteStore:
+    """SQLite table keyed by (station_id, data_type, ts); exports the daily JSONL files"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS measurements (
+        station_id TEXT NOT NULL,
+        data_type TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        ts_unix INTEGER NOT NULL,
+        value REAL NOT NULL,
+        fetched_at TEXT,
+        PRIMARY KEY (station_id, data_type, ts)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS measurements_type_ts ON measurements (data_type, ts);
+    CREATE TABLE IF NOT EXISTS stations (
+        station_id TEXT PRIMARY KEY,
+        station_name TEXT
+    );
+    """
+
+    UPSERT = """
+    INSERT INTO measurements (station_id, data_type, ts, ts_unix, value, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (station_id, data_type, ts) DO UPDATE
+    SET value = excluded.value, ts_unix = excluded.ts_unix, fetched_at = excluded.fetched_at
+    WHERE value != excluded.value
+    """
+
+    def __init__(self, data_dir, export_jsonl=True):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.export_jsonl = export_jsonl
+        self.conn = sqlite3.connect(self.data_dir / STORE_FILENAME, timeout=30)
+        # WAL: the migration can read while a fetch writes
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        if self.conn.execute('SELECT 1 FROM measurements LIMIT 1').fetchone() is None:
+            self.import_jsonl()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _upsert(self, measurements, data_type):
+        # Rows inserted or changed (an identical row is not counted)
+        value_field = VALUE_FIELDS[data_type][0]
+        before = self.conn.total_changes
+        self.conn.executemany(
+            'INSERT INTO stations VALUES (?, ?) ON CONFLICT (station_id) DO UPDATE SET station_name = excluded.station_name',
+            {(str(m['station_id']), m.get('station_name')) for m in measurements},
+        )
+        stations_changes = self.conn.total_changes - before
+        self.conn.executemany(self.UPSERT, [
+            (str(m['station_id']), data_type, m['timestamp'], m['timestamp_unix'], m[value_field], m.get('fetched_at'))
+            for m in measurements
+        ])
+        return self.conn.total_changes - before - stations_changes
+
+    def import_jsonl(self):
+        """Load the existing daily JSONL files (later lines win); returns the rows stored"""
+        imported = 0
+        with self.conn:
+            for data_type, (value_field, _, _) in VALUE_FIELDS.items():
+                for path in sorted(self.data_dir.glob(f"{data_type}_*.jsonl")):
+                    records = [r for r in _read_jsonl(path) if value_field in r and 'timestamp' in r]
+                    for record in records:
+                        record.setdefault('timestamp_unix', int(datetime.fromisoformat(record['timestamp']).timestamp()))
+                    imported += self._upsert(records, data_type)
+        return imported
+
+    def save(self, measurements, data_type):
+        """Upsert the measurements; returns (saved, already stored)"""
+        with self.conn:
+            saved = self._upsert(measurements, data_type)
+        if saved and self.export_jsonl:
+            for date_str in sorted({m['date'] for m in measurements}):
+                self.export_day(data_type, date_str)
+        return saved, len(measurements) - saved
+
+    def export_day(self, data_type, date_str):
+        """Rewrite {data_type}_{date}.jsonl from the table, sorted by timestamp"""
+        convert = VALUE_TYPES[data_type]
+        rows = self.conn.execute(
+            'SELECT m.station_id, s.station_name, m.ts, m.ts_unix, m.value, m.fetched_at '
+            'FROM measurements m LEFT JOIN stations s USING (station_id) '
+            'WHERE m.data_type = ? AND m.ts >= ? AND m.ts < ? ORDER BY m.ts, m.station_id',
+            (data_type, f"{date_str}T", f"{date_str}U"),
+        ).fetchall()
+        lines = [
+            json.dumps(jsonl_record(sid, name, data_type, ts, convert(value), fetched_at, ts_unix),
+                       ensure_ascii=False) + '\n'
+            for sid, name, ts, ts_unix, value, fetched_at in rows
+        ]
+        _write_atomic(jsonl_path(self.data_dir, data_type, date_str), ''.join(lines))
+
+    def read(self, data_type, since):
+        """{'station_id', 'timestamp', 'value'} of every row on or after the date `since`, by timestamp"""
+        convert = VALUE_TYPES[data_type]
+        cursor = self.conn.execute(
+            'SELECT station_id, ts, value FROM measurements WHERE data_type = ? AND ts >= ? ORDER BY ts, station_id',
+            (data_type, since),
+        )
+        return [{'station_id': sid, 'timestamp': ts, 'value': convert(value)} for sid, ts, value in cursor]
@@ -4,7 +4,8 @@ Migrate live JSONL data to Parquet format
 Run this daily/weekly to incorporate live measurements into the main dataset
 """
 
-import json
+import argparse
+import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
@@ -12,80 +13,219 @@ from pathlib import Path
 from datetime import datetime, timedelta
 import sys
 
+from publish import publish
+from raw_partitions import (
+    RAW_LAYOUTS,
+    footer_max_ts,
+    load_index,
+    merge_into_partitions,
+    raw_file_path,
+    read_raw_range,
+    sync_partitions,
+    tail_path,
+    write_raw,
+)
+from climatology import update_climatology
+from coverage import update_coverage
+from records import update_records
+from rollups import ROLLUPS, rollup_path, rollup_window, update_rollups
+from live_store import DEFAULT_LIVE_STORE, LIVE_STORES, open_live_store
+from stations import series_name
+from telemetry import Telemetry, count, path_bytes, stage
+
 PROJECT_ROOT = Path(__file__).parent.parent
 CURRENT_DATA_DIR = PROJECT_ROOT / "data" / "current"
 PARQUET_DIR = PROJECT_ROOT / "data" / "parquet" / "raw"
-WEB_PARQUET_DIR = PROJECT_ROOT / "web" / "public" / "data" / "parquet" / "raw"
+DAILY_DIR = PROJECT_ROOT / "data" / "parquet" / "daily"
+WEB_ROOT = PROJECT_ROOT / "web" / "public" / "data" / "parquet"
+WEB_PARQUET_DIR = WEB_ROOT / "raw"
+
+# Live store data type of each parameter
+LIVE_DATA_TYPES = {
+    'water_level_cm': 'water_level',
+    'water_temperature_c': 'water_temperature',
+}
 
-def read_jsonl_files(parameter: str, days_back: int = 7):
-    """Read JSONL files from the last N days for a specific parameter"""
+# Parquet schema of the raw series
+RAW_SCHEMA = pa.schema([
+    ('station_id', pa.int32()),
+    ('parameter', pa.string()),
+    ('ts', pa.timestamp('ns')),
+    ('value', pa.float64()),
+    ('status', pa.string()),
+])
+
+def read_live_measurements(parameter: str, days_back: int = 7, live_store: str = DEFAULT_LIVE_STORE):
+    """Read the live measurements of the last N days for a specific parameter"""
+    if parameter not in LIVE_DATA_TYPES:
+        raise ValueError(f"Unknown parameter: {parameter}")
+    
+    since = (datetime.now() - timedelta(days=days_back - 1)).strftime('%Y-%m-%d')
+    print(f"Reading {LIVE_DATA_TYPES[parameter]} since {since} ({live_store} store)...")
+    
+    with stage('read_live', data_type=LIVE_DATA_TYPES[parameter], store=live_store) as st:
+        with open_live_store(live_store, CURRENT_DATA_DIR) as store:
+            rows = store.read(LIVE_DATA_TYPES[parameter], since)
+        st.add(rows_in=len(rows))
+    count(rows_in=len(rows))
+    
     measurements = []
+    for row in rows:
+        try:
+            measurements.append({
+                'station_id': int(row['station_id']),
+                'parameter': parameter,
+                'ts': pd.Timestamp(row['timestamp']),
+                'value': float(row['value']),
+                'status': 'Rohdaten',  # Live data status
+            })
+        except Exception as e:
+            print(f"  Warning: Could not parse row: {e}")
     
-    # Determine filename pattern and value field based on parameter
-    if parameter == 'water_level_cm':
-        file_prefix = 'water_level'
-        value_field = 'value_cm'
-    elif parameter == 'water_temperature_c':
-        file_prefix = 'water_temperature'
-        value_field = 'value_celsius'
+    return measurements
+
+def merge_into_tail(new_data: pd.DataFrame, parquet_file: Path):
+    """Merge new data into the tail segment of a raw Parquet file.
+    
+    Only the footer of the base file is read (for its max ts). Rows at or before
+    that point are already in the base; newer rows are merged by timestamp into
+    the small tail segment, so the work does not grow with the history.
+    Returns the new tail and the new rows actually merged into it.
+    """
+    base_max = footer_max_ts(parquet_file)
+    tail_file = tail_path(parquet_file)
+    
+    if base_max is not None:
+        print(f"Base {parquet_file.name} ends at {base_max}")
+        new_data = new_data[new_data['ts'] > pd.Timestamp(base_max)]
+    
+    if tail_file.exists():
+        existing_tail = pd.read_parquet(tail_file)
     else:
-        raise ValueError(f"Unknown parameter: {parameter}")
+        existing_tail = new_data.iloc[0:0]
     
-    for i in range(days_back):
-        date = datetime.now() - timedelta(days=i)
-        date_str = date.strftime('%Y-%m-%d')
-        jsonl_file = CURRENT_DATA_DIR / f"{file_prefix}_{date_str}.jsonl"
-        
-        if not jsonl_file.exists():
-            continue
-        
-        print(f"Reading {jsonl_file.name}...")
-        
-        with open(jsonl_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        data = json.loads(line)
-                        measurements.append({
-                            'station_id': int(data['station_id']),
-                            'parameter': parameter,
-                            'ts': pd.Timestamp(data['timestamp']),
-                            'value': float(data[value_field]),
-                            'status': 'Rohdaten',  # Live data status
-                        })
-                    except Exception as e:
-                        print(f"  Warning: Could not parse line: {e}")
+    # Combine and remove duplicates based on timestamp
+    combined = pd.concat([existing_tail, new_data], ignore_index=True)
+    combined = combined.drop_duplicates(subset=['ts'], keep='last')
+    combined = combined.sort_values('ts')
     
-    return measurements
+    print(f"  Tail records: {len(existing_tail)}")
+    print(f"  New records: {len(new_data)}")
+    print(f"  Net new: +{len(combined) - len(existing_tail)}")
+    
+    return combined, new_data.drop_duplicates(subset=['ts'], keep='last')
 
-def merge_with_existing_parquet(new_data: pd.DataFrame, parquet_file: Path):
-    """Merge new data with existing Parquet file, removing duplicates"""
+def daily_path(station_id, parameter: str) -> Path:
+    return DAILY_DIR / f"{series_name(station_id, parameter)}_daily.parquet"
+
+def publish_raw(*files: Path):
+    """Atomically publish raw Parquet files to the web root (hard links + hashed names)"""
+    publish([(f, f"{WEB_PARQUET_DIR.name}/{f.name}") for f in files], WEB_ROOT)
+
+def compact_parameter(station_id, parameter: str, schema: pa.Schema):
+    """Fold the tail segment into the base file (run occasionally, e.g. weekly)"""
+    print(f"\n--- Compacting {station_id} {parameter} ---")
     
-    if parquet_file.exists():
-        print(f"Reading existing data from {parquet_file.name}...")
-        existing_df = pd.read_parquet(parquet_file)
-        
-        # Combine and remove duplicates based on timestamp
-        combined = pd.concat([existing_df, new_data], ignore_index=True)
-        combined = combined.drop_duplicates(subset=['ts'], keep='last')
-        combined = combined.sort_values('ts')
-        
-        print(f"  Existing records: {len(existing_df)}")
-        print(f"  New records: {len(new_data)}")
-        print(f"  After dedup: {len(combined)}")
-        print(f"  Net new: +{len(combined) - len(existing_df)}")
+    parquet_file = raw_file_path(PARQUET_DIR, station_id, parameter)
+    tail_file = tail_path(parquet_file)
+    
+    if not tail_file.exists() or pq.ParquetFile(tail_file).metadata.num_rows == 0:
+        print(f"Nothing to compact for {parquet_file.name}")
+        return 0
+    
+    with stage('compact', series=series_name(station_id, parameter)) as st:
+        tables = [pq.read_table(f, schema=schema) for f in (parquet_file, tail_file) if f.exists()]
+        st.add(rows_in=sum(t.num_rows for t in tables))
+        combined = pa.concat_tables(tables).to_pandas()
+        combined = combined.drop_duplicates(subset=['ts'], keep='last').sort_values('ts')
         
-        return combined
-    else:
-        print(f"Creating new file {parquet_file.name}...")
-        return new_data.sort_values('ts')
+        print(f"Writing {len(combined)} records to {parquet_file.name}...")
+        write_raw(pa.Table.from_pandas(combined, schema=schema, preserve_index=False), parquet_file)
+        write_raw(schema.empty_table(), tail_file)
+        st.add(rows_out=len(combined), bytes_out=path_bytes(parquet_file))
+    
+    print(f"Publishing to web public folder...")
+    with stage('publish', series=series_name(station_id, parameter)):
+        publish_raw(parquet_file, tail_file)
+    
+    return len(combined)
+
+def update_live_aggregates(station_id, parameter: str, new_rows: pa.Table, raw_layout: str = 'file'):
+    """Update rollups, climatology, records and coverage for newly migrated rows"""
+    parquet_file = raw_file_path(PARQUET_DIR, station_id, parameter, raw_layout)
+    daily_file = daily_path(station_id, parameter)
+    series = series_name(station_id, parameter)
+    
+    # Periods are recomputed from the stored raw rows around them (at most a year)
+    with stage('rollups', series=series) as st:
+        start, end = rollup_window(new_rows)
+        window = read_raw_range(parquet_file, parameter, start, end, raw_layout)
+        updated = update_rollups(daily_file, window, new_rows, station_id, parameter)
+        st.add(rows_in=window.num_rows)
+    
+    missing = [r for r in ROLLUPS if r not in updated]
+    if missing:
+        print(f"⚠️  Rollups missing ({', '.join(missing)}); run ingest_lfu_csv_to_parquet.py to build them")
+    if updated:
+        print(f"Updated rollups: " + ", ".join(f"{r} ({n})" for r, n in updated.items()))
+    files = [rollup_path(daily_file, r) for r in updated]
+    if 'daily' in updated:
+        changed_dates = np.unique(new_rows.column('ts').to_numpy().astype('datetime64[D]'))
+        with stage('climatology', series=series):
+            files.append(update_climatology(daily_file, station_id, parameter, changed_dates))
+    
+    # Records only look at the new rows unless one replaces a record row
+    with stage('records', series=series):
+        files.append(update_records(
+            daily_file, new_rows, station_id, parameter,
+            lambda: read_raw_range(parquet_file, parameter, raw_layout=raw_layout),
+        ))
+    
+    # Gaps and coverage only change in the new rows' slots
+    with stage('coverage', series=series):
+        files.extend(update_coverage(
+            daily_file, new_rows, station_id, parameter,
+            lambda: read_raw_range(parquet_file, parameter, raw_layout=raw_layout),
+        ))
+    with stage('publish', series=series) as st:
+        publish([(f, f"{f.parent.name}/{f.name}") for f in files], WEB_ROOT)
+        st.add(files=len(files))
+
+def migrate_parameter_partitioned(df: pd.DataFrame, station_id, parameter: str, schema: pa.Schema):
+    """Merge new rows into the year partitions they touch (raw/station_id=.../parameter=.../year=YYYY/)"""
+    new_rows = df.drop_duplicates(subset=['ts'], keep='last')
+    table = pa.Table.from_pandas(new_rows, schema=schema, preserve_index=False)
+    years = sorted(new_rows['ts'].dt.year.unique().tolist())
+    raw_root = raw_file_path(PARQUET_DIR, station_id, parameter, 'partitioned').parent
+    raw_root.mkdir(parents=True, exist_ok=True)
+    
+    print(f"Merging into partitions {years}...")
+    with stage('merge_partitions', series=series_name(station_id, parameter)) as st:
+        merge_into_partitions(raw_root, parameter, table)
+        st.add(rows_in=table.num_rows, files=len(years))
+    count(rows_out=table.num_rows)
+    
+    print(f"Syncing partitions to web public folder...")
+    with stage('publish', series=series_name(station_id, parameter)):
+        sync_partitions(raw_root, WEB_ROOT, parameter, years, prefix=f"{WEB_PARQUET_DIR.name}/{raw_root.name}")
+    
+    update_live_aggregates(station_id, parameter, table, raw_layout='partitioned')
+    
+    entries = load_index(raw_root)["parameters"].get(parameter, [])
+    total = sum(e['rows'] for e in entries)
+    print(f"📊 {station_id} {parameter}:")
+    print(f"   Total records: {total}")
+    print(f"   Date range: {entries[0]['ts_min']} to {entries[-1]['ts_max']}")
+    
+    return total
 
-def migrate_parameter(parameter: str, days_back: int = 7):
-    """Migrate a single parameter (water_level_cm or water_temperature_c)"""
+def migrate_parameter(parameter: str, days_back: int = 7, raw_layout: str = 'file',
+                      live_store: str = DEFAULT_LIVE_STORE):
+    """Migrate a single parameter (water_level_cm or water_temperature_c) for every station in the live data"""
     print(f"\n--- Migrating {parameter} ---")
     
-    # Read JSONL files
-    measurements = read_jsonl_files(parameter, days_back=days_back)
+    # Read the live store
+    measurements = read_live_measurements(parameter, days_back=days_back, live_store=live_store)
     
     if not measurements:
         print(f"⚠️  No measurements found for {parameter}")
@@ -96,42 +236,89 @@ def migrate_parameter(parameter: str, days_back: int = 7):
     # Convert to DataFrame
     df = pd.DataFrame(measurements)
     
-    # Define Parquet schema
-    schema = pa.schema([
-        ('station_id', pa.int32()),
-        ('parameter', pa.string()),
-        ('ts', pa.timestamp('ns')),
-        ('value', pa.float64()),
-        ('status', pa.string()),
-    ])
+    # Ensure directories exist
+    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+    
+    total = 0
+    for station_id, station_df in df.groupby('station_id', sort=True):
+        total += migrate_station(station_df, int(station_id), parameter, raw_layout)
+    return total
+
+def migrate_station(df: pd.DataFrame, station_id: int, parameter: str, raw_layout: str = 'file'):
+    """Migrate the live rows of one station and parameter"""
+    schema = RAW_SCHEMA
+    
+    if raw_layout == 'partitioned':
+        return migrate_parameter_partitioned(df, station_id, parameter, schema)
     
     # Parquet file path
-    parquet_file = PARQUET_DIR / f"station_16005701_{parameter}.parquet"
+    parquet_file = raw_file_path(PARQUET_DIR, station_id, parameter)
     
-    # Ensure directories exist
-    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
-    WEB_PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+    if not parquet_file.exists():
+        # Readers always scan base + tail; start with an empty base.
+        print(f"Creating new file {parquet_file.name}...")
+        write_raw(schema.empty_table(), parquet_file)
+        publish_raw(parquet_file)
     
-    # Merge with existing data
-    final_df = merge_with_existing_parquet(df, parquet_file)
+    # Merge into the tail segment; the base file is left untouched
+    with stage('merge_tail', series=series_name(station_id, parameter)) as st:
+        tail_df, new_rows = merge_into_tail(df, parquet_file)
+        tail_file = tail_path(parquet_file)
+        
+        # Write to Parquet
+        print(f"Writing to {tail_file}...")
+        table = pa.Table.from_pandas(tail_df, schema=schema, preserve_index=False)
+        write_raw(table, tail_file)
+        st.add(rows_in=len(df), rows_out=len(tail_df), bytes_out=path_bytes(tail_file))
+    count(rows_out=len(tail_df))
     
-    # Write to Parquet
-    print(f"Writing to {parquet_file}...")
-    table = pa.Table.from_pandas(final_df, schema=schema, preserve_index=False)
-    pq.write_table(table, parquet_file, compression='zstd')
+    # Publish to web public folder (hard link, no second write)
+    print(f"Publishing to web public folder...")
+    with stage('publish', series=series_name(station_id, parameter)):
+        publish_raw(tail_file)
     
-    # Sync to web public folder
-    print(f"Syncing to web public folder...")
-    web_file = WEB_PARQUET_DIR / parquet_file.name
-    pq.write_table(table, web_file, compression='zstd')
+    # Only the merged rows: live rows the base already covers were not stored
+    if len(new_rows):
+        update_live_aggregates(station_id, parameter, pa.Table.from_pandas(new_rows, schema=schema, preserve_index=False))
     
-    print(f"📊 {parameter}:")
-    print(f"   Total records: {len(final_df)}")
-    print(f"   Date range: {final_df['ts'].min()} to {final_df['ts'].max()}")
+    total = pq.ParquetFile(parquet_file).metadata.num_rows + len(tail_df)
+    print(f"📊 {station_id} {parameter}:")
+    print(f"   Total records: {total}")
+    if len(tail_df):
+        print(f"   Tail range: {tail_df['ts'].min()} to {tail_df['ts'].max()}")
     
-    return len(final_df)
+    return total
 
 def main():
+    parser = argparse.ArgumentParser(description="Migrate live JSONL data to Parquet")
+    parser.add_argument('--days-back', type=int, default=7,
+                        help="Number of days of live data to read (default: 7)")
+    parser.add_argument('--live-store', choices=LIVE_STORES, default=DEFAULT_LIVE_STORE,
+                        help=f"Live store backend, see live_store.py (default: {DEFAULT_LIVE_STORE}, env ISAR_LIVE_STORE)")
+    parser.add_argument('--raw-layout', choices=RAW_LAYOUTS, default='file',
+                        help="Raw Parquet layout: one file per parameter, or year partitions (default: file)")
+    parser.add_argument('--compact', action='store_true',
+                        help="Fold the tail segments into the base files instead of migrating (file layout)")
+    args = parser.parse_args()
+    
+    # Stage timings, row counts and peak memory go to the run history (telemetry.py)
+    with Telemetry('migrate') as run:
+        result = run_migration(args)
+    for line in run.summary():
+        print(line)
+    return result
+
+def run_migration(args):
+    if args.compact:
+        print("=" * 80)
+        print("🗜️  Compacting raw Parquet tail segments")
+        print("=" * 80)
+        for parameter in ('water_level_cm', 'water_temperature_c'):
+            for tail_file in sorted(PARQUET_DIR.glob(f"station_*_{parameter}_tail.parquet")):
+                station_id = tail_file.name.split('_')[1]
+                compact_parameter(station_id, parameter, RAW_SCHEMA)
+        return 0
+    
     print("=" * 80)
     print("🔄 Migrating Live JSONL Data to Parquet")
     print("=" * 80)
@@ -139,10 +326,12 @@ def main():
     total_records = 0
     
     # Migrate water level
-    total_records += migrate_parameter('water_level_cm', days_back=7)
+    total_records += migrate_parameter('water_level_cm', days_back=args.days_back, raw_layout=args.raw_layout,
+                                       live_store=args.live_store)
     
     # Migrate water temperature
-    total_records += migrate_parameter('water_temperature_c', days_back=7)
+    total_records += migrate_parameter('water_temperature_c', days_back=args.days_back, raw_layout=args.raw_layout,
+                                       live_store=args.live_store)
     
     print()
     print("=" * 80)
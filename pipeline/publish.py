@@ -0,0 +1,192 @@
+"""
+Atomic publishing of pipeline outputs into the web root (web/public/data/parquet).
+
+Files are written once on the data side (temp file, fsync, os.replace) and then
+hard-linked into the web root, falling back to a copy across filesystems. Every
+name in the web root is swapped in with os.replace, so nginx never serves a
+half-written file.
+
+Parquet files are additionally published under a content-hashed name
+(station_16005701_water_level_cm.<hash>.parquet) and listed in manifest.json,
+so the frontend can fetch immutable URLs that nginx caches for a long time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MANIFEST_FILENAME = "manifest.json"
+HASH_LEN = 16
+
+
+def fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fsync_path(path)
+    except OSError:
+        # Not supported on every platform/filesystem; the rename is still atomic.
+        pass
+
+
+@contextmanager
+def atomic_path(path: Path) -> Iterator[Path]:
+    # Yields a temp path next to `path`; once the block completes the temp file
+    # is fsynced and swapped in. On error the temp file is removed.
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        yield tmp
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    fsync_path(tmp)
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def write_parquet_atomic(table: pa.Table, path: Path) -> None:
+    with atomic_path(path) as tmp:
+        pq.write_table(table, tmp, compression="zstd")
+
+
+class AtomicParquetWriter:
+    # pq.ParquetWriter for files written piece by piece: writes go to the temp
+    # file of atomic_path(path), which is swapped in when the with block exits
+    # cleanly and removed otherwise.
+
+    def __init__(self, path: Path, schema: pa.Schema, **options: Any) -> None:
+        self._stack = ExitStack()
+        tmp = self._stack.enter_context(atomic_path(path))
+        try:
+            self._writer = pq.ParquetWriter(tmp, schema, **options)
+        except BaseException as exc:
+            self._stack.__exit__(type(exc), exc, exc.__traceback__)
+            raise
+
+    def write_table(self, table: pa.Table, row_group_size: Optional[int] = None) -> None:
+        self._writer.write_table(table, row_group_size=row_group_size)
+
+    def __enter__(self) -> "AtomicParquetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._writer.close()
+        return self._stack.__exit__(exc_type, exc, tb)
+
+
+def content_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:HASH_LEN]
+
+
+def place_atomic(src: Path, dst: Path, *, link: bool = True) -> None:
+    # Make `dst` a hard link to (or, across filesystems, a copy of) `src`.
+    # Hard links are only safe for files that are never rewritten in place.
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        if not link:
+            raise OSError("copy requested")
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+        fsync_path(tmp)
+    os.replace(tmp, dst)
+
+
+def _hashed_relpath(rel: str, digest: str) -> str:
+    p = Path(rel)
+    return str(p.with_name(f"{p.stem}.{digest}{p.suffix}"))
+
+
+def _hashed_sibling_re(rel: str) -> "re.Pattern[str]":
+    p = Path(rel)
+    return re.compile(rf"^{re.escape(p.stem)}\.[0-9a-f]{{{HASH_LEN}}}{re.escape(p.suffix)}$")
+
+
+def load_manifest(web_root: Path) -> Dict[str, Dict[str, str]]:
+    path = web_root / MANIFEST_FILENAME
+    if not path.exists():
+        return {"files": {}, "previous": {}}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {"files": data.get("files", {}), "previous": data.get("previous", {})}
+
+
+def _write_manifest(web_root: Path, manifest: Dict[str, Dict[str, str]]) -> None:
+    data = {"generated_at": datetime.utcnow().isoformat() + "Z", **manifest}
+    tmp = web_root / f".{MANIFEST_FILENAME}.tmp"
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    fsync_path(tmp)
+    os.replace(tmp, web_root / MANIFEST_FILENAME)
+
+
+def publish(files: Iterable[Tuple[Path, str]], web_root: Path) -> Dict[str, str]:
+    # Publish (source file, path relative to web_root) pairs. Parquet files are
+    # linked under their stable and content-hashed names; other files are copied
+    # (they may be rewritten in place on the data side). Returns {rel: hashed rel}.
+    web_root.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(web_root)
+    published: Dict[str, str] = {}
+    for src, rel in files:
+        is_parquet = src.suffix == ".parquet"
+        place_atomic(src, web_root / rel, link=is_parquet)
+        if not is_parquet:
+            continue
+        hashed = _hashed_relpath(rel, content_hash(src))
+        if not (web_root / hashed).exists():
+            place_atomic(src, web_root / hashed)
+        current = manifest["files"].get(rel)
+        if current and current != hashed:
+            manifest["previous"][rel] = current
+        manifest["files"][rel] = hashed
+        published[rel] = hashed
+
+    if published:
+        _write_manifest(web_root, manifest)
+        for rel in published:
+            _remove_stale_versions(web_root, rel, manifest)
+    return published
+
+
+def _remove_stale_versions(web_root: Path, rel: str, manifest: Dict[str, Dict[str, str]]) -> None:
+    # Keep the current and previous hashed versions (a client may still hold the
+    # previous manifest); delete older ones.
+    keep = {manifest["files"].get(rel), manifest["previous"].get(rel)}
+    pattern = _hashed_sibling_re(rel)
+    folder = (web_root / rel).parent
+    for candidate in folder.iterdir():
+        if pattern.match(candidate.name) and str(Path(rel).with_name(candidate.name)) not in keep:
+            candidate.unlink()
+
+
+def publish_tree(src_root: Path, web_root: Path) -> Dict[str, str]:
+    # Publish every file below src_root under the same relative path, except
+    # hidden ones and those in hidden directories (e.g. ingest checkpoints).
+    files = [
+        (p, str(p.relative_to(src_root)))
+        for p in sorted(src_root.rglob("*"))
+        if p.is_file() and not any(part.startswith(".") for part in p.relative_to(src_root).parts)
+    ]
+    return publish(files, web_root)
@@ -0,0 +1,381 @@
+"""
+Storage layouts for the raw 15-minute series.
+
+Single-file layout: one base file per parameter plus a small tail segment with
+live rows newer than the base (merged into the base by compaction).
+
+    raw/station_16005701_water_level_cm.parquet
+    raw/station_16005701_water_level_cm_tail.parquet
+
+Hive-style, year-partitioned layout, one partition root per station:
+
+    raw/station_id=16005701/parameter=water_level_cm/year=2025/part-0.parquet
+    raw/station_id=16005701/_partitions.json   (index: rows and ts min/max per year)
+
+Shared by ingest_lfu_csv_to_parquet.py and migrate_live_to_parquet.py. Updates
+only rewrite the tail segment or the year partitions that receive rows.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from publish import AtomicParquetWriter, fsync_path, publish
+from stations import series_name
+
+RAW_LAYOUTS = ("file", "partitioned")
+INDEX_FILENAME = "_partitions.json"
+PART_FILENAME = "part-0.parquet"
+
+# The parameters of a station share one index; ingest updates them from
+# concurrent threads.
+_INDEX_LOCK = threading.Lock()
+
+
+def _runs(keys: np.ndarray) -> List[Tuple[int, int]]:
+    # (start, end) of each run of equal consecutive keys.
+    if len(keys) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def _is_sorted_by_ts(table: pa.Table) -> bool:
+    ts = table.column("ts").cast(pa.int64()).to_numpy()
+    return bool(np.all(ts[1:] >= ts[:-1])) if len(ts) > 1 else True
+
+
+class RawStreamWriter:
+    # Writes a file with the raw profile (see write_raw) from rows arriving in
+    # ts order: each write() gets rows sorted by ts, none earlier than the
+    # previous write's, and should cover whole calendar months (a month split
+    # across writes becomes two row groups). Atomic like write_raw.
+
+    def __init__(self, path: Path, schema: pa.Schema) -> None:
+        self.rows = 0
+        self.ts_min: Optional[int] = None  # ns since epoch
+        self.ts_max: Optional[int] = None
+        self._writer = AtomicParquetWriter(
+            path,
+            schema,
+            compression="zstd",
+            write_statistics=True,
+            write_page_index=True,
+            sorting_columns=[pq.SortingColumn(schema.get_field_index("ts"))],
+        )
+
+    def write(self, table: pa.Table) -> None:
+        if table.num_rows == 0:
+            return
+        ts = table.column("ts")
+        months = pc.year(ts).to_numpy() * 12 + pc.month(ts).to_numpy()
+        for start, end in _runs(months):
+            self._writer.write_table(table.slice(start, end - start), row_group_size=end - start)
+        ts = ts.cast(pa.int64())
+        if self.ts_min is None:
+            self.ts_min = ts[0].as_py()
+        self.ts_max = ts[-1].as_py()
+        self.rows += table.num_rows
+
+    def __enter__(self) -> "RawStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return self._writer.__exit__(exc_type, exc, tb)
+
+
+def write_raw(table: pa.Table, path: Path) -> None:
+    # Raw write profile: rows sorted by ts and one row group per calendar month
+    # (~2,900 rows at 15-minute resolution) with column statistics, a page index
+    # and sorting metadata, so range readers such as DuckDB-WASM fetch only the
+    # months a query touches. Dictionary encoding (on by default) stores the
+    # constant station_id/parameter columns as one run per row group.
+    if not _is_sorted_by_ts(table):
+        table = _sort_by_ts(table)
+    with RawStreamWriter(path, table.schema) as writer:
+        writer.write(table)
+
+
+def raw_file_path(raw_dir: Path, station_id: Any, parameter: str, raw_layout: str = "file") -> Path:
+    # Base file of a series. The functions below take the base file's
+    # directory as the partition root, so in the partitioned layout this is a
+    # nominal path inside the station's root.
+    name = f"{series_name(station_id, parameter)}.parquet"
+    if raw_layout == "partitioned":
+        return raw_dir / f"station_id={station_id}" / name
+    return raw_dir / name
+
+
+def tail_path(raw_file: Path) -> Path:
+    return raw_file.with_name(f"{raw_file.stem}_tail.parquet")
+
+
+def footer_max_ts(path: Path) -> Optional[Any]:
+    # Max ts from the row group statistics in the footer; no data pages are read
+    # unless a row group lacks statistics.
+    if not path.exists():
+        return None
+    md = pq.ParquetFile(path).metadata
+    col = md.schema.to_arrow_schema().get_field_index("ts")
+    max_ts = None
+    for i in range(md.num_row_groups):
+        stats = md.row_group(i).column(col).statistics
+        if stats is None or not stats.has_min_max:
+            return pc.max(pq.read_table(path, columns=["ts"]).column("ts")).as_py()
+        max_ts = stats.max if max_ts is None else max(max_ts, stats.max)
+    return max_ts
+
+
+def trim_tail(raw_file: Path, schema: pa.Schema) -> None:
+    # After the base file was rebuilt, keep only tail rows newer than it (the
+    # tail is always written, possibly empty, so readers can rely on it).
+    tail = tail_path(raw_file)
+    base_max = footer_max_ts(raw_file)
+    if not tail.exists():
+        write_raw(schema.empty_table(), tail)
+        return
+    rows = pq.read_table(tail, schema=schema)
+    if base_max is not None:
+        cutoff = pa.scalar(base_max, type=schema.field("ts").type)
+        rows = rows.filter(pc.greater(rows.column("ts"), cutoff))
+    write_raw(rows, tail)
+
+
+def partition_relpath(parameter: str, year: int) -> str:
+    return f"parameter={parameter}/year={year}/{PART_FILENAME}"
+
+
+def load_index(raw_root: Path) -> Dict[str, Any]:
+    path = raw_root / INDEX_FILENAME
+    if not path.exists():
+        return {"parameters": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_index(raw_root: Path, index: Dict[str, Any]) -> None:
+    index["generated_at"] = datetime.utcnow().isoformat() + "Z"
+    tmp = raw_root / f".{INDEX_FILENAME}.tmp"
+    tmp.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+    fsync_path(tmp)
+    os.replace(tmp, raw_root / INDEX_FILENAME)
+
+
+def has_partitions(raw_root: Path, parameter: str) -> bool:
+    return bool(load_index(raw_root)["parameters"].get(parameter))
+
+
+def _ts_iso(value: Any) -> str:
+    return str(np.datetime64(value, "ns").astype("datetime64[s]"))
+
+
+def _sort_by_ts(table: pa.Table) -> pa.Table:
+    # Arrow's sort is stable: rows with equal ts keep their order.
+    return table.take(pc.sort_indices(table, sort_keys=[("ts", "ascending")]))
+
+
+def _split_years(table: pa.Table) -> Dict[int, pa.Table]:
+    # table must be sorted by ts.
+    if table.num_rows == 0:
+        return {}
+    years = pc.year(table.column("ts")).to_numpy()
+    return {int(years[s]): table.slice(s, e - s) for s, e in _runs(years)}
+
+
+def _partition_entry(parameter: str, year: int, rows: int, ts_min: Any, ts_max: Any) -> Dict[str, Any]:
+    return {
+        "year": year,
+        "path": partition_relpath(parameter, year),
+        "rows": rows,
+        "ts_min": _ts_iso(ts_min),
+        "ts_max": _ts_iso(ts_max),
+    }
+
+
+def _write_partition(raw_root: Path, parameter: str, year: int, table: pa.Table) -> Dict[str, Any]:
+    path = raw_root / partition_relpath(parameter, year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_raw(table, path)
+    ts = table.column("ts").cast(pa.int64())
+    return _partition_entry(parameter, year, table.num_rows, pc.min(ts).as_py(), pc.max(ts).as_py())
+
+
+def _set_entries(index: Dict[str, Any], parameter: str, entries: Iterable[Dict[str, Any]]) -> None:
+    by_year = {e["year"]: e for e in index["parameters"].get(parameter, [])}
+    by_year.update({e["year"]: e for e in entries})
+    index["parameters"][parameter] = [by_year[y] for y in sorted(by_year)]
+
+
+def _update_index(
+    raw_root: Path, parameter: str, entries: Iterable[Dict[str, Any]], replace: bool = False
+) -> None:
+    # Set `entries` in the index (replace=True drops the parameter's other years).
+    with _INDEX_LOCK:
+        index = load_index(raw_root)
+        if replace:
+            index["parameters"][parameter] = []
+        _set_entries(index, parameter, entries)
+        write_index(raw_root, index)
+
+
+def newer_partition_rows(raw_root: Path, parameter: str, schema: pa.Schema, cutoff: Any) -> pa.Table:
+    # Stored rows with ts > cutoff (all rows if cutoff is None), sorted by ts.
+    # The partitioned counterpart of trim_tail: live rows merged by
+    # migrate_live_to_parquet that a rebuild from the CSV files must keep, read
+    # before write_partitions/PartitionStreamWriter replace the partitions.
+    entries = load_index(raw_root)["parameters"].get(parameter, [])
+    if cutoff is not None:
+        cutoff = pa.scalar(cutoff, type=schema.field("ts").type)
+        entries = [e for e in entries if e["year"] >= cutoff.as_py().year]
+    paths = [raw_root / e["path"] for e in entries]
+    tables = [pq.read_table(p, schema=schema, partitioning=None) for p in paths if p.exists()]
+    if not tables:
+        return schema.empty_table()
+    rows = pa.concat_tables(tables)
+    if cutoff is not None:
+        rows = rows.filter(pc.greater(rows.column("ts"), cutoff))
+    return _sort_by_ts(rows)
+
+
+def write_partitions(raw_root: Path, parameter: str, table: pa.Table) -> None:
+    # Full rebuild: replace every partition of `parameter` with `table`.
+    shutil.rmtree(raw_root / f"parameter={parameter}", ignore_errors=True)
+    entries = [
+        _write_partition(raw_root, parameter, year, part)
+        for year, part in _split_years(_sort_by_ts(table)).items()
+    ]
+    _update_index(raw_root, parameter, entries, replace=True)
+
+
+class PartitionStreamWriter:
+    # write_partitions for rows arriving in ts order (see RawStreamWriter): one
+    # partition is open at a time and closed once the rows reach the next year.
+    # The index is written when the with block exits cleanly.
+
+    def __init__(self, raw_root: Path, parameter: str, schema: pa.Schema) -> None:
+        shutil.rmtree(raw_root / f"parameter={parameter}", ignore_errors=True)
+        self.raw_root = raw_root
+        self.parameter = parameter
+        self.schema = schema
+        self._entries: List[Dict[str, Any]] = []
+        self._year: Optional[int] = None
+        self._writer: Optional[RawStreamWriter] = None
+
+    def _close_year(self, exc_type=None, exc=None, tb=None) -> None:
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        writer.__exit__(exc_type, exc, tb)
+        if exc_type is None:
+            self._entries.append(
+                _partition_entry(self.parameter, self._year, writer.rows, writer.ts_min, writer.ts_max)
+            )
+
+    def write(self, table: pa.Table) -> None:
+        for year, part in _split_years(table).items():
+            if year != self._year:
+                self._close_year()
+                path = self.raw_root / partition_relpath(self.parameter, year)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = RawStreamWriter(path, self.schema)
+                self._year = year
+            self._writer.write(part)
+
+    def __enter__(self) -> "PartitionStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._close_year(exc_type, exc, tb)
+        if exc_type is None:
+            _update_index(self.raw_root, self.parameter, self._entries, replace=True)
+        return False
+
+
+def read_partitions(
+    raw_root: Path, parameter: str, years: Optional[Iterable[int]] = None
+) -> Optional[pa.Table]:
+    # Concatenated partitions (all, or only `years`); None if none exist.
+    entries = load_index(raw_root)["parameters"].get(parameter, [])
+    wanted = None if years is None else set(years)
+    paths = [raw_root / e["path"] for e in entries if wanted is None or e["year"] in wanted]
+    tables = [pq.read_table(p) for p in paths if p.exists()]
+    if not tables:
+        return None
+    return pa.concat_tables(tables)
+
+
+def read_raw_range(
+    raw_file: Path,
+    parameter: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    raw_layout: str = "file",
+) -> pa.Table:
+    # Stored rows with start <= ts < end (all rows without bounds), sorted by
+    # ts: base file + tail segment, or the year partitions overlapping the
+    # range. Row groups outside the range are skipped using their statistics.
+    if raw_layout == "partitioned":
+        entries = load_index(raw_file.parent)["parameters"].get(parameter, [])
+        paths = [
+            raw_file.parent / e["path"]
+            for e in entries
+            if (start is None or start.year <= e["year"]) and (end is None or e["year"] <= end.year)
+        ]
+    else:
+        paths = [raw_file, tail_path(raw_file)]
+    filters = []
+    if start is not None:
+        filters.append(("ts", ">=", start))
+    if end is not None:
+        filters.append(("ts", "<", end))
+    tables = [
+        pq.read_table(p, filters=filters or None, partitioning=None) for p in paths if p.exists()
+    ]
+    if not tables:
+        raise FileNotFoundError(f"No raw data for {parameter} at {raw_file}")
+    return _sort_by_ts(pa.concat_tables(tables))
+
+
+def merge_into_partitions(raw_root: Path, parameter: str, new_rows: pa.Table) -> pa.Table:
+    # Merge `new_rows` by ts (new rows win) into the year partitions they touch
+    # and return the merged contents of those partitions.
+    new_rows = _sort_by_ts(new_rows)
+    entries: List[Dict[str, Any]] = []
+    merged: List[pa.Table] = []
+    for year, rows in _split_years(new_rows).items():
+        path = raw_root / partition_relpath(parameter, year)
+        if path.exists():
+            existing = pq.read_table(path, schema=rows.schema)
+            existing = existing.filter(
+                pc.invert(pc.is_in(existing.column("ts"), rows.column("ts")))
+            )
+            rows = _sort_by_ts(pa.concat_tables([existing, rows]))
+        entries.append(_write_partition(raw_root, parameter, year, rows))
+        merged.append(rows)
+    _update_index(raw_root, parameter, entries)
+    return pa.concat_tables(merged) if merged else new_rows
+
+
+def sync_partitions(
+    raw_root: Path, web_root: Path, parameter: str, years: Iterable[int], prefix: Optional[str] = None
+) -> None:
+    # Publish the given year partitions and the index below web_root/<prefix>
+    # (default: the name of raw_root).
+    prefix = prefix or raw_root.name
+    files = [
+        (raw_root / partition_relpath(parameter, year), f"{prefix}/{partition_relpath(parameter, year)}")
+        for year in years
+    ]
+    files.append((raw_root / INDEX_FILENAME, f"{prefix}/{INDEX_FILENAME}"))
+    publish(files, web_root)
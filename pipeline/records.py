@@ -0,0 +1,211 @@
+"""
+Records (extremes) of the raw 15-minute series: min and max with their ts and
+status, all-time, per calendar year, per calendar month (1-12, over all years)
+and per day of year (1-366, over all years).
+
+    records/station_16005701_water_level_cm_records.parquet
+
+One row per (scope, period); scope is "all" (period 0), "year", "month" or
+"doy". Ties go to the earliest ts, so partial results can be merged in any
+order. Built in the ingest pass and merged with new rows on live migration.
+Shared by ingest_lfu_csv_to_parquet.py and migrate_live_to_parquet.py.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from publish import write_parquet_atomic
+
+SCOPES = ("all", "year", "month", "doy")
+
+RECORDS_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int32()),
+        ("parameter", pa.string()),
+        ("scope", pa.string()),
+        ("period", pa.int16()),
+        ("min_value", pa.float64()),
+        ("min_ts", pa.timestamp("ns")),
+        ("min_status", pa.string()),
+        ("max_value", pa.float64()),
+        ("max_ts", pa.timestamp("ns")),
+        ("max_status", pa.string()),
+    ]
+)
+
+
+def records_path(daily_parquet: Path) -> Path:
+    name = daily_parquet.name.replace("_daily.parquet", "_records.parquet")
+    return daily_parquet.parent.parent / "records" / name
+
+
+def _scope_periods(ts: np.ndarray, scope: str) -> np.ndarray:
+    if scope == "all":
+        return np.zeros(len(ts), dtype=np.int64)
+    years = ts.astype("datetime64[Y]")
+    if scope == "year":
+        return years.astype(np.int64) + 1970
+    if scope == "month":
+        return ts.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    days = ts.astype("datetime64[D]")
+    return (days - years.astype("datetime64[D]")).astype(np.int64) + 1
+
+
+def _extremes(
+    period: np.ndarray, value: np.ndarray, ts: np.ndarray, status: np.ndarray
+) -> Dict[str, np.ndarray]:
+    # Per period: the lowest and the highest value, earliest ts on ties.
+    out: Dict[str, np.ndarray] = {}
+    for kind, sign in (("min", 1.0), ("max", -1.0)):
+        order = np.lexsort((ts, sign * value, period))
+        p = period[order]
+        first = order[np.r_[True, p[1:] != p[:-1]]]
+        out["period"] = period[first]
+        out[f"{kind}_value"] = value[first]
+        out[f"{kind}_ts"] = ts[first]
+        out[f"{kind}_status"] = status[first]
+    return out
+
+
+def _reduce(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    # Partials of one scope -> one partial with the extremes of all of them.
+    cat = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    mins = _extremes(cat["period"], cat["min_value"], cat["min_ts"], cat["min_status"])
+    maxs = _extremes(cat["period"], cat["max_value"], cat["max_ts"], cat["max_status"])
+    out = {"period": mins["period"]}
+    for kind, res in (("min", mins), ("max", maxs)):
+        for field in ("value", "ts", "status"):
+            out[f"{kind}_{field}"] = res[f"{kind}_{field}"]
+    return out
+
+
+class RecordsAggregator:
+    # Partial extremes per chunk; finalize() reduces them once more. Only rows
+    # with a value count. Every COMPACT_AT partials are reduced to one, so
+    # memory does not grow with the number of chunks.
+
+    COMPACT_AT = 64
+
+    def __init__(self) -> None:
+        self._partials: Dict[str, List[Dict[str, np.ndarray]]] = {s: [] for s in SCOPES}
+
+    def merge(self, other: "RecordsAggregator") -> None:
+        for scope in SCOPES:
+            self._partials[scope].extend(other._partials[scope])
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        values = batch.column("value").to_numpy(zero_copy_only=False).astype(np.float64)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        ts = batch.column("ts").to_numpy()[valid].astype("datetime64[ns]")
+        status = batch.column("status")
+        if pa.types.is_dictionary(status.type):
+            status = status.cast(pa.string())
+        status = status.to_numpy(zero_copy_only=False)[valid]
+        ts_ns = ts.astype(np.int64)
+        for scope in SCOPES:
+            parts = self._partials[scope]
+            parts.append(_extremes(_scope_periods(ts, scope), values[valid], ts_ns, status))
+            if len(parts) >= self.COMPACT_AT:
+                self._partials[scope] = [_reduce(parts)]
+
+    def add_table(self, table: pa.Table) -> None:
+        # Existing records as one more partial per scope.
+        for scope in SCOPES:
+            rows = table.filter(pc.equal(table.column("scope"), scope))
+            if rows.num_rows == 0:
+                continue
+            part = {"period": rows.column("period").to_numpy().astype(np.int64)}
+            for kind in ("min", "max"):
+                part[f"{kind}_value"] = rows.column(f"{kind}_value").to_numpy()
+                part[f"{kind}_ts"] = rows.column(f"{kind}_ts").cast(pa.int64()).to_numpy()
+                part[f"{kind}_status"] = rows.column(f"{kind}_status").to_numpy(zero_copy_only=False)
+            self._partials[scope].append(part)
+
+    def finalize(self, station_id: int, parameter: str) -> pa.Table:
+        cols: Dict[str, list] = {name: [] for name in RECORDS_SCHEMA.names}
+        for scope in SCOPES:
+            parts = self._partials[scope]
+            if not parts:
+                continue
+            res = _reduce(parts)
+            n = len(res["period"])
+            cols["station_id"].extend([station_id] * n)
+            cols["parameter"].extend([parameter] * n)
+            cols["scope"].extend([scope] * n)
+            for name, values in res.items():
+                cols[name].extend(values.tolist())
+        arrays = {
+            name: pa.array(values, type=RECORDS_SCHEMA.field(name).type)
+            for name, values in cols.items()
+        }
+        return pa.table(arrays, schema=RECORDS_SCHEMA)
+
+
+def write_records(table: pa.Table, daily_parquet: Path) -> Path:
+    path = records_path(daily_parquet)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_parquet_atomic(table, path)
+    return path
+
+
+def merge_new_rows(existing: pa.Table, new_rows: pa.Table) -> Optional[pa.Table]:
+    # Records after adding `new_rows`, in O(new rows). Returns None if a new row
+    # replaces the row behind an existing record with a different value (the
+    # record may no longer hold); the records must then be rebuilt from raw.
+    held: Dict[int, float] = {}
+    for kind in ("min", "max"):
+        ts = existing.column(f"{kind}_ts").cast(pa.int64()).to_pylist()
+        held.update(zip(ts, existing.column(f"{kind}_value").to_pylist()))
+    new_ts = new_rows.column("ts").cast(pa.int64())
+    hit = pc.is_in(new_ts, pa.array(list(held), type=pa.int64()))
+    if pc.any(hit).as_py():
+        replaced = new_rows.filter(hit)
+        for ts, value in zip(
+            replaced.column("ts").cast(pa.int64()).to_pylist(),
+            replaced.column("value").to_pylist(),
+        ):
+            if value != held[ts]:
+                return None
+    agg = RecordsAggregator()
+    agg.add_table(existing)
+    for batch in new_rows.to_batches():
+        agg.add_batch(batch)
+    station_id = existing.column("station_id")[0].as_py()
+    parameter = existing.column("parameter")[0].as_py()
+    return agg.finalize(station_id, parameter)
+
+
+def build_records(rows: pa.Table, station_id: int, parameter: str) -> pa.Table:
+    agg = RecordsAggregator()
+    for batch in rows.to_batches():
+        agg.add_batch(batch)
+    return agg.finalize(station_id, parameter)
+
+
+def update_records(
+    daily_parquet: Path,
+    new_rows: pa.Table,
+    station_id: int,
+    parameter: str,
+    read_all_rows: Callable[[], pa.Table],
+) -> Path:
+    # Merge `new_rows` into the records file; `read_all_rows()` (returning the
+    # full stored raw table) is only called when a rebuild is needed.
+    path = records_path(daily_parquet)
+    table = None
+    if path.exists():
+        existing = pq.read_table(path)
+        if existing.num_rows:
+            table = merge_new_rows(existing, new_rows)
+    if table is None:
+        table = build_records(read_all_rows(), station_id, parameter)
+    return write_records(table, daily_parquet)
@@ -0,0 +1,590 @@
+"""
+Rollups of the raw 15-minute series: count/mean/min/max/status_mode per hour,
+day, ISO week, month and year, one Parquet file per resolution.
+
+    hourly/station_16005701_water_level_cm_hourly.parquet    (ts: start of hour)
+    daily/station_16005701_water_level_cm_daily.parquet      (date)
+    weekly/station_16005701_water_level_cm_weekly.parquet    (date: Monday of ISO week)
+    monthly/station_16005701_water_level_cm_monthly.parquet  (date: first of month)
+    yearly/station_16005701_water_level_cm_yearly.parquet    (date: 1 January)
+
+Hourly and daily are aggregated from the rows; weekly, monthly and yearly are
+folded from the daily partials, so one pass over the rows builds all of them.
+Shared by ingest_lfu_csv_to_parquet.py and migrate_live_to_parquet.py.
+"""
+
+from __future__ import annotations
+
+import warnings
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from publish import AtomicParquetWriter, write_parquet_atomic
+from raw_partitions import RawStreamWriter, write_raw
+
+ROLLUPS = ("hourly", "daily", "weekly", "monthly", "yearly")
+# Rollups derived from the daily partials instead of from rows.
+_FROM_DAILY = ("weekly", "monthly", "yearly")
+
+
+def key_column(resolution: str) -> str:
+    return "ts" if resolution == "hourly" else "date"
+
+
+def _rollup_schema(resolution: str) -> pa.Schema:
+    key_type = pa.timestamp("ns") if resolution == "hourly" else pa.date32()
+    return pa.schema(
+        [
+            ("station_id", pa.int32()),
+            ("parameter", pa.string()),
+            (key_column(resolution), key_type),
+            ("count", pa.int32()),
+            ("mean", pa.float64()),
+            ("min", pa.float64()),
+            ("max", pa.float64()),
+            ("status_mode", pa.string()),
+        ]
+    )
+
+
+ROLLUP_SCHEMAS = {r: _rollup_schema(r) for r in ROLLUPS}
+DAILY_SCHEMA = ROLLUP_SCHEMAS["daily"]
+
+# Optional daily quantile columns (--daily-quantiles).
+QUANTILES = (10, 50, 90)
+QUANTILE_COLUMNS = [f"p{q}" for q in QUANTILES] + ["stddev"]
+DAILY_QUANTILE_SCHEMA = pa.schema(
+    list(DAILY_SCHEMA) + [(name, pa.float64()) for name in QUANTILE_COLUMNS]
+)
+
+
+def daily_has_quantiles(daily_parquet: Path) -> bool:
+    return "p50" in pq.read_schema(daily_parquet).names
+
+
+def rollup_path(daily_parquet: Path, resolution: str) -> Path:
+    # daily/station_X_param_daily.parquet -> <resolution>/station_X_param_<resolution>.parquet
+    name = daily_parquet.name.replace("_daily.parquet", f"_{resolution}.parquet")
+    return daily_parquet.parent.parent / resolution / name
+
+
+def _days_to_period(days: np.ndarray, resolution: str) -> np.ndarray:
+    # Day numbers (days since epoch) -> day number of the period start.
+    if resolution == "daily":
+        return days
+    if resolution == "weekly":
+        # 1970-01-01 was a Thursday; ISO weeks start on Monday.
+        return days - (days + 3) % 7
+    unit = "M" if resolution == "monthly" else "Y"
+    return days.astype("datetime64[D]").astype(f"datetime64[{unit}]").astype("datetime64[D]").astype(np.int64)
+
+
+def period_keys(ts: np.ndarray, resolution: str) -> np.ndarray:
+    # datetime64 timestamps -> period keys (hours since epoch for hourly, day
+    # number of the period start otherwise). NumPy floors when coarsening.
+    if resolution == "hourly":
+        return ts.astype("datetime64[h]").astype(np.int64)
+    return _days_to_period(ts.astype("datetime64[D]").astype(np.int64), resolution)
+
+
+def _table_keys(table: pa.Table, resolution: str) -> np.ndarray:
+    col = table.column(key_column(resolution))
+    if resolution == "hourly":
+        return period_keys(col.to_numpy(), resolution)
+    return col.cast(pa.int32()).to_numpy().astype(np.int64)
+
+
+def _segment_sums(values: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # Sum contiguous segments of `values`. Segments of equal length are summed
+    # as rows of a 2-D block so NumPy uses the same pairwise summation as a
+    # per-group Series.sum() would; the result is bit-identical to it.
+    sums = np.empty(len(starts), dtype=np.float64)
+    for n in np.unique(counts):
+        sel = np.flatnonzero(counts == n)
+        idx = starts[sel][:, None] + np.arange(n)
+        sums[sel] = values[idx].sum(axis=1)
+    return sums
+
+
+class RollupAggregator:
+    # Columnar aggregation into periods of one resolution.
+    #
+    # Every chunk is reduced to a small partial table keyed by period (see
+    # period_keys): sum, count, min, max, plus a long-format table of
+    # per-status counts. finalize() merges all partials in one vectorized
+    # reduction. Partials are merged in chunk order, so sums and status
+    # tie-breaks match a row-by-row aggregation.
+
+    def __init__(self, resolution: str = "daily") -> None:
+        if resolution not in ROLLUPS:
+            raise ValueError(f"Unknown rollup resolution: {resolution}")
+        self.resolution = resolution
+        self._partials: List[Dict[str, np.ndarray]] = []
+        self._status_partials: List[Dict[str, np.ndarray]] = []
+        self._rows_seen = 0
+
+    def merge(self, other: "RollupAggregator") -> None:
+        # Append another aggregator's partials as if its rows followed ours
+        # (used to combine per-file aggregators built in worker processes).
+        offset = self._rows_seen
+        self._partials.extend(other._partials)
+        self._status_partials.extend(
+            {**p, "min": p["min"] + offset} for p in other._status_partials
+        )
+        self._rows_seen += other._rows_seen
+
+    def _extend(self, other: "RollupAggregator") -> None:
+        # Append partials taken from the same row stream (row positions are
+        # already comparable, see split()).
+        self._partials.extend(other._partials)
+        self._status_partials.extend(other._status_partials)
+        self._rows_seen = max(self._rows_seen, other._rows_seen)
+
+    def split(self, before_key: int) -> "RollupAggregator":
+        # Move the partials of all periods before `before_key` into a new
+        # aggregator, e.g. to finalize and write periods no later row can touch.
+        done = RollupAggregator(self.resolution)
+        done._rows_seen = self._rows_seen
+        for name in ("_partials", "_status_partials"):
+            keep, move = [], []
+            for p in getattr(self, name):
+                before = p["key"] < before_key
+                if before.all():
+                    move.append(p)
+                elif before.any():
+                    move.append({k: v[before] for k, v in p.items()})
+                    keep.append({k: v[~before] for k, v in p.items()})
+                else:
+                    keep.append(p)
+            setattr(self, name, keep)
+            setattr(done, name, move)
+        return done
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        # Expects a RAW_SCHEMA batch without null timestamps.
+        n = batch.num_rows
+        offset = self._rows_seen
+        self._rows_seen += n
+        if n == 0:
+            return
+
+        keys = period_keys(batch.column("ts").to_numpy(), self.resolution)
+        values = batch.column("value").to_numpy(zero_copy_only=False).astype(np.float64)
+        valid = ~np.isnan(values)
+
+        if valid.any():
+            k = keys[valid]
+            v = values[valid]
+            order = np.argsort(k, kind="stable")
+            k = k[order]
+            v = v[order]
+            starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+            counts = np.diff(np.r_[starts, len(k)])
+            self._partials.append(
+                {
+                    "key": k[starts],
+                    "sum": _segment_sums(v, starts, counts),
+                    "count": counts.astype(np.int64),
+                    "min": np.minimum.reduceat(v, starts),
+                    "max": np.maximum.reduceat(v, starts),
+                }
+            )
+            # Status is only tracked for rows that carry a value, unless the
+            # whole chunk is empty of values.
+            status_mask = valid
+        else:
+            status_mask = np.ones(n, dtype=bool)
+
+        status = batch.column("status")
+        if not pa.types.is_dictionary(status.type):
+            status = pc.dictionary_encode(status)
+        codes = status.indices.fill_null(-1).to_numpy().astype(np.int64)
+        labels = status.dictionary.to_numpy(zero_copy_only=False)
+        status_mask &= codes >= 0
+        if not status_mask.any():
+            return
+        # One key per (period, status); np.unique gives the count and first row.
+        pos = np.flatnonzero(status_mask)
+        key = keys[pos] * len(labels) + codes[pos]
+        uniq, first, size = np.unique(key, return_index=True, return_counts=True)
+        self._status_partials.append(
+            {
+                "key": uniq // len(labels),
+                "status": labels[uniq % len(labels)],
+                "size": size,
+                "min": offset + pos[first],
+            }
+        )
+
+    def coarsen(self, resolution: str) -> "RollupAggregator":
+        # Fold a daily aggregator into a weekly/monthly/yearly one without
+        # touching the rows again.
+        if self.resolution != "daily" or resolution not in _FROM_DAILY:
+            raise ValueError(f"Cannot derive {resolution} from {self.resolution}")
+        out = RollupAggregator(resolution)
+        merged = self._merge_values()
+        if len(merged["key"]):
+            out._partials.append({**merged, "key": _days_to_period(merged["key"], resolution)})
+        out._status_partials = [
+            {**p, "key": _days_to_period(p["key"], resolution)} for p in self._status_partials
+        ]
+        out._rows_seen = self._rows_seen
+        return out
+
+    def _merge_values(self) -> Dict[str, np.ndarray]:
+        if not self._partials:
+            empty_f = np.empty(0, dtype=np.float64)
+            return {
+                "key": np.empty(0, dtype=np.int64),
+                "sum": empty_f,
+                "count": np.empty(0, dtype=np.int64),
+                "min": empty_f,
+                "max": empty_f,
+            }
+        cat = {k: np.concatenate([p[k] for p in self._partials]) for k in self._partials[0]}
+        # Stable sort keeps chunk order within a period for the sequential sum.
+        order = np.argsort(cat["key"], kind="stable")
+        cat = {k: v[order] for k, v in cat.items()}
+        d = cat["key"]
+        starts = np.flatnonzero(np.r_[True, d[1:] != d[:-1]])
+        return {
+            "key": d[starts],
+            "sum": np.add.reduceat(cat["sum"], starts),
+            "count": np.add.reduceat(cat["count"], starts),
+            "min": np.minimum.reduceat(cat["min"], starts),
+            "max": np.maximum.reduceat(cat["max"], starts),
+        }
+
+    def _merge_status_mode(self) -> pd.Series:
+        # Most frequent status per period; ties go to the status seen first.
+        if not self._status_partials:
+            return pd.Series(dtype=object)
+        st = (
+            pd.DataFrame(
+                {
+                    k: np.concatenate([p[k] for p in self._status_partials])
+                    for k in self._status_partials[0]
+                }
+            )
+            .groupby(["key", "status"], sort=False)
+            .agg({"size": "sum", "min": "min"})
+            .reset_index()
+            .sort_values(["key", "size", "min"], ascending=[True, False, True])
+            .drop_duplicates(subset=["key"], keep="first")
+        )
+        return pd.Series(st["status"].to_numpy(dtype=object), index=st["key"].to_numpy())
+
+    def finalize(self, station_id: int, parameter: str) -> pa.Table:
+        merged = self._merge_values()
+        keep = merged["count"] > 0
+        merged = {k: v[keep] for k, v in merged.items()}
+        status_mode = self._merge_status_mode().reindex(merged["key"])
+
+        if self.resolution == "hourly":
+            period = merged["key"].astype("datetime64[h]").astype("datetime64[ns]")
+        else:
+            period = merged["key"].astype("datetime64[D]").astype(object)
+        df = pd.DataFrame(
+            {
+                "station_id": np.full(len(merged["key"]), station_id, dtype=np.int64),
+                "parameter": parameter,
+                key_column(self.resolution): period,
+                "count": merged["count"],
+                "mean": merged["sum"] / merged["count"],
+                "min": merged["min"],
+                "max": merged["max"],
+                "status_mode": status_mode.to_numpy(dtype=object),
+            }
+        )
+        return pa.Table.from_pandas(
+            df, schema=ROLLUP_SCHEMAS[self.resolution], preserve_index=False
+        )
+
+
+class DailyQuantiles:
+    # Exact per-day quantiles and standard deviation.
+    #
+    # A day has at most 96 samples at 15-minute resolution, so every chunk is
+    # scattered into a fixed (days x 96) block indexed by time-of-day slot;
+    # finalize() stacks the blocks and reduces each day's row. The ingest
+    # stores one row per ts (the last file's), so on the 15-minute grid the
+    # slots hold the same samples as count/mean; should a slot still be filled
+    # twice (timestamps off the grid), it keeps the later value.
+    #
+    # Memory is 768 bytes per day of history held (~280 KB per year), kept
+    # until finalize(): a day cannot be finished early because another input
+    # file may still add samples to it. With --bounded-memory the days of
+    # finished months are split() off and written at each flush, so there it
+    # is bounded by the chunk size; without, it grows with the history like
+    # the raw table the ingest holds anyway.
+
+    SLOT_NS = 15 * 60 * 10**9
+    SLOTS = 96
+
+    def __init__(self) -> None:
+        self._days: List[np.ndarray] = []
+        self._blocks: List[np.ndarray] = []
+
+    def merge(self, other: "DailyQuantiles") -> None:
+        # `other`'s rows count as later than ours.
+        self._days.extend(other._days)
+        self._blocks.extend(other._blocks)
+
+    def split(self, before_day: int) -> "DailyQuantiles":
+        # Move the days before `before_day` into a new instance.
+        done = DailyQuantiles()
+        keep_days, keep_blocks = [], []
+        for days, block in zip(self._days, self._blocks):
+            before = days < before_day
+            if before.any():
+                done._days.append(days[before])
+                done._blocks.append(block[before])
+            if not before.all():
+                keep_days.append(days[~before])
+                keep_blocks.append(block[~before])
+        self._days, self._blocks = keep_days, keep_blocks
+        return done
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        values = batch.column("value").to_numpy(zero_copy_only=False).astype(np.float64)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return
+        ts = batch.column("ts").to_numpy()[valid].astype("datetime64[ns]").astype(np.int64)
+        day_ns = 86_400 * 10**9
+        days = ts // day_ns
+        slots = np.minimum((ts - days * day_ns) // self.SLOT_NS, self.SLOTS - 1)
+        uniq, row = np.unique(days, return_inverse=True)
+        block = np.full((len(uniq), self.SLOTS), np.nan)
+        block[row, slots] = values[valid]
+        self._days.append(uniq)
+        self._blocks.append(block)
+
+    def finalize(self, days: np.ndarray) -> Dict[str, np.ndarray]:
+        # QUANTILE_COLUMNS for `days` (day numbers); NaN where a day has no
+        # samples (stddev needs two).
+        out = {name: np.full(len(days), np.nan) for name in QUANTILE_COLUMNS}
+        if not self._days:
+            return out
+        all_days = np.concatenate(self._days)
+        blocks = np.concatenate(self._blocks)
+        order = np.argsort(all_days, kind="stable")
+        sorted_days = all_days[order]
+        starts = np.flatnonzero(np.r_[True, sorted_days[1:] != sorted_days[:-1]])
+        # Days spread over several chunks: later chunks overwrite filled slots.
+        # Per day and slot, take the last row (in arrival order, which the
+        # stable sort keeps) that has a value; -1 where none has.
+        rank = np.where(
+            np.isnan(blocks)[order], np.int32(-1), np.arange(len(order), dtype=np.int32)[:, None]
+        )
+        last = np.maximum.reduceat(rank, starts, axis=0)
+        merged = np.where(last >= 0, blocks[order[np.maximum(last, 0)], np.arange(self.SLOTS)], np.nan)
+        merged_days = sorted_days[starts]
+
+        pos = np.searchsorted(merged_days, days)
+        found = (pos < len(merged_days)) & (merged_days[np.minimum(pos, len(merged_days) - 1)] == days)
+        rows = merged[pos[found]]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            # Linear interpolation, like DuckDB's quantile_cont.
+            qs = np.nanpercentile(rows, QUANTILES, axis=1) if len(rows) else np.empty((len(QUANTILES), 0))
+            std = np.nanstd(rows, axis=1, ddof=1) if len(rows) else np.empty(0)
+        for q, values in zip(QUANTILES, qs):
+            out[f"p{q}"][found] = values
+        out["stddev"][found] = std
+        return out
+
+
+def _daily_table(
+    daily: RollupAggregator, quantiles: Optional[DailyQuantiles], station_id: int, parameter: str
+) -> pa.Table:
+    table = daily.finalize(station_id, parameter)
+    if quantiles is None:
+        return table
+    days = table.column("date").cast(pa.int32()).to_numpy().astype(np.int64)
+    extra = quantiles.finalize(days)
+    for name in QUANTILE_COLUMNS:
+        table = table.append_column(pa.field(name, pa.float64()), pa.array(extra[name]))
+    return table
+
+
+class RollupPyramid:
+    # All rollups of one series from a single pass over its rows; with
+    # quantiles=True the daily table also gets QUANTILE_COLUMNS.
+
+    def __init__(self, quantiles: bool = False) -> None:
+        self.hourly = RollupAggregator("hourly")
+        self.daily = RollupAggregator("daily")
+        self.quantiles: Optional[DailyQuantiles] = DailyQuantiles() if quantiles else None
+        # Days already removed by flush(), folded into their unfinished
+        # weeks/months/years.
+        self._coarse = {r: RollupAggregator(r) for r in _FROM_DAILY}
+
+    def merge(self, other: "RollupPyramid") -> None:
+        self.hourly.merge(other.hourly)
+        self.daily.merge(other.daily)
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+
+    def add_batch(self, batch: pa.RecordBatch) -> None:
+        self.hourly.add_batch(batch)
+        self.daily.add_batch(batch)
+        if self.quantiles is not None:
+            self.quantiles.add_batch(batch)
+
+    def flush(self, before: np.datetime64, station_id: int, parameter: str) -> Dict[str, pa.Table]:
+        # Remove and return every period that ends at or before the day
+        # boundary `before`, for rows that arrive in ts order: no later row may
+        # fall before `before`. finalize() then returns the remaining periods.
+        day = int(np.datetime64(before, "D").astype(np.int64))
+        daily = self.daily.split(day)
+        quantiles = self.quantiles.split(day) if self.quantiles is not None else None
+        tables = {
+            "hourly": self.hourly.split(day * 24).finalize(station_id, parameter),
+            "daily": _daily_table(daily, quantiles, station_id, parameter),
+        }
+        for resolution in _FROM_DAILY:
+            coarse = self._coarse[resolution]
+            coarse._extend(daily.coarsen(resolution))
+            period_start = int(_days_to_period(np.int64(day), resolution))
+            tables[resolution] = coarse.split(period_start).finalize(station_id, parameter)
+        return {r: tables[r] for r in ROLLUPS}
+
+    def finalize(self, station_id: int, parameter: str) -> Dict[str, pa.Table]:
+        tables = {
+            "hourly": self.hourly.finalize(station_id, parameter),
+            "daily": _daily_table(self.daily, self.quantiles, station_id, parameter),
+        }
+        for resolution in _FROM_DAILY:
+            coarse = RollupAggregator(resolution)
+            coarse._extend(self._coarse[resolution])
+            coarse._extend(self.daily.coarsen(resolution))
+            tables[resolution] = coarse.finalize(station_id, parameter)
+        return {r: tables[r] for r in ROLLUPS}
+
+
+def write_rollup(table: pa.Table, path: Path, resolution: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if resolution == "hourly":
+        # Large enough to benefit from the raw profile (monthly row groups).
+        write_raw(table, path)
+    else:
+        write_parquet_atomic(table, path)
+
+
+def write_rollups(tables: Dict[str, pa.Table], daily_parquet: Path) -> List[Path]:
+    paths = []
+    for resolution, table in tables.items():
+        path = rollup_path(daily_parquet, resolution)
+        write_rollup(table, path, resolution)
+        paths.append(path)
+    return paths
+
+
+class RollupStreamWriter:
+    # write_rollups for tables that arrive in pieces (RollupPyramid.flush, then
+    # finalize): hourly is written month by month with the raw profile, the
+    # other resolutions are buffered into row groups of ROW_GROUP_ROWS rows.
+    # Every file is swapped in when the with block exits cleanly.
+
+    ROW_GROUP_ROWS = 65_536
+
+    def __init__(self, daily_parquet: Path, quantiles: bool = False) -> None:
+        self.paths = [rollup_path(daily_parquet, r) for r in ROLLUPS]
+        self._stack = ExitStack()
+        self._writers = {}
+        self._buffers: Dict[str, List[pa.Table]] = {r: [] for r in ROLLUPS}
+        for resolution, path in zip(ROLLUPS, self.paths):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if resolution == "hourly":
+                writer = RawStreamWriter(path, ROLLUP_SCHEMAS[resolution])
+            else:
+                schema = DAILY_QUANTILE_SCHEMA if resolution == "daily" and quantiles else ROLLUP_SCHEMAS[resolution]
+                writer = AtomicParquetWriter(path, schema, compression="zstd")
+            self._writers[resolution] = self._stack.enter_context(writer)
+
+    def _write_buffer(self, resolution: str) -> None:
+        if self._buffers[resolution]:
+            table = pa.concat_tables(self._buffers[resolution])
+            self._writers[resolution].write_table(table, row_group_size=table.num_rows)
+            self._buffers[resolution] = []
+
+    def write(self, tables: Dict[str, pa.Table]) -> None:
+        for resolution, table in tables.items():
+            if table.num_rows == 0:
+                continue
+            if resolution == "hourly":
+                self._writers[resolution].write(table)
+                continue
+            self._buffers[resolution].append(table)
+            if sum(t.num_rows for t in self._buffers[resolution]) >= self.ROW_GROUP_ROWS:
+                self._write_buffer(resolution)
+
+    def __enter__(self) -> "RollupStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            for resolution in ROLLUPS:
+                self._write_buffer(resolution)
+        return self._stack.__exit__(exc_type, exc, tb)
+
+
+def rollup_window(rows: pa.Table) -> Tuple[datetime, datetime]:
+    # [start, end) covering every period (up to the ISO week and the year) that
+    # `rows` touch; recomputing them needs all raw rows in this window.
+    ts = rows.column("ts").to_numpy()
+    lo = ts.min().astype("datetime64[D]").astype(np.int64)
+    hi = ts.max().astype("datetime64[D]").astype(np.int64)
+    start = min(_days_to_period(lo, "weekly"), _days_to_period(lo, "yearly"))
+    year_end = (np.datetime64(int(hi), "D").astype("datetime64[Y]") + 1).astype("datetime64[D]").astype(np.int64)
+    end = max(_days_to_period(hi, "weekly") + 7, year_end)
+    epoch = datetime(1970, 1, 1)
+    return epoch + timedelta(days=int(start)), epoch + timedelta(days=int(end))
+
+
+def update_rollups(
+    daily_parquet: Path,
+    window_rows: pa.Table,
+    new_rows: pa.Table,
+    station_id: int,
+    parameter: str,
+) -> Dict[str, int]:
+    # Recompute the periods `new_rows` touch from `window_rows` (all stored raw
+    # rows in rollup_window(new_rows)) and splice them into the existing rollup
+    # files. Missing rollup files are skipped (a full ingest creates them).
+    # Returns the number of recomputed periods per written resolution.
+    # Keep the daily file's quantile mode.
+    pyramid = RollupPyramid(
+        quantiles=daily_parquet.exists() and daily_has_quantiles(daily_parquet)
+    )
+    for batch in window_rows.to_batches():
+        pyramid.add_batch(batch)
+    recomputed = pyramid.finalize(station_id, parameter)
+    new_ts = new_rows.column("ts").to_numpy()
+
+    updated: Dict[str, int] = {}
+    for resolution in ROLLUPS:
+        path = rollup_path(daily_parquet, resolution)
+        if not path.exists():
+            continue
+        touched = pa.array(np.unique(period_keys(new_ts, resolution)))
+        fresh = recomputed[resolution]
+        fresh = fresh.filter(pc.is_in(pa.array(_table_keys(fresh, resolution)), touched))
+        old = pq.read_table(path)
+        old = old.filter(pc.invert(pc.is_in(pa.array(_table_keys(old, resolution)), touched)))
+        table = pa.concat_tables([old, fresh.cast(old.schema)])
+        table = table.take(
+            pc.sort_indices(table, sort_keys=[(key_column(resolution), "ascending")])
+        )
+        write_rollup(table, path, resolution)
+        updated[resolution] = len(touched)
+    return updated
@@ -0,0 +1,107 @@
+"""
+Stations: discovery of the gauges in the LfU exports, per-station output names
+and the stations catalog.
+
+    data/fluesse-wasserstand/16005701_01.01.2025_30.11.2025_ezw_0.csv
+    -> station 16005701, parameter water_level_cm
+    -> raw/station_16005701_water_level_cm.parquet, daily/..._daily.parquet, ...
+
+    stations.parquet   (one row per station: StationMeta fields, parameters
+                        and the ts range of the ingested rows)
+
+Every output file holds one station and carries a station_id column, so the
+per-station files of a table form a dataset partitioned by station_id (in the
+partitioned raw layout also on disk: raw/station_id=<id>/). Shared by
+ingest_lfu_csv_to_parquet.py, migrate_live_to_parquet.py and
+verify_data_completeness.py.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from publish import write_parquet_atomic
+
+DEFAULT_STATION_ID = "16005701"
+
+# Input directory under the data root for each parameter.
+PARAMETER_DIRS = {
+    "water_level_cm": "fluesse-wasserstand",
+    "water_temperature_c": "fluesse-wassertemperatur",
+}
+
+CATALOG_FILENAME = "stations.parquet"
+
+STATIONS_SCHEMA = pa.schema(
+    [
+        ("station_id", pa.int32()),
+        ("station_name", pa.string()),
+        ("river", pa.string()),
+        ("time_ref", pa.string()),
+        ("easting", pa.int64()),
+        ("northing", pa.int64()),
+        ("coord_ref", pa.string()),
+        ("gauge_zero", pa.string()),
+        ("parameters", pa.list_(pa.string())),
+        ("ts_min", pa.timestamp("ns")),
+        ("ts_max", pa.timestamp("ns")),
+    ]
+)
+
+# LfU exports are named <station id>_<from>_<to>_... .csv
+_CSV_NAME_RE = re.compile(r"^(\d+)_.*\.csv$", re.IGNORECASE)
+_DAILY_NAME_RE = re.compile(r"^station_(\d+)_(.+)_daily\.parquet$")
+
+
+def series_name(station_id: Any, parameter: str) -> str:
+    # File stem shared by all outputs of one series (station_<id>_<parameter>).
+    return f"station_{station_id}_{parameter}"
+
+
+def discover_station_ids(data_root: Path) -> List[str]:
+    # Station ids with at least one CSV under data/fluesse-*/.
+    ids = set()
+    for path in data_root.glob("fluesse-*/*.csv"):
+        m = _CSV_NAME_RE.match(path.name)
+        if m:
+            ids.add(m.group(1))
+    return sorted(ids, key=int)
+
+
+def station_files(data_root: Path, station_id: str) -> Dict[str, List[Path]]:
+    # {parameter: sorted CSV files} for the parameters the station has.
+    files = {
+        parameter: sorted((data_root / subdir).glob(f"{station_id}_*.csv"))
+        for parameter, subdir in PARAMETER_DIRS.items()
+    }
+    return {parameter: paths for parameter, paths in files.items() if paths}
+
+
+def output_series(parquet_root: Path) -> List[Tuple[str, str]]:
+    # (station_id, parameter) of every series with a daily rollup.
+    out = []
+    for path in sorted((parquet_root / "daily").glob("station_*_daily.parquet")):
+        m = _DAILY_NAME_RE.match(path.name)
+        if m:
+            out.append((m.group(1), m.group(2)))
+    return out
+
+
+def write_catalog(out_root: Path, rows: Iterable[Dict[str, Any]]) -> Path:
+    # Merge `rows` (STATIONS_SCHEMA fields) into the catalog; stations not in
+    # `rows` keep their entry, so a run for one gauge leaves the others listed.
+    path = out_root / CATALOG_FILENAME
+    new = pa.Table.from_pylist(list(rows), schema=STATIONS_SCHEMA)
+    if path.exists():
+        old = pq.read_table(path, schema=STATIONS_SCHEMA)
+        old = old.filter(pc.invert(pc.is_in(old.column("station_id"), new.column("station_id"))))
+        new = pa.concat_tables([old, new])
+    new = new.take(pc.sort_indices(new, sort_keys=[("station_id", "ascending")]))
+    write_parquet_atomic(new, path)
+    return path
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for hnd.bayern.de / gkd.bayern.de serving the HTML fixtures
+
+Answers the table URLs fetch_and_store_isar.py requests with the pages in
+pipeline/fixtures/, so the fetch can be run without network access:
+
+    python pipeline/stub_server.py --port 8765
+    python pipeline/fetch_and_store_isar.py --hnd-base-url http://127.0.0.1:8765 \
+        --gkd-base-url http://127.0.0.1:8765 --data-dir /tmp/current
+
+--delay and --fail-first make every response slow or start with 503s, to
+exercise the deadline and the retries. --record replaces the fixtures with
+the current live pages.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+# Path prefix -> fixture file
+ROUTES = {
+    '/pegel/': 'hnd_water_level.html',
+    '/de/fluesse/wassertemperatur/': 'gkd_water_temperature.html',
+}
+
+
+def make_handler(fixtures_dir=FIXTURES_DIR, delay=0.0, fail_first=0):
+    """Request handler class serving `fixtures_dir`; `fail_first` 503s per path before succeeding"""
+    failures = {}
+    lock = threading.Lock()
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real servers
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            path = self.path.split('?', 1)[0]
+            name = next((f for prefix, f in ROUTES.items() if path.startswith(prefix)), None)
+            if name is None:
+                return self._send(404, b'not found', 'text/plain')
+            with lock:
+                failures[path] = failures.get(path, 0) + 1
+                failing = failures[path] <= fail_first
+            if failing:
+                return self._send(503, b'service unavailable', 'text/plain')
+            body = (fixtures_dir / name).read_bytes()
+            self._send(200, body, 'text/html; charset=utf-8')
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def start_stub_server(port=0, fixtures_dir=FIXTURES_DIR, delay=0.0, fail_first=0):
+    """Serve in a background thread; returns (server, base_url). Stop with server.shutdown()"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(fixtures_dir, delay, fail_first))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def record_fixtures(fixtures_dir=FIXTURES_DIR):
+    """Save the current live HND/GKD table pages as fixtures"""
+    import fetch_and_store_isar as fetch
+    from fetch_engine import FetchEngine
+
+    urls = fetch.build_urls(fetch.HND_BASE_URL, fetch.GKD_BASE_URL)
+    names = {'water_level': ROUTES['/pegel/'], 'water_temperature': ROUTES['/de/fluesse/wassertemperatur/']}
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    with FetchEngine() as engine:
+        for (station_id, data_type), result in engine.fetch_all(urls).items():
+            if station_id != fetch.STATION_ID:
+                continue
+            if not result.ok:
+                print(f"❌ {result.url}: {result.error}")
+                return 1
+            (fixtures_dir / names[data_type]).write_text(result.text, encoding='utf-8')
+            print(f"✅ {result.url} -> {names[data_type]}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the HND/GKD HTML fixtures locally')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures-dir', type=Path, default=FIXTURES_DIR)
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds before every response')
+    parser.add_argument('--fail-first', type=int, default=0, help='Answer the first N requests per path with 503')
+    parser.add_argument('--record', action='store_true', help='Replace the fixtures with the live pages and exit')
+    args = parser.parse_args()
+
+    if args.record:
+        return record_fixtures(args.fixtures_dir)
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port),
+                                 make_handler(args.fixtures_dir, args.delay, args.fail_first))
+    print(f"🌐 Serving {args.fixtures_dir} on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
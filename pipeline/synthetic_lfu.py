@@ -0,0 +1,293 @@
+"""
+Synthetic LfU exports for load tests: CSV files in the format of the Bavarian
+LfU (gkd.bayern.de) downloads that ingest_lfu_csv_to_parquet.py reads, for any
+number of stations and years.
+
+    data/fluesse-wasserstand/16005701_01.01.1975_31.12.1975_ezw_0.csv
+    data/fluesse-wassertemperatur/16005701_01.01.1975_31.12.1975_ezw_0.csv
+    ...
+
+Each file has the metadata block (Quelle, Datenbankabfrage, Zeitbezug,
+Messstellen-Name/-Nr., Gewässer, Ostwert/Nordwert, Pegelnullpunktshöhe) and
+the `Datum;"Wasserstand [cm]";Prüfstatus` table with 15-minute rows, decimal
+commas, a UTF-8 BOM and LF line endings like the real downloads. The values
+follow a seasonal cycle with noise (water level: snowmelt peak and flood
+events; temperature: annual and daily cycle). Outages leave rows without a
+value (`"...";;Rohdaten`) or no rows at all. Rows older than --raw-days are
+`Geprueft`, newer ones `Rohdaten`, mixed over the month in between.
+
+The first station is 16005701 (München); the others get ids from 90000001 on,
+outside the LfU numbering. Output is deterministic for a given --seed and --end.
+
+    python pipeline/synthetic_lfu.py --out-root /tmp/synthetic --years 50 --stations 10
+    python pipeline/ingest_lfu_csv_to_parquet.py --data-root /tmp/synthetic --out-root /tmp/synthetic/parquet --all-stations
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from stations import DEFAULT_STATION_ID, PARAMETER_DIRS
+
+SLOT = np.timedelta64(15, "m")
+SLOTS_PER_DAY = 96
+
+# Table header and value format of each parameter.
+COLUMNS = {
+    "water_level_cm": ('Datum;"Wasserstand [cm]";Prüfstatus', "{:.2f}"),
+    "water_temperature_c": ('Datum;"Wassertemperatur [°C]";Prüfstatus', "{:.1f}"),
+}
+
+CHECKED = "Geprueft"  # spelling of the current exports; "Geprüft" is normalized the same way
+RAW = "Rohdaten"
+
+
+@dataclass(frozen=True)
+class SyntheticStation:
+    station_id: int
+    name: str
+    river: str
+    easting: int
+    northing: int
+    gauge_zero: str
+    level_base: float  # mean water level (cm)
+    temp_mean: float  # annual mean water temperature (°C)
+
+
+def synthetic_stations(count: int, seed: int = 0) -> List[SyntheticStation]:
+    rng = np.random.default_rng(seed)
+    stations = [
+        SyntheticStation(int(DEFAULT_STATION_ID), "München", "Isar", 693161, 5335716,
+                         "500,33 m NHN (DHHN2016)", 95.0, 8.5)
+    ]
+    for k in range(1, count):
+        stations.append(
+            SyntheticStation(
+                station_id=90000000 + k,
+                name=f"Synthetisch {k}",
+                river="Isar",
+                easting=int(rng.integers(600000, 800000)),
+                northing=int(rng.integers(5250000, 5550000)),
+                gauge_zero=f"{rng.uniform(300, 700):.2f}".replace(".", ",") + " m NHN (DHHN2016)",
+                level_base=float(rng.uniform(60, 250)),
+                temp_mean=float(rng.uniform(7, 11)),
+            )
+        )
+    return stations
+
+
+def _smooth_noise(rng: np.random.Generator, n: int, scale: float, span: int) -> np.ndarray:
+    # Autocorrelated noise: white noise smoothed over ~span slots.
+    kernel = np.exp(-np.arange(4 * span) / span)
+    kernel /= np.sqrt((kernel**2).sum())
+    return np.convolve(rng.normal(0, scale, n + len(kernel)), kernel, mode="valid")[:n]
+
+
+def series_values(
+    parameter: str, station: SyntheticStation, ts: np.ndarray, rng: np.random.Generator
+) -> np.ndarray:
+    # Values for the 15-minute timestamps `ts` (datetime64[m]).
+    doy = (ts - ts.astype("datetime64[Y]")) / np.timedelta64(1, "D")
+    hour = (ts - ts.astype("datetime64[D]")) / np.timedelta64(1, "h")
+    n = len(ts)
+    if parameter == "water_level_cm":
+        # Snowmelt high water in early summer, noise and floods (sharp rise,
+        # slow recession).
+        values = station.level_base * (1 + 0.3 * np.exp(-(((doy - 165) / 45) ** 2)))
+        values += _smooth_noise(rng, n, station.level_base * 0.04, 48)
+        years = n / (SLOTS_PER_DAY * 365.25)
+        for start in rng.integers(0, n, rng.poisson(3 * years)):
+            peak = rng.lognormal(np.log(station.level_base * 0.8), 0.6)
+            rise, decay = int(rng.integers(8, 48)), rng.uniform(48, 288)
+            t = np.arange(min(n - start, rise + int(8 * decay)))
+            shape = np.where(t < rise, t / rise, np.exp(-(t - rise) / decay))
+            values[start : start + len(t)] += peak * shape
+        return np.round(np.maximum(values, 1.0))
+    if parameter == "water_temperature_c":
+        annual = station.temp_mean - 6.5 * np.cos(2 * np.pi * (doy - 15) / 365.25)
+        daily = (0.3 + 0.5 * np.clip((annual - 4) / 10, 0, 1)) * np.sin(2 * np.pi * (hour - 9) / 24)
+        values = annual + daily + _smooth_noise(rng, n, 0.4, 96)
+        return np.round(np.maximum(values, 0.0), 1)
+    raise ValueError(f"Unknown parameter: {parameter}")
+
+
+def outage_masks(
+    n: int, rng: np.random.Generator, gap_rate: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    # (rows without a value, rows left out) for on average gap_rate outages a
+    # day; mostly a few slots, sometimes days.
+    empty = np.zeros(n, dtype=bool)
+    dropped = np.zeros(n, dtype=bool)
+    count = rng.poisson(gap_rate * n / SLOTS_PER_DAY)
+    starts = rng.integers(0, n, count)
+    lengths = np.where(
+        rng.random(count) < 0.95,
+        rng.geometric(1 / 6, count),
+        rng.integers(SLOTS_PER_DAY, 7 * SLOTS_PER_DAY, count),
+    )
+    for start, length, kind in zip(starts, lengths, rng.random(count)):
+        (empty if kind < 0.5 else dropped)[start : start + length] = True
+    return empty, dropped
+
+
+def status_labels(ts: np.ndarray, checked_until: np.datetime64, rng: np.random.Generator) -> np.ndarray:
+    # Checked before the last month up to checked_until, raw after it, mixed
+    # within that month (checking proceeds in pieces).
+    mix_start = checked_until - np.timedelta64(30, "D")
+    checked = ts < mix_start
+    mixed = (ts >= mix_start) & (ts < checked_until)
+    # Blocks of a day are checked together.
+    days = (ts[mixed] - mix_start).astype("timedelta64[D]").astype(np.int64)
+    checked[mixed] = rng.random(31)[days] < 0.5
+    return np.where(checked, CHECKED, RAW)
+
+
+def _header(station: SyntheticStation, parameter: str, queried: datetime) -> str:
+    lines = [
+        'Quelle:;"Bayerisches Landesamt für Umwelt, www.gkd.bayern.de"',
+        f'Datenbankabfrage:;"{queried:%d.%m.%Y %H:%M}"',
+        "Zeitbezug:;MEZ",
+        f"Messstellen-Name:;{station.name}",
+        f"Messstellen-Nr.:;{station.station_id}",
+        f"Gewässer:;{station.river}",
+        f'Ostwert:;{station.easting};Nordwert:;{station.northing};"ETRS89 / UTM Zone 32N"',
+    ]
+    if parameter == "water_level_cm":
+        lines.append(f'Pegelnullpunktshöhe:;"{station.gauge_zero}"')
+    lines += ["", COLUMNS[parameter][0]]
+    return "\ufeff" + "\n".join(lines) + "\n"
+
+
+def _file_periods(start: datetime, end: datetime, file_years: int) -> Iterator[Tuple[datetime, datetime]]:
+    # [from, to) of each export file: file_years calendar years, the last one up to `end`.
+    year = start.year
+    while datetime(year, 1, 1) < end:
+        lo = max(start, datetime(year, 1, 1))
+        hi = min(end, datetime(year + file_years, 1, 1))
+        yield lo, hi
+        year += file_years
+
+
+def write_series(
+    out_root: Path,
+    station: SyntheticStation,
+    parameter: str,
+    start: datetime,
+    end: datetime,
+    *,
+    rng: np.random.Generator,
+    file_years: int = 1,
+    gap_rate: float = 0.05,
+    raw_days: int = 300,
+    checked_label: str = CHECKED,
+) -> Dict[str, int]:
+    # Write the export files of one series; returns {files, rows, bytes}.
+    ts = np.arange(np.datetime64(start, "m"), np.datetime64(end, "m"), SLOT)
+    values = series_values(parameter, station, ts, rng)
+    empty, dropped = outage_masks(len(ts), rng, gap_rate)
+    status = status_labels(ts, np.datetime64(end, "m") - np.timedelta64(raw_days, "D"), rng)
+    if checked_label != CHECKED:
+        status = np.where(status == CHECKED, checked_label, status)
+
+    fmt = COLUMNS[parameter][1]
+    out_dir = out_root / PARAMETER_DIRS[parameter]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stats = {"files": 0, "rows": 0, "bytes": 0}
+    for lo, hi in _file_periods(start, end, file_years):
+        i, j = np.searchsorted(ts, [np.datetime64(lo, "m"), np.datetime64(hi, "m")])
+        keep = ~dropped[i:j]
+        stamps = np.datetime_as_string(ts[i:j][keep], unit="m").tolist()
+        text = [fmt.format(v).replace(".", ",") for v in values[i:j][keep].tolist()]
+        for k in np.flatnonzero(empty[i:j][keep]).tolist():
+            text[k] = ""
+        rows = [
+            f'"{stamp[:10]} {stamp[11:]}";{value};{label}\n'
+            for stamp, value, label in zip(stamps, text, status[i:j][keep].tolist())
+        ]
+        last_day = hi - timedelta(minutes=15)
+        path = out_dir / f"{station.station_id}_{lo:%d.%m.%Y}_{last_day:%d.%m.%Y}_ezw_0.csv"
+        data = (_header(station, parameter, hi) + "".join(rows)).encode("utf-8")
+        path.write_bytes(data)
+        stats["files"] += 1
+        stats["rows"] += len(rows)
+        stats["bytes"] += len(data)
+    return stats
+
+
+def generate(
+    out_root: Path,
+    *,
+    years: int = 3,
+    stations: int = 1,
+    end: Optional[datetime] = None,
+    parameters: Tuple[str, ...] = tuple(COLUMNS),
+    seed: int = 0,
+    **options,
+) -> Dict[str, int]:
+    # Write `years` calendar years up to `end` (default: today 00:00) for the
+    # first `stations` synthetic stations; options go to write_series.
+    if end is None:
+        end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = datetime(end.year - years + 1, 1, 1)
+    totals = {"series": 0, "files": 0, "rows": 0, "bytes": 0}
+    for station in synthetic_stations(stations, seed):
+        for parameter in parameters:
+            rng = np.random.default_rng([seed, station.station_id, list(COLUMNS).index(parameter)])
+            stats = write_series(out_root, station, parameter, start, end, rng=rng, **options)
+            totals["series"] += 1
+            for key, value in stats.items():
+                totals[key] += value
+    return totals
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Write synthetic LfU CSV exports")
+    ap.add_argument("--out-root", type=Path, required=True, help="Data root to write fluesse-*/ into")
+    ap.add_argument("--years", type=int, default=3, help="Calendar years up to --end (default: 3)")
+    ap.add_argument("--stations", type=int, default=1, help="Number of stations (default: 1)")
+    ap.add_argument("--end", type=str, default=None, help="End date YYYY-MM-DD, exclusive (default: today)")
+    ap.add_argument(
+        "--parameters",
+        nargs="+",
+        choices=list(COLUMNS),
+        default=list(COLUMNS),
+        help="Parameters to write (default: both)",
+    )
+    ap.add_argument("--file-years", type=int, default=1, help="Years per export file (default: 1)")
+    ap.add_argument("--gap-rate", type=float, default=0.05, help="Outages per day on average (default: 0.05)")
+    ap.add_argument("--raw-days", type=int, default=300, help="Days before --end that are Rohdaten (default: 300)")
+    ap.add_argument(
+        "--checked-label",
+        choices=[CHECKED, "Geprüft"],
+        default=CHECKED,
+        help=f"Status label of checked rows (default: {CHECKED})",
+    )
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    totals = generate(
+        args.out_root,
+        years=args.years,
+        stations=args.stations,
+        end=datetime.fromisoformat(args.end) if args.end else None,
+        parameters=tuple(args.parameters),
+        seed=args.seed,
+        file_years=args.file_years,
+        gap_rate=args.gap_rate,
+        raw_days=args.raw_days,
+        checked_label=args.checked_label,
+    )
+    print(
+        f"Wrote {totals['series']} series, {totals['files']} files, {totals['rows']:,} rows "
+        f"({totals['bytes'] / 2**20:.1f} MiB) to {args.out_root}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Run telemetry for the pipeline jobs: named stage timings, row/byte counters and
+memory samples, appended as one JSON line per run to a history file.
+
+    with Telemetry("ingest") as run:          # the active run of this process
+        with stage("parse", series="station_16005701_water_level_cm") as st:
+            ...
+            st.add(rows_in=n, bytes_in=size)
+
+Code below the scripts calls the module-level stage()/count(); without an
+active run they do nothing, so library functions can be instrumented without
+threading a telemetry object through every signature. Stages may run in
+several threads at once (the ingest drives parameter groups concurrently);
+work done in worker processes is timed by the stage that waits for it, and
+their peak RSS is reported as peak_rss_children_bytes.
+
+History: data/run_history.jsonl, or the path in ISAR_RUN_HISTORY ("off"
+disables it). `python pipeline/telemetry.py --job ingest` lists the recent
+runs and flags stages that got slower than the median of the previous ones.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_HISTORY = Path(__file__).resolve().parents[1] / "data" / "run_history.jsonl"
+HISTORY_MAX_BYTES = 16 * 2**20  # beyond this, the older half of the runs is dropped
+SAMPLE_INTERVAL = 0.2  # seconds between RSS samples
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_active: Optional["Telemetry"] = None
+
+
+def history_path() -> Optional[Path]:
+    value = os.environ.get("ISAR_RUN_HISTORY")
+    if value is None:
+        return DEFAULT_HISTORY
+    if value.strip().lower() in ("", "off", "none"):
+        return None
+    return Path(value)
+
+
+def current_rss() -> Optional[int]:
+    # Resident set size of this process in bytes (None where /proc is missing).
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def peak_rss(children: bool = False) -> Optional[int]:
+    # Peak RSS in bytes of this process (or of its largest finished child).
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in KiB on Linux, in bytes on macOS.
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def path_bytes(path: Path) -> int:
+    # Size of a file, or of all files below a directory (partitioned outputs).
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return 0
+
+
+class Stage:
+    # One timed stage; counters are free-form (rows_in, rows_out, bytes_in,
+    # bytes_out, files, requests, ...).
+    def __init__(self, name: str, labels: Dict[str, Any], t0: float):
+        self.name = name
+        self.labels = labels
+        self.started = time.perf_counter()
+        self.offset = self.started - t0
+        self.seconds: Optional[float] = None
+        self.counters: Dict[str, int] = {}
+        self.rss_start = current_rss()
+        self.rss_end: Optional[int] = None
+        self.rss_peak = self.rss_start
+
+    def add(self, **counters: int) -> None:
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + int(value)
+
+    def sample(self, rss: Optional[int]) -> None:
+        if rss is not None and (self.rss_peak is None or rss > self.rss_peak):
+            self.rss_peak = rss
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name}
+        if self.labels:
+            out["labels"] = self.labels
+        out["start_s"] = round(self.offset, 4)
+        out["seconds"] = round(self.seconds or 0.0, 4)
+        out.update(self.counters)
+        rows = self.counters.get("rows_in", self.counters.get("rows_out"))
+        if rows and self.seconds:
+            out["rows_per_s"] = round(rows / self.seconds)
+        out["rss_start_bytes"] = self.rss_start
+        out["rss_end_bytes"] = self.rss_end
+        out["rss_peak_bytes"] = self.rss_peak
+        return out
+
+
+class _NullStage:
+    # Stand-in when no run is active.
+    def add(self, **counters: int) -> None:
+        pass
+
+
+class Telemetry:
+    def __init__(
+        self,
+        job: str,
+        history: Optional[Path] = None,
+        argv: Optional[List[str]] = None,
+        sample_interval: float = SAMPLE_INTERVAL,
+    ):
+        self.job = job
+        self.argv = list(sys.argv[1:] if argv is None else argv)
+        self.history = history if history is not None else history_path()
+        self.sample_interval = sample_interval
+        self.counters: Dict[str, int] = {}
+        self.fields: Dict[str, Any] = {}
+        self.stages: List[Stage] = []
+        self._open: List[Stage] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.report: Optional[Dict[str, Any]] = None
+
+    # -- run lifecycle -----------------------------------------------------
+
+    def __enter__(self) -> "Telemetry":
+        global _active
+        self.started_at = datetime.now(timezone.utc)
+        self.t0 = time.perf_counter()
+        self.rss_sampled_peak = current_rss()
+        if self.sample_interval > 0:
+            self._sampler = threading.Thread(target=self._sample_loop, name="telemetry-rss", daemon=True)
+            self._sampler.start()
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        global _active
+        if _active is self:
+            _active = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        status = "ok"
+        if exc_type is not None:
+            status = "interrupted" if issubclass(exc_type, KeyboardInterrupt) else "error"
+        self.report = self._build_report(status, exc)
+        if self.history is not None:
+            append_report(self.history, self.report)
+        return False
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            rss = current_rss()
+            with self._lock:
+                if rss is not None and (self.rss_sampled_peak is None or rss > self.rss_sampled_peak):
+                    self.rss_sampled_peak = rss
+                for st in self._open:
+                    st.sample(rss)
+
+    # -- instrumentation ---------------------------------------------------
+
+    @contextmanager
+    def stage(self, name: str, **labels: Any) -> Iterator[Stage]:
+        st = Stage(name, labels, self.t0)
+        with self._lock:
+            self._open.append(st)
+        try:
+            yield st
+        finally:
+            st.seconds = time.perf_counter() - st.started
+            st.rss_end = current_rss()
+            st.sample(st.rss_end)
+            with self._lock:
+                self._open.remove(st)
+                self.stages.append(st)
+
+    def count(self, **counters: int) -> None:
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + int(value)
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    # -- report --------------------------------------------------------------
+
+    def _build_report(self, status: str, exc: Optional[BaseException]) -> Dict[str, Any]:
+        duration = time.perf_counter() - self.t0
+        report: Dict[str, Any] = {
+            "job": self.job,
+            "run_id": uuid.uuid4().hex[:12],
+            "started_at": self.started_at.isoformat().replace("+00:00", "Z"),
+            "duration_s": round(duration, 4),
+            "status": status,
+        }
+        if exc is not None:
+            report["error"] = f"{type(exc).__name__}: {exc}"
+        report["argv"] = self.argv
+        report["host"] = platform.node()
+        report["python"] = platform.python_version()
+        report.update(self.fields)
+        report["counters"] = dict(self.counters)
+        rows = self.counters.get("rows_in")
+        if rows and duration:
+            report["rows_per_s"] = round(rows / duration)
+        report["peak_rss_bytes"] = peak_rss() or self.rss_sampled_peak
+        report["peak_rss_children_bytes"] = peak_rss(children=True)
+        report["stages"] = [st.to_dict() for st in sorted(self.stages, key=lambda s: s.offset)]
+        return report
+
+    def summary(self) -> List[str]:
+        # Human-readable lines for the end of a script's output.
+        if self.report is None:
+            return []
+        r = self.report
+        peak = r.get("peak_rss_bytes")
+        lines = [
+            f"Run report: {r['job']} {r['status']} in {r['duration_s']:.2f}s"
+            + (f", peak RSS {peak / 2**20:.0f} MiB" if peak else "")
+            + (f" -> {self.history}" if self.history else "")
+        ]
+        for name, seconds, rows in _stage_totals(r):
+            lines.append(f"  {name:<24} {seconds:9.3f}s" + (f"  {rows:>10} rows" if rows else ""))
+        return lines
+
+
+def append_report(path: Path, report: Dict[str, Any]) -> None:
+    # Append one run report to a history file (also used by bench_pipeline.py).
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One write per run, so concurrent jobs do not interleave lines.
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        if path.stat().st_size > HISTORY_MAX_BYTES:
+            _truncate_history(path, HISTORY_MAX_BYTES // 2)
+    except OSError as e:
+        print(f"Warning: could not append run report to {path}: {e}", file=sys.stderr)
+
+
+def _truncate_history(path: Path, keep_bytes: int) -> None:
+    # Keep the newest runs that fit in keep_bytes.
+    with open(path, "rb") as f:
+        f.seek(max(0, path.stat().st_size - keep_bytes))
+        tail = f.read()
+    tail = tail[tail.find(b"\n") + 1 :]
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(tail)
+    os.replace(tmp, path)
+
+
+def _stage_totals(report: Dict[str, Any]) -> List[Any]:
+    # (name, total seconds, total rows) per stage name, in first-start order.
+    totals: Dict[str, List[float]] = {}
+    for st in report.get("stages", []):
+        t = totals.setdefault(st["name"], [0.0, 0])
+        t[0] += st.get("seconds", 0.0)
+        t[1] += st.get("rows_in", st.get("rows_out", 0))
+    return [(name, t[0], int(t[1])) for name, t in totals.items()]
+
+
+# -- module-level helpers for the active run ----------------------------------
+
+
+@contextmanager
+def stage(name: str, **labels: Any) -> Iterator[Any]:
+    run = _active
+    if run is None:
+        yield _NullStage()
+        return
+    with run.stage(name, **labels) as st:
+        yield st
+
+
+def count(**counters: int) -> None:
+    run = _active
+    if run is not None:
+        run.count(**counters)
+
+
+# -- history / regression check -----------------------------------------------
+
+
+def load_history(path: Path, job: Optional[str] = None) -> List[Dict[str, Any]]:
+    runs = []
+    if not path.exists():
+        return runs
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if job is None or run.get("job") == job:
+                runs.append(run)
+    return runs
+
+
+def find_regressions(
+    runs: List[Dict[str, Any]], baseline: int = 5, threshold: float = 1.25, min_seconds: float = 0.05
+) -> List[str]:
+    # Stages of the newest run that took more than `threshold` x the median of
+    # the same stage over the previous `baseline` successful runs of the same
+    # job with the same arguments (a --backfill fetch is not a regression of
+    # the latest-value fetch).
+    ok = [r for r in runs if r.get("status") == "ok"]
+    if not ok:
+        return []
+    latest = ok[-1]
+    previous = [r for r in ok[:-1] if r["job"] == latest["job"] and r.get("argv") == latest.get("argv")]
+    previous = previous[-baseline:]
+    out = []
+    latest_totals = {name: seconds for name, seconds, _ in _stage_totals(latest)}
+    latest_totals["(total)"] = latest["duration_s"]
+    for name, seconds in latest_totals.items():
+        past = []
+        for r in previous:
+            if name == "(total)":
+                past.append(r["duration_s"])
+            else:
+                past.extend(s for n, s, _ in _stage_totals(r) if n == name)
+        if not past:
+            continue
+        median = statistics.median(past)
+        if seconds >= min_seconds and median > 0 and seconds > threshold * median:
+            out.append(f"{name}: {seconds:.3f}s vs median {median:.3f}s of {len(past)} run(s)")
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Show pipeline run history and flag slower stages")
+    ap.add_argument("--history", type=Path, default=history_path() or DEFAULT_HISTORY)
+    ap.add_argument("--job", type=str, default=None, help="Only runs of this job (ingest, migrate, fetch)")
+    ap.add_argument("--last", type=int, default=10, help="Runs to list (default: 10)")
+    ap.add_argument("--baseline", type=int, default=5, help="Previous runs to compare with (default: 5)")
+    ap.add_argument("--threshold", type=float, default=1.25, help="Slowdown factor to flag (default: 1.25)")
+    args = ap.parse_args()
+
+    runs = load_history(args.history, args.job)
+    if not runs:
+        print(f"No runs in {args.history}")
+        return 0
+    for r in runs[-args.last :]:
+        peak = r.get("peak_rss_bytes")
+        rows = r.get("counters", {}).get("rows_in")
+        print(
+            f"{r['started_at']}  {r['job']:<8} {r['status']:<11} {r['duration_s']:9.2f}s"
+            + (f"  {rows:>10} rows" if rows else "")
+            + (f"  {peak / 2**20:7.0f} MiB" if peak else "")
+        )
+
+    jobs = [args.job] if args.job else sorted({r["job"] for r in runs})
+    regressions = []
+    for job in jobs:
+        regressions += [f"{job}: {line}" for line in
+                        find_regressions([r for r in runs if r["job"] == job], args.baseline, args.threshold)]
+    if regressions:
+        print("\nSlower than the previous runs:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,84 +1,390 @@
 #!/usr/bin/env python3
 """
-Verify data completeness after ingesting updates
+Verify the raw and daily Parquet outputs of each series
+
+Only the Parquet footers are read for the checks: row counts and the ts/date
+ranges come from the row group statistics. Data pages are read for the one
+raw row group holding the latest row with a value (one further back per row
+group of trailing rows without values) and the one daily row group holding
+the latest day; a row group without statistics falls back to reading its key
+column.
+
+A series is
+  ok      raw and daily outputs present and consistent, latest raw row with a
+          value newer than --max-age-hours (relative to now, in MEZ like the
+          data)
+  stale   consistent, but the latest raw row with a value is older than that
+          (rows without a value, e.g. during an outage, do not count)
+  failed  an output is missing or empty, the daily rollup ends before the raw
+          series, or the partition index disagrees with the partition files
+
+The exit status is the worst one over all checked series (0 ok, 1 stale,
+2 failed), so the script can gate cron jobs and healthchecks; --json prints
+the same result for other tools. Other scripts use verify() and
+exit_status() directly.
 """
 
-import pandas as pd
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-parquet_dir = Path(__file__).parent.parent / "data" / "parquet"
-
-print("=" * 80)
-print("🔍 Data Completeness Check")
-print("=" * 80)
-print()
-
-# Check raw data
-raw_level = parquet_dir / "raw" / "station_16005701_water_level_cm.parquet"
-raw_temp = parquet_dir / "raw" / "station_16005701_water_temperature_c.parquet"
-
-if raw_level.exists():
-    df_level = pd.read_parquet(raw_level)
-    df_level['ts'] = pd.to_datetime(df_level['ts'])
-    
-    print("📊 Water Level Data (Raw):")
-    print(f"   Total records: {len(df_level):,}")
-    print(f"   Date range: {df_level['ts'].min()} to {df_level['ts'].max()}")
-    print(f"   Days covered: {(df_level['ts'].max() - df_level['ts'].min()).days + 1}")
-    print()
-    
-    # Check for recent data
-    recent = df_level[df_level['ts'] >= '2025-12-26']
-    print(f"   Records since 2025-12-26: {len(recent):,}")
-    if len(recent) > 0:
-        print(f"   Latest value: {recent['ts'].max()} = {recent[recent['ts'] == recent['ts'].max()]['value'].values[0]:.1f} cm")
-        print(f"   ✅ Updates successfully included!")
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from raw_partitions import INDEX_FILENAME, PART_FILENAME, load_index, raw_file_path, tail_path
+from stations import PARAMETER_DIRS, output_series, series_name
+
+PARQUET_DIR = Path(__file__).parent.parent / "data" / "parquet"
+
+# Live rows are migrated every 3 hours, 15 minutes after the fetch; two
+# missed cycles are tolerated before a series counts as stale.
+DEFAULT_MAX_AGE_HOURS = 9.0
+
+STATUS_OK = "ok"
+STATUS_STALE = "stale"
+STATUS_FAILED = "failed"
+EXIT_STATUS = {STATUS_OK: 0, STATUS_STALE: 1, STATUS_FAILED: 2}
+
+UNITS = {
+    "water_level_cm": "cm",
+    "water_temperature_c": "°C",
+}
+LABELS = {
+    "water_level_cm": "📊 Water Level",
+    "water_temperature_c": "🌡️  Water Temperature",
+}
+
+# Row group summary: (file, row group, rows, key min, key max)
+RowGroup = Tuple[Path, int, int, Any, Any]
+
+
+@dataclass
+class SeriesCheck:
+    station_id: str
+    parameter: str
+    status: str = STATUS_OK
+    problems: List[str] = field(default_factory=list)
+    # Raw 15-minute series (base and tail files, or the year partitions)
+    raw_layout: Optional[str] = None
+    raw_files: int = 0
+    raw_rows: int = 0
+    ts_min: Optional[datetime] = None
+    ts_max: Optional[datetime] = None
+    # Latest row with a value; the daily rollup skips rows without one
+    latest_ts: Optional[datetime] = None
+    latest_value: Optional[float] = None
+    age_hours: Optional[float] = None
+    # Daily rollup
+    daily_days: int = 0
+    date_min: Optional[date] = None
+    date_max: Optional[date] = None
+    latest_day: Optional[Dict[str, Any]] = None
+
+    def fail(self, problem: str) -> None:
+        self.problems.append(problem)
+        self.status = STATUS_FAILED
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        for key, value in out.items():
+            if isinstance(value, (datetime, date)):
+                out[key] = value.isoformat()
+        if self.latest_day is not None:
+            out["latest_day"] = {
+                k: v.isoformat() if isinstance(v, date) else v for k, v in self.latest_day.items()
+            }
+        return out
+
+
+def mez_now() -> datetime:
+    # The series are naive MEZ (UTC+1) all year round.
+    return datetime.utcnow() + timedelta(hours=1)
+
+
+def row_groups(path: Path, column: str) -> List[RowGroup]:
+    # Rows and min/max of `column` per non-empty row group, from the footer.
+    pf = pq.ParquetFile(path)
+    md = pf.metadata
+    col = md.schema.to_arrow_schema().get_field_index(column)
+    out = []
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        if rg.num_rows == 0:
+            continue
+        stats = rg.column(col).statistics
+        if stats is not None and stats.has_min_max:
+            lo, hi = stats.min, stats.max
+        else:
+            bounds = pc.min_max(pf.read_row_group(i, columns=[column]).column(0))
+            lo, hi = bounds["min"].as_py(), bounds["max"].as_py()
+        out.append((path, i, rg.num_rows, lo, hi))
+    return out
+
+
+def _last_of(table: pa.Table, key: str) -> Dict[str, Any]:
+    # The row with the greatest `key` (the last one of equals: a later row for
+    # the same timestamp is a correction).
+    keys = table.column(key).to_numpy()
+    pos = len(keys) - 1 - int(np.argmax(keys[::-1]))
+    return {name: table.column(name)[pos].as_py() for name in table.column_names}
+
+
+def _last_row(group: RowGroup, key: str, columns: Sequence[str]) -> Dict[str, Any]:
+    path, i, _, _, _ = group
+    return _last_of(pq.ParquetFile(path).read_row_group(i, columns=list(columns)), key)
+
+
+def _last_valued_row(groups: List[RowGroup]) -> Optional[Dict[str, Any]]:
+    # The latest raw row with a value. Row groups are read newest first until
+    # none can hold a later row than the one found.
+    best: Optional[Dict[str, Any]] = None
+    for path, i, _, _, hi in sorted(groups, key=lambda group: group[4], reverse=True):
+        if best is not None and hi <= best["ts"]:
+            break
+        table = pq.ParquetFile(path).read_row_group(i, columns=["ts", "value"])
+        table = table.filter(pc.invert(pc.is_nan(table.column("value").fill_null(float("nan")))))
+        if table.num_rows == 0:
+            continue
+        row = _last_of(table, "ts")
+        if best is None or row["ts"] > best["ts"]:
+            best = row
+    return best
+
+
+def discover_series(parquet_dir: Path) -> List[Tuple[str, str]]:
+    # (station_id, parameter) of every series with a daily rollup or raw data,
+    # so a series missing one of them is reported rather than skipped.
+    series = set(output_series(parquet_dir))
+    raw_dir = parquet_dir / "raw"
+    for station_id, parameter in (
+        (sid, param) for sid in _raw_station_ids(raw_dir) for param in PARAMETER_DIRS
+    ):
+        if _raw_files(raw_dir, station_id, parameter)[1]:
+            series.add((station_id, parameter))
+    return sorted(series, key=lambda item: (int(item[0]), item[1]))
+
+
+def _raw_station_ids(raw_dir: Path) -> List[str]:
+    ids = set()
+    for path in raw_dir.glob("station_*.parquet"):
+        parts = path.stem.split("_")
+        if len(parts) > 1 and parts[1].isdigit():
+            ids.add(parts[1])
+    for path in raw_dir.glob("station_id=*"):
+        ids.add(path.name.split("=", 1)[1])
+    return sorted(ids)
+
+
+def _raw_files(raw_dir: Path, station_id: str, parameter: str) -> Tuple[str, List[Path]]:
+    # Layout and files of one raw series. The partition files are listed from
+    # the directory, not the index, so the two can be compared.
+    root = raw_file_path(raw_dir, station_id, parameter, "partitioned").parent
+    parts = sorted(root.glob(f"parameter={parameter}/year=*/{PART_FILENAME}"))
+    if parts or (root / INDEX_FILENAME).exists() and parameter in load_index(root)["parameters"]:
+        return "partitioned", parts
+    base = raw_file_path(raw_dir, station_id, parameter)
+    return "file", [path for path in (base, tail_path(base)) if path.exists()]
+
+
+def _check_partition_index(check: SeriesCheck, raw_dir: Path, files: List[Path], groups: List[RowGroup]) -> None:
+    root = raw_file_path(raw_dir, check.station_id, check.parameter, "partitioned").parent
+    entries = load_index(root)["parameters"].get(check.parameter, [])
+    indexed = {root / entry["path"]: entry["rows"] for entry in entries}
+    rows: Dict[Path, int] = {path: 0 for path in files}
+    for path, _, n, _, _ in groups:
+        rows[path] += n
+    for path in sorted(set(indexed) | set(rows)):
+        if indexed.get(path) != rows.get(path):
+            check.fail(
+                f"partition index lists {indexed.get(path, 'no')} rows for "
+                f"{path.relative_to(root)}, the file has {rows.get(path, 'no file')}"
+            )
+
+
+def check_series(
+    parquet_dir: Path,
+    station_id: str,
+    parameter: str,
+    now: datetime,
+    max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+) -> SeriesCheck:
+    check = SeriesCheck(str(station_id), parameter)
+    raw_dir = parquet_dir / "raw"
+
+    layout, files = _raw_files(raw_dir, check.station_id, parameter)
+    groups = [group for path in files for group in row_groups(path, "ts")]
+    check.raw_layout = layout if files else None
+    check.raw_files = len(files)
+    check.raw_rows = sum(group[2] for group in groups)
+    if layout == "partitioned":
+        _check_partition_index(check, raw_dir, files, groups)
+    if groups:
+        check.ts_min = min(group[3] for group in groups)
+        check.ts_max = max(group[4] for group in groups)
+        latest = _last_valued_row(groups)
+        if latest is not None:
+            check.latest_ts = latest["ts"]
+            check.latest_value = latest["value"]
+            check.age_hours = round((now - check.latest_ts).total_seconds() / 3600, 2)
+        else:
+            check.fail("no raw rows with a value")
     else:
-        print(f"   ⚠️  No data since 2025-12-26 found!")
-    print()
+        check.fail("no raw rows" if files else "no raw file")
 
-if raw_temp.exists():
-    df_temp = pd.read_parquet(raw_temp)
-    df_temp['ts'] = pd.to_datetime(df_temp['ts'])
-    
-    print("🌡️  Water Temperature Data (Raw):")
-    print(f"   Total records: {len(df_temp):,}")
-    print(f"   Date range: {df_temp['ts'].min()} to {df_temp['ts'].max()}")
-    print(f"   Days covered: {(df_temp['ts'].max() - df_temp['ts'].min()).days + 1}")
-    print()
+    daily = parquet_dir / "daily" / f"{series_name(station_id, parameter)}_daily.parquet"
+    daily_groups = row_groups(daily, "date") if daily.exists() else []
+    if daily_groups:
+        check.daily_days = sum(group[2] for group in daily_groups)
+        check.date_min = min(group[3] for group in daily_groups)
+        check.latest_day = _last_row(
+            max(daily_groups, key=lambda group: group[4]), "date", ["date", "count", "mean", "min", "max"]
+        )
+        check.date_max = check.latest_day["date"]
+    else:
+        check.fail("no daily rows" if daily.exists() else "no daily rollup")
 
-# Check daily aggregates
-daily_level = parquet_dir / "daily" / "station_16005701_water_level_cm_daily.parquet"
-daily_temp = parquet_dir / "daily" / "station_16005701_water_temperature_c_daily.parquet"
-
-if daily_level.exists():
-    df_daily = pd.read_parquet(daily_level)
-    df_daily['date'] = pd.to_datetime(df_daily['date'])
-    
-    print("📅 Daily Aggregates (Water Level):")
-    print(f"   Total days: {len(df_daily):,}")
-    print(f"   Date range: {df_daily['date'].min().date()} to {df_daily['date'].max().date()}")
-    print()
-    
-    # Latest values
-    latest = df_daily[df_daily['date'] == df_daily['date'].max()].iloc[0]
-    print(f"   Latest day: {latest['date'].date()}")
-    print(f"     Mean: {latest['mean']:.2f} cm")
-    print(f"     Min:  {latest['min']:.2f} cm")
-    print(f"     Max:  {latest['max']:.2f} cm")
-    print(f"     Count: {latest['count']} measurements")
+    if check.latest_ts is not None and check.date_max is not None:
+        latest_date = check.latest_ts.date()
+        if check.date_max < latest_date:
+            check.fail(f"daily rollup ends {check.date_max}, raw values go on to {latest_date}")
+        elif check.date_max > latest_date:
+            check.fail(f"daily rollup ends {check.date_max}, after the last raw value ({latest_date})")
+
+    if check.status == STATUS_OK and check.age_hours is not None and check.age_hours > max_age_hours:
+        check.status = STATUS_STALE
+        check.problems.append(f"latest value is {check.age_hours:.1f} h old (limit {max_age_hours:g} h)")
+    return check
+
+
+def verify(
+    parquet_dir: Path = PARQUET_DIR,
+    station_ids: Optional[Iterable[Any]] = None,
+    parameters: Optional[Iterable[str]] = None,
+    max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+    now: Optional[datetime] = None,
+) -> List[SeriesCheck]:
+    """
+    Check every series with outputs, or the series of `station_ids`; a given
+    station without any output gets a failed check per parameter
+    """
+    parquet_dir = Path(parquet_dir)
+    now = now or mez_now()
+    parameters = list(parameters or PARAMETER_DIRS)
+    series = [item for item in discover_series(parquet_dir) if item[1] in parameters]
+    if station_ids:
+        wanted = [str(sid) for sid in station_ids]
+        found = {sid for sid, _ in series}
+        series = [item for item in series if item[0] in wanted]
+        series += [(sid, param) for sid in wanted if sid not in found for param in parameters]
+        series.sort(key=lambda item: (wanted.index(item[0]), parameters.index(item[1])))
+    return [check_series(parquet_dir, sid, param, now, max_age_hours) for sid, param in series]
+
+
+def exit_status(checks: Iterable[SeriesCheck]) -> int:
+    """0 if every series is ok, 1 if one is stale, 2 if one failed (or none were checked)"""
+    codes = [EXIT_STATUS[check.status] for check in checks]
+    return max(codes) if codes else EXIT_STATUS[STATUS_FAILED]
+
+
+def report(checks: List[SeriesCheck], now: datetime, max_age_hours: float) -> Dict[str, Any]:
+    """The result as JSON-ready dict (what --json prints)"""
+    code = exit_status(checks)
+    return {
+        "checked_at": now.isoformat(timespec="seconds"),
+        "max_age_hours": max_age_hours,
+        "status": next(status for status, value in EXIT_STATUS.items() if value == code),
+        "exit_status": code,
+        "counts": {status: sum(c.status == status for c in checks) for status in EXIT_STATUS},
+        "series": [check.to_dict() for check in checks],
+    }
+
+
+def print_report(checks: List[SeriesCheck]) -> None:
+    """Print the checks per station"""
+    print("=" * 80)
+    print("🔍 Data Completeness Check")
+    print("=" * 80)
     print()
 
-print("=" * 80)
-print("✅ Verification Complete!")
-print("=" * 80)
-print()
-print("📋 Summary:")
-print("   • Historical data: complete")
-print("   • Updates: successfully integrated")
-print("   • Current data: up to 25.01.2026")
-print()
-print("🚀 Ready for:")
-print("   1. Setting up cron job for live updates")
-print("   2. Web app integration")
-print()
+    station_id = None
+    for check in checks:
+        if check.station_id != station_id:
+            station_id = check.station_id
+            print(f"🏷️  Station {station_id}")
+            print()
+
+        unit = UNITS.get(check.parameter, "")
+        print(f"{LABELS.get(check.parameter, check.parameter)} ({check.parameter}):")
+        if check.ts_min is not None:
+            print(f"   Raw records: {check.raw_rows:,} in {check.raw_files} file(s), {check.raw_layout} layout")
+            print(f"   Date range: {check.ts_min} to {check.ts_max}")
+            print(f"   Days covered: {(check.ts_max - check.ts_min).days + 1}")
+            if check.latest_ts is not None:
+                print(f"   Latest value: {check.latest_ts} = {check.latest_value:.1f} {unit} ({check.age_hours:.1f} h ago)")
+        if check.latest_day is not None:
+            day = check.latest_day
+            print(f"   Daily aggregates: {check.daily_days:,} days, {check.date_min} to {check.date_max}")
+            print(f"   Latest day: {day['date']}  mean {day['mean']:.2f} {unit}, "
+                  f"min {day['min']:.2f}, max {day['max']:.2f}, {day['count']} measurements")
+        if check.status == STATUS_OK:
+            print("   ✅ OK")
+        for problem in check.problems:
+            print(f"   {'⚠️ ' if check.status == STATUS_STALE else '❌'} {problem}")
+        print()
+
+    counts = {status: sum(c.status == status for c in checks) for status in EXIT_STATUS}
+    print("=" * 80)
+    if not checks:
+        print("❌ No series found")
+    elif counts[STATUS_OK] == len(checks):
+        print(f"✅ Verification complete: all {len(checks)} series ok")
+    else:
+        print(f"{'❌' if counts[STATUS_FAILED] else '⚠️ '} Verification complete: "
+              f"{counts[STATUS_OK]} ok, {counts[STATUS_STALE]} stale, {counts[STATUS_FAILED]} failed")
+    print("=" * 80)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Verify the raw and daily Parquet outputs (exit status: 0 ok, 1 stale, 2 failed)"
+    )
+    parser.add_argument("station_ids", nargs="*", help="Stations to check (default: every station with outputs)")
+    parser.add_argument("--parquet-dir", type=Path, default=PARQUET_DIR,
+                        help="Parquet root (default: ../data/parquet)")
+    parser.add_argument("--parameter", action="append", choices=sorted(PARAMETER_DIRS), dest="parameters",
+                        help="Check only this parameter (repeatable; default: all)")
+    parser.add_argument("--max-age-hours", type=float, default=DEFAULT_MAX_AGE_HOURS,
+                        help=f"Latest raw row older than this counts as stale (default: {DEFAULT_MAX_AGE_HOURS:g})")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="Reference time for the age, naive MEZ (default: the current time)")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--json", action="store_true", help="Print the result as JSON")
+    output.add_argument("--quiet", action="store_true", help="Print only the series that are not ok")
+    args = parser.parse_args(argv)
+
+    now = args.now or mez_now()
+    checks = verify(args.parquet_dir, args.station_ids, args.parameters, args.max_age_hours, now)
+
+    if args.json:
+        print(json.dumps(report(checks, now, args.max_age_hours), ensure_ascii=False, indent=2))
+    elif args.quiet:
+        for check in checks:
+            if check.status != STATUS_OK:
+                print(f"{check.status}: station {check.station_id} {check.parameter}: {'; '.join(check.problems)}")
+        if not checks:
+            print("failed: no series found")
+    else:
+        print_report(checks)
+    return exit_status(checks)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,7 +42,7 @@ node pipeline/ingest_lfu_csv_to_parquet_daily_only.mjs \
 
 # Run initial scraper
 echo "🌐 Fetching initial live data..."
-python3 pipeline/fetch_and_store_isar.py || echo "Warning: Initial fetch failed, will retry on next cron run"
+python3 pipeline/fetch_and_store_isar.py --backfill --live-store sqlite || echo "Warning: Initial fetch failed, will retry on next cron run"
 
 # Copy live data to web directory
 echo "📋 Copying live data to web directory..."
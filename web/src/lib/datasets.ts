@@ -3,6 +3,24 @@ export type DatasetId =
   | 'level_daily'
   | 'temp_raw'
   | 'temp_daily'
+  | 'level_raw_tail'
+  | 'temp_raw_tail'
+  | 'level_hourly'
+  | 'level_weekly'
+  | 'level_monthly'
+  | 'level_yearly'
+  | 'temp_hourly'
+  | 'temp_weekly'
+  | 'temp_monthly'
+  | 'temp_yearly'
+  | 'level_climatology'
+  | 'temp_climatology'
+  | 'level_records'
+  | 'temp_records'
+  | 'level_gaps'
+  | 'temp_gaps'
+  | 'level_coverage'
+  | 'temp_coverage'
   | 'station_meta'
 
 export const DATASETS: Record<DatasetId, { name: string; url: string }> = {
@@ -22,10 +40,90 @@ export const DATASETS: Record<DatasetId, { name: string; url: string }> = {
     name: 'station_16005701_water_temperature_c_daily.parquet',
     url: '/data/parquet/daily/station_16005701_water_temperature_c_daily.parquet',
   },
+  // Live rows newer than the raw base file (migrate_live_to_parquet.py).
+  level_raw_tail: {
+    name: 'station_16005701_water_level_cm_tail.parquet',
+    url: '/data/parquet/raw/station_16005701_water_level_cm_tail.parquet',
+  },
+  temp_raw_tail: {
+    name: 'station_16005701_water_temperature_c_tail.parquet',
+    url: '/data/parquet/raw/station_16005701_water_temperature_c_tail.parquet',
+  },
+  // Rollups (pipeline/rollups.py); hourly has a ts column, the others a date.
+  level_hourly: {
+    name: 'station_16005701_water_level_cm_hourly.parquet',
+    url: '/data/parquet/hourly/station_16005701_water_level_cm_hourly.parquet',
+  },
+  level_weekly: {
+    name: 'station_16005701_water_level_cm_weekly.parquet',
+    url: '/data/parquet/weekly/station_16005701_water_level_cm_weekly.parquet',
+  },
+  level_monthly: {
+    name: 'station_16005701_water_level_cm_monthly.parquet',
+    url: '/data/parquet/monthly/station_16005701_water_level_cm_monthly.parquet',
+  },
+  level_yearly: {
+    name: 'station_16005701_water_level_cm_yearly.parquet',
+    url: '/data/parquet/yearly/station_16005701_water_level_cm_yearly.parquet',
+  },
+  temp_hourly: {
+    name: 'station_16005701_water_temperature_c_hourly.parquet',
+    url: '/data/parquet/hourly/station_16005701_water_temperature_c_hourly.parquet',
+  },
+  temp_weekly: {
+    name: 'station_16005701_water_temperature_c_weekly.parquet',
+    url: '/data/parquet/weekly/station_16005701_water_temperature_c_weekly.parquet',
+  },
+  temp_monthly: {
+    name: 'station_16005701_water_temperature_c_monthly.parquet',
+    url: '/data/parquet/monthly/station_16005701_water_temperature_c_monthly.parquet',
+  },
+  temp_yearly: {
+    name: 'station_16005701_water_temperature_c_yearly.parquet',
+    url: '/data/parquet/yearly/station_16005701_water_temperature_c_yearly.parquet',
+  },
+  // Day-of-year percentiles of the daily means (pipeline/climatology.py).
+  level_climatology: {
+    name: 'station_16005701_water_level_cm_climatology.parquet',
+    url: '/data/parquet/climatology/station_16005701_water_level_cm_climatology.parquet',
+  },
+  temp_climatology: {
+    name: 'station_16005701_water_temperature_c_climatology.parquet',
+    url: '/data/parquet/climatology/station_16005701_water_temperature_c_climatology.parquet',
+  },
+  // Min/max records: all-time, per year, per month, per day of year (pipeline/records.py).
+  level_records: {
+    name: 'station_16005701_water_level_cm_records.parquet',
+    url: '/data/parquet/records/station_16005701_water_level_cm_records.parquet',
+  },
+  temp_records: {
+    name: 'station_16005701_water_temperature_c_records.parquet',
+    url: '/data/parquet/records/station_16005701_water_temperature_c_records.parquet',
+  },
+  // Missing periods and samples per day/year against 96 per day (pipeline/coverage.py).
+  level_gaps: {
+    name: 'station_16005701_water_level_cm_gaps.parquet',
+    url: '/data/parquet/coverage/station_16005701_water_level_cm_gaps.parquet',
+  },
+  temp_gaps: {
+    name: 'station_16005701_water_temperature_c_gaps.parquet',
+    url: '/data/parquet/coverage/station_16005701_water_temperature_c_gaps.parquet',
+  },
+  level_coverage: {
+    name: 'station_16005701_water_level_cm_coverage.parquet',
+    url: '/data/parquet/coverage/station_16005701_water_level_cm_coverage.parquet',
+  },
+  temp_coverage: {
+    name: 'station_16005701_water_temperature_c_coverage.parquet',
+    url: '/data/parquet/coverage/station_16005701_water_temperature_c_coverage.parquet',
+  },
   station_meta: {
     name: 'station_meta.json',
     url: '/data/parquet/station_meta.json',
   },
 }
 
-
+// Optional year-partitioned raw layout (pipeline --raw-layout partitioned);
+// every station has its own partition root (raw/station_id=<id>/).
+export const RAW_PARTITION_BASE_URL = '/data/parquet/raw/station_id=16005701'
+export const RAW_PARTITION_INDEX_URL = `${RAW_PARTITION_BASE_URL}/_partitions.json`
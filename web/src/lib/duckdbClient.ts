@@ -45,9 +45,33 @@ export function getDuckDb(): Promise<DuckDbState> {
   return _statePromise
 }
 
+// The pipeline publishes every Parquet file under a content-hashed name as well
+// (listed in manifest.json); hashed URLs are immutable and cached long-term.
+const PARQUET_BASE_URL = '/data/parquet/'
+let _publishManifestPromise: Promise<Record<string, string>> | null = null
+
+function getPublishManifest(): Promise<Record<string, string>> {
+  if (_publishManifestPromise) return _publishManifestPromise
+  _publishManifestPromise = fetch(`${PARQUET_BASE_URL}manifest.json`, { cache: 'no-store' })
+    .then(async (res): Promise<Record<string, string>> => {
+      if (!res.ok || !(res.headers.get('content-type') ?? '').includes('json')) return {}
+      const manifest = (await res.json()) as { files?: Record<string, string> }
+      return manifest.files ?? {}
+    })
+    .catch((): Record<string, string> => ({}))
+  return _publishManifestPromise
+}
+
+export async function resolveDataUrl(url: string): Promise<string> {
+  if (!url.startsWith(PARQUET_BASE_URL)) return url
+  const files = await getPublishManifest()
+  const hashed = files[url.slice(PARQUET_BASE_URL.length)]
+  return hashed ? `${PARQUET_BASE_URL}${hashed}` : url
+}
+
 export async function registerParquetFile(name: string, url: string) {
   const { db } = await getDuckDb()
-  await db.registerFileURL(name, url, duckdb.DuckDBDataProtocol.HTTP, false)
+  await db.registerFileURL(name, await resolveDataUrl(url), duckdb.DuckDBDataProtocol.HTTP, false)
 }
 
 
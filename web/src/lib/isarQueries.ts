@@ -1,4 +1,4 @@
-import { DATASETS } from './datasets'
+import { DATASETS, RAW_PARTITION_BASE_URL, RAW_PARTITION_INDEX_URL } from './datasets'
 import { getDuckDb, registerParquetFile } from './duckdbClient'
 
 export type ParameterKey = 'water_level_cm' | 'water_temperature_c'
@@ -32,6 +32,100 @@ function rawName(parameter: ParameterKey) {
     : DATASETS.temp_raw.name
 }
 
+type RawPartition = {
+  year: number
+  path: string
+  rows: number
+  ts_min: string
+  ts_max: string
+}
+
+let _rawIndexPromise: Promise<Record<string, RawPartition[]> | null> | null = null
+
+// Index of the year-partitioned raw layout (see pipeline/raw_partitions.py).
+// Resolves to null when only the single-file layout is published.
+function getRawPartitionIndex() {
+  if (_rawIndexPromise) return _rawIndexPromise
+  _rawIndexPromise = fetch(RAW_PARTITION_INDEX_URL)
+    .then((r) => (r.ok ? r.json() : null))
+    .then((index) => (index && index.parameters ? index.parameters : null))
+    .catch(() => null)
+  return _rawIndexPromise
+}
+
+const _fileAvailable = new Map<string, Promise<boolean>>()
+
+// Tail segments and rollups are only published by the Python pipeline. A
+// missing file would be answered with the SPA's index.html, so check the
+// content type.
+function publishedFileAvailable(url: string) {
+  let p = _fileAvailable.get(url)
+  if (!p) {
+    p = fetch(url, { method: 'HEAD' })
+      .then((r) => r.ok && !(r.headers.get('content-type') ?? '').includes('text/html'))
+      .catch(() => false)
+    _fileAvailable.set(url, p)
+  }
+  return p
+}
+
+export type RollupResolution = 'hourly' | 'weekly' | 'monthly' | 'yearly'
+
+function rollupDataset(parameter: ParameterKey, resolution: RollupResolution) {
+  const prefix = parameter === 'water_level_cm' ? 'level' : 'temp'
+  return DATASETS[`${prefix}_${resolution}` as const]
+}
+
+// Registered name of a published rollup, or null if it is not available.
+async function rollupName(parameter: ParameterKey, resolution: RollupResolution) {
+  const ds = rollupDataset(parameter, resolution)
+  if (!(await publishedFileAvailable(ds.url))) return null
+  if (!REGISTERED.has(ds.name)) {
+    await registerParquetFile(ds.name, ds.url)
+    REGISTERED.add(ds.name)
+  }
+  return ds.name
+}
+
+// FROM-clause source for raw rows, optionally limited to a date range. With the
+// partitioned layout only the years overlapping the range are registered and
+// scanned; with the single-file layout the base file and its tail segment are.
+async function rawSource(
+  parameter: ParameterKey,
+  startDate?: string,
+  endDate?: string
+): Promise<string> {
+  const partitions = (await getRawPartitionIndex())?.[parameter]
+  if (!partitions || partitions.length === 0) {
+    const tail = parameter === 'water_level_cm' ? DATASETS.level_raw_tail : DATASETS.temp_raw_tail
+    if (!(await publishedFileAvailable(tail.url))) {
+      return `parquet_scan('${rawName(parameter)}')`
+    }
+    if (!REGISTERED.has(tail.name)) {
+      await registerParquetFile(tail.name, tail.url)
+      REGISTERED.add(tail.name)
+    }
+    return `parquet_scan(['${rawName(parameter)}', '${tail.name}'])`
+  }
+
+  const startYear = startDate ? Number(startDate.slice(0, 4)) : -Infinity
+  const endYear = endDate ? Number(endDate.slice(0, 4)) : Infinity
+  let selected = partitions.filter((p) => p.year >= startYear && p.year <= endYear)
+  // Keep a valid (empty after filtering) source when the range has no data.
+  if (selected.length === 0) selected = partitions.slice(-1)
+
+  const names: string[] = []
+  for (const p of selected) {
+    const name = `raw/${p.path}`
+    if (!REGISTERED.has(name)) {
+      await registerParquetFile(name, `${RAW_PARTITION_BASE_URL}/${p.path}`)
+      REGISTERED.add(name)
+    }
+    names.push(`'${name}'`)
+  }
+  return `parquet_scan([${names.join(', ')}], hive_partitioning = false)`
+}
+
 export async function getDailyRange(
   parameter: ParameterKey,
   startDate: string,
@@ -58,13 +152,26 @@ export async function getHourlyRange(
 ): Promise<SeriesPoint[]> {
   await ensureRegistered()
   const { conn } = await getDuckDb()
-  const file = rawName(parameter)
 
+  // Precomputed hourly rollup; older deployments only have raw data.
+  const hourly = await rollupName(parameter, 'hourly')
+  if (hourly) {
+    const result = await conn.query(`
+      SELECT strftime(ts, '%Y-%m-%d %H:00:00')::VARCHAR AS x, mean AS y
+      FROM parquet_scan('${hourly}')
+      WHERE ts >= '${startDate}' AND ts <= '${endDate}'
+        AND mean IS NOT NULL
+      ORDER BY ts ASC
+    `)
+    return result.toArray().map((r) => ({ x: String(r.x), y: Number(r.y) }))
+  }
+
+  const source = await rawSource(parameter, startDate, endDate)
   const result = await conn.query(`
     SELECT 
       strftime(ts, '%Y-%m-%d %H:00:00')::VARCHAR AS x,
       AVG(value) AS y
-    FROM parquet_scan('${file}')
+    FROM ${source}
     WHERE ts >= '${startDate}' AND ts <= '${endDate}'
       AND value IS NOT NULL
     GROUP BY strftime(ts, '%Y-%m-%d %H:00:00')
@@ -73,6 +180,27 @@ export async function getHourlyRange(
   return result.toArray().map((r) => ({ x: String(r.x), y: Number(r.y) }))
 }
 
+// Weekly (ISO week, Monday), monthly or yearly means; a few KB for 50 years.
+export async function getRollupRange(
+  parameter: ParameterKey,
+  resolution: Exclude<RollupResolution, 'hourly'>,
+  startDate: string,
+  endDate: string
+): Promise<SeriesPoint[]> {
+  const { conn } = await getDuckDb()
+  const name = await rollupName(parameter, resolution)
+  if (!name) return []
+
+  const result = await conn.query(`
+    SELECT date::VARCHAR AS x, mean AS y
+    FROM parquet_scan('${name}')
+    WHERE date >= '${startDate}' AND date <= '${endDate}'
+      AND mean IS NOT NULL
+    ORDER BY date ASC
+  `)
+  return result.toArray().map((r) => ({ x: String(r.x), y: Number(r.y) }))
+}
+
 export async function getRawRange(
   parameter: ParameterKey,
   startDate: string,
@@ -80,11 +208,11 @@ export async function getRawRange(
 ): Promise<SeriesPoint[]> {
   await ensureRegistered()
   const { conn } = await getDuckDb()
-  const file = rawName(parameter)
+  const source = await rawSource(parameter, startDate, endDate)
 
   const result = await conn.query(`
     SELECT ts::VARCHAR AS x, value AS y
-    FROM parquet_scan('${file}')
+    FROM ${source}
     WHERE ts >= '${startDate}' AND ts <= '${endDate}'
       AND value IS NOT NULL
     ORDER BY ts ASC
@@ -119,19 +247,43 @@ export async function getLatestDaily(parameter: ParameterKey) {
 export async function getRecords(parameter: ParameterKey) {
   await ensureRegistered()
   const { conn } = await getDuckDb()
-  const file = rawName(parameter)
+
+  // Precomputed records table: a single-row lookup.
+  const records = parameter === 'water_level_cm' ? DATASETS.level_records : DATASETS.temp_records
+  if (await publishedFileAvailable(records.url)) {
+    if (!REGISTERED.has(records.name)) {
+      await registerParquetFile(records.name, records.url)
+      REGISTERED.add(records.name)
+    }
+    const q = await conn.query(`
+      SELECT min_ts, min_value, min_status, max_ts, max_value, max_status
+      FROM parquet_scan('${records.name}')
+      WHERE scope = 'all'
+    `)
+    const row = q.toArray()[0] as any
+    return {
+      min: row
+        ? { ts: String(row.min_ts), value: Number(row.min_value), status: String(row.min_status ?? '') }
+        : null,
+      max: row
+        ? { ts: String(row.max_ts), value: Number(row.max_value), status: String(row.max_status ?? '') }
+        : null,
+    }
+  }
+
+  const source = await rawSource(parameter)
 
   // Use raw 15-minute data for true extremes
   const minRow = await conn.query(`
     SELECT ts, value, status
-    FROM parquet_scan('${file}')
+    FROM ${source}
     WHERE value IS NOT NULL
     ORDER BY value ASC
     LIMIT 1
   `)
   const maxRow = await conn.query(`
     SELECT ts, value, status
-    FROM parquet_scan('${file}')
+    FROM ${source}
     WHERE value IS NOT NULL
     ORDER BY value DESC
     LIMIT 1
@@ -151,9 +303,35 @@ export async function getRecords(parameter: ParameterKey) {
 export async function getNowVsNormalDayOfYear(parameter: ParameterKey) {
   await ensureRegistered()
   const { conn } = await getDuckDb()
-  const file = dailyName(parameter)
 
-  // Percentiles are seasonality-aware: same day-of-year window (±7 days).
+  // Precomputed by the pipeline: one row per day of year (window wraps
+  // across the year boundary).
+  const climatology = parameter === 'water_level_cm' ? DATASETS.level_climatology : DATASETS.temp_climatology
+  if (await publishedFileAvailable(climatology.url)) {
+    if (!REGISTERED.has(climatology.name)) {
+      await registerParquetFile(climatology.name, climatology.url)
+      REGISTERED.add(climatology.name)
+    }
+    const q = await conn.query(`
+      SELECT p05, p25, p50, p75, p95
+      FROM parquet_scan('${climatology.name}')
+      WHERE doy = strftime(current_date, '%j')::INT AND count > 0
+    `)
+    const row = q.toArray()[0] as any
+    return row
+      ? {
+          p05: Number(row.p05),
+          p25: Number(row.p25),
+          p50: Number(row.p50),
+          p75: Number(row.p75),
+          p95: Number(row.p95),
+        }
+      : null
+  }
+
+  // Fallback: compute from the daily table. Percentiles are seasonality-aware:
+  // same day-of-year window (±7 days).
+  const file = dailyName(parameter)
   const q = await conn.query(`
     WITH daily AS (
       SELECT CAST(date AS DATE) AS d, mean